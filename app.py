@@ -23,9 +23,11 @@ def main(bot: CustomerServiceBot):
             break
 
         try:
-            # Process the user's input using the bot and display the response
-            response = bot.process_user_input({"customer_input": user_input})
-            print(f"Cobuy: {response}")
+            # Stream the bot's response to the user as it is generated
+            print("Cobuy: ", end="", flush=True)
+            for token in bot.stream_user_input({"customer_input": user_input}):
+                print(token, end="", flush=True)
+            print()
         except Exception as e:
             # Handle any exceptions and prompt the user to try again
             print(f"Error: {str(e)}")
@@ -42,6 +44,9 @@ if __name__ == "__main__":
     # Initialize the CustomerServiceBot with dummy user and conversation IDs
     bot = CustomerServiceBot(user_id="user_123", conversation_id="conversation_123")
 
+    # Build the models, chains and router in the background while the user types
+    bot.engine.warm_up(background=True)
+
     # Display instructions for ending the conversation
     print(
         "Customer Service Bot initialized. Type 'exit' or 'quit' to end the conversation."
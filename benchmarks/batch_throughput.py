@@ -0,0 +1,63 @@
+"""Benchmark `CustomerServiceBot.process_batch` against a stubbed LLM.
+
+Replays the same product information messages one at a time through
+`process_user_input` and as a batch at several concurrency limits.
+
+Usage:
+    python -m benchmarks.batch_throughput --latency 0.1 --messages 64
+"""
+
+# Import necessary modules and classes
+import argparse
+import time
+
+from benchmarks.stubs import StubChatModel, build_stub_engine
+from cobuy.chatbot.bot import CustomerServiceBot
+
+
+def build_bot(latency: float) -> CustomerServiceBot:
+    """Build a bot session whose product information chains run on a stubbed LLM."""
+    llm = StubChatModel(
+        latency=latency,
+        rules=[("format_instructions", '{"results": []}')],
+        default='{"results": []}',
+    )
+    engine = build_stub_engine(llm, intent="product_information")
+    return CustomerServiceBot("benchmark_user", "benchmark_conversation", engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.1, help="Stub LLM latency (s)"
+    )
+    parser.add_argument("--messages", type=int, default=64, help="Messages to replay")
+    args = parser.parse_args()
+
+    bot = build_bot(args.latency)
+    user_inputs = [
+        {"customer_input": f"Do you sell headphones, model {i}?"}
+        for i in range(args.messages)
+    ]
+
+    print(f"{'mode':<20}{'seconds':>10}{'messages/s':>14}{'errors':>8}")
+
+    start = time.perf_counter()
+    for i, user_input in enumerate(user_inputs):
+        CustomerServiceBot(
+            "benchmark_user", f"loop:{i}", bot.engine
+        ).process_user_input(user_input)
+    elapsed = time.perf_counter() - start
+    print(f"{'loop':<20}{elapsed:>10.2f}{args.messages / elapsed:>14.1f}{0:>8}")
+
+    for max_concurrency in (1, 4, 16, 64):
+        start = time.perf_counter()
+        results = bot.process_batch(user_inputs, max_concurrency=max_concurrency)
+        elapsed = time.perf_counter() - start
+        errors = sum(isinstance(result, Exception) for result in results)
+        mode = f"batch (limit {max_concurrency})"
+        print(f"{mode:<20}{elapsed:>10.2f}{args.messages / elapsed:>14.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Benchmark micro-batching of the router encoder across concurrent sessions.
+
+Each session classifies messages of `synthetic_intetions.json` one after the
+other through `CustomerServiceBot.classify_user_input`, with and without
+`encoder_batching`, at several numbers of concurrent sessions. The hashing
+stand-in emulates a model saturating the CPU: one forward pass at a time, each
+costing a fixed latency plus a latency per text.
+
+Usage:
+    python -m benchmarks.encoder_batching --sessions 1 8 64 --messages 20
+"""
+
+# Import necessary modules and classes
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from benchmarks.stubs import HashingEncoder, build_stub_route_layer
+from cobuy.chatbot.bot import CustomerServiceBot
+from cobuy.chatbot.engine import BotEngine
+from cobuy.chatbot.router.loader import (
+    load_intention_classifier,
+    load_labelled_messages,
+)
+from cobuy.chatbot.settings import BotSettings
+
+
+class ExclusiveEncoder:
+    """Encoder running one pass at a time, after a latency growing with its size."""
+
+    def __init__(self, encoder, pass_latency: float, text_latency: float):
+        self.encoder = encoder
+        self.name = encoder.name
+        self.pass_latency = pass_latency
+        self.text_latency = text_latency
+        self._lock = threading.Lock()
+
+    def __call__(self, docs: List[str]) -> List[List[float]]:
+        with self._lock:
+            time.sleep(self.pass_latency + self.text_latency * len(docs))
+            return self.encoder(docs)
+
+
+def build_route_layer(args: argparse.Namespace):
+    """Build the route layer of the encoder chosen on the command line."""
+    if args.encoder != "hashing":
+        return load_intention_classifier(args.encoder)
+
+    route_layer = build_stub_route_layer(HashingEncoder())
+    route_layer.encoder = ExclusiveEncoder(
+        route_layer.encoder, args.pass_latency, args.text_latency
+    )
+    return route_layer
+
+
+def throughput(
+    engine: BotEngine, messages: List[str], sessions: int, per_session: int
+) -> float:
+    """Classify `per_session` messages in each concurrent session, in messages/s."""
+
+    def run(session: int) -> None:
+        bot = CustomerServiceBot(f"user_{session}", f"conversation_{session}", engine)
+        for i in range(per_session):
+            message = messages[(session * per_session + i) % len(messages)]
+            bot.classify_user_input({"customer_input": message})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(run, range(sessions)))
+    return sessions * per_session / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--messages", type=int, default=20, help="Per session")
+    parser.add_argument(
+        "--encoder",
+        choices=["hashing", "layer", "onnx"],
+        default="hashing",
+        help="Hashing stand-in, the encoder of layer.json or its ONNX export",
+    )
+    parser.add_argument(
+        "--pass-latency",
+        type=float,
+        default=0.005,
+        help="Stand-in latency per pass (s)",
+    )
+    parser.add_argument(
+        "--text-latency",
+        type=float,
+        default=0.0002,
+        help="Stand-in latency per text of a pass (s)",
+    )
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    messages, _ = load_labelled_messages("synthetic_intetions.json")
+    route_layer = build_route_layer(args)
+
+    engines = {}
+    for batching in (False, True):
+        settings = BotSettings(
+            backend="offline",
+            local_classifier=False,
+            embedding_cache=False,
+            encoder_batching=batching,
+            encoder_batch_window_ms=args.window_ms,
+            encoder_batch_max_size=args.max_batch_size,
+        )
+        engines[batching] = BotEngine(settings, intention_classifier=route_layer)
+
+    print(
+        f"{'sessions':>8}{'unbatched msg/s':>17}{'batched msg/s':>15}"
+        f"{'gain':>7}{'mean batch':>12}"
+    )
+    for sessions in args.sessions:
+        unbatched = throughput(engines[False], messages, sessions, args.messages)
+
+        stats = engines[True].router_encoder.stats
+        before = stats.as_dict()
+        batched = throughput(engines[True], messages, sessions, args.messages)
+        after = stats.as_dict()
+        mean_batch = (after["items"] - before["items"]) / max(
+            after["batches"] - before["batches"], 1
+        )
+
+        print(
+            f"{sessions:>8}{unbatched:>17.1f}{batched:>15.1f}"
+            f"{batched / unbatched:>6.1f}x{mean_batch:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compare the accuracy of the two-step and fused LLM fallback classifications.
+
+Replays the labelled messages of `synthetic_intetions.json` through the previous
+two-step classification (chitchat classifier, then the router chain) and through
+the fallback router chain that replaced it, then reports the accuracy of each
+against the labels ("None" counts as chitchat), per intent, with the LLM calls and
+wall time they took. Runs on the OpenAI backend by default; `--backend offline`
+only checks that the pipeline runs.
+
+Usage:
+    python -m benchmarks.fallback_accuracy --concurrency 8
+"""
+
+# Import necessary modules and classes
+import argparse
+import time
+from collections import Counter
+from typing import Dict, List
+
+from cobuy.chatbot.backends import create_chat_model
+from cobuy.chatbot.chains.chitchat import ChitChatClassifierChain
+from cobuy.chatbot.chains.router import FallbackRouterChain, RouterChain
+from cobuy.chatbot.router.loader import load_labelled_messages
+from cobuy.chatbot.router.local_classifier import to_class
+
+
+def classify_two_step(llm, inputs: List[Dict[str, str]], concurrency: int):
+    """Classify with the chitchat classifier, then the router chain if needed.
+
+    Returns:
+        The predicted classes and the number of LLM calls.
+    """
+    chitchat_chain = ChitChatClassifierChain(llm=llm)
+    router_chain = RouterChain(llm=llm)
+    config = {"max_concurrency": concurrency}
+
+    chitchat = [
+        result.chitchat for result in chitchat_chain.batch(inputs, config=config)
+    ]
+    pending = [
+        message for message, is_chitchat in zip(inputs, chitchat) if not is_chitchat
+    ]
+    intents = iter(
+        result.intent for result in router_chain.batch(pending, config=config)
+    )
+
+    predictions = [
+        "chitchat" if is_chitchat else next(intents) for is_chitchat in chitchat
+    ]
+    return predictions, len(inputs) + len(pending)
+
+
+def classify_fused(llm, inputs: List[Dict[str, str]], concurrency: int):
+    """Classify with the fallback router chain.
+
+    Returns:
+        The predicted classes and the number of LLM calls.
+    """
+    chain = FallbackRouterChain(llm=llm)
+    results = chain.batch(inputs, config={"max_concurrency": concurrency})
+    return [result.intent for result in results], len(inputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["openai", "offline"], default="openai")
+    parser.add_argument("--dataset", default="synthetic_intetions.json")
+    parser.add_argument("--concurrency", type=int, default=8, help="Calls in flight")
+    args = parser.parse_args()
+
+    llm = create_chat_model(args.backend, temperature=0.0, model="gpt-4o-mini")
+    messages, labels = load_labelled_messages(args.dataset)
+    expected = [to_class(label) for label in labels]
+    # The fallback runs on single unrouted turns, so no history is replayed
+    inputs = [{"customer_input": message, "chat_history": ""} for message in messages]
+
+    totals = Counter(expected)
+    print(f"{len(messages)} messages from {args.dataset}")
+    print(f"{'classifier':<12}{'accuracy':>10}{'LLM calls':>11}{'time (s)':>10}")
+    per_intent = {}
+    for name, classify in (("two-step", classify_two_step), ("fused", classify_fused)):
+        start = time.perf_counter()
+        predictions, calls = classify(llm, inputs, args.concurrency)
+        elapsed = time.perf_counter() - start
+
+        correct = Counter(
+            label
+            for label, predicted in zip(expected, predictions)
+            if label == predicted
+        )
+        per_intent[name] = correct
+        accuracy = sum(correct.values()) / len(expected)
+        print(f"{name:<12}{accuracy:>10.1%}{calls:>11}{elapsed:>10.1f}")
+
+    print(f"\n{'intent':<22}{'count':>7}{'two-step':>10}{'fused':>10}")
+    for intent in sorted(totals):
+        print(
+            f"{intent:<22}{totals[intent]:>7}"
+            f"{per_intent['two-step'][intent] / totals[intent]:>10.1%}"
+            f"{per_intent['fused'][intent] / totals[intent]:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark the LLM fallback of `handle_unknown_intent` against a stubbed LLM.
+
+Compares the previous two-step classification (chitchat classifier, then the
+router chain when the message is not chitchat) with the single call of the fallback
+router chain used by `CustomerServiceBot.classify_unknown_intent`. Accuracy is
+compared by `benchmarks.fallback_accuracy`.
+
+Usage:
+    python -m benchmarks.fallback_latency --latency 0.2 --runs 10
+"""
+
+# Import necessary modules and classes
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stubs import StubChatModel, build_stub_engine
+from cobuy.chatbot.bot import CustomerServiceBot
+
+
+def build_bot(latency: float, chitchat: bool) -> CustomerServiceBot:
+    """Build a bot session whose fallback chains run on a stubbed LLM."""
+    llm = StubChatModel(
+        latency=latency,
+        rules=[
+            (
+                "distinguishing between chitchat",
+                f'{{"chitchat": {str(chitchat).lower()}}}',
+            ),
+            ("expert classifier", '{"intent": "support_information"}'),
+            (
+                "Classify the customer message",
+                (
+                    '{"intent": "chitchat"}'
+                    if chitchat
+                    else '{"intent": "support_information"}'
+                ),
+            ),
+        ],
+    )
+    engine = build_stub_engine(llm)
+    return CustomerServiceBot("benchmark_user", "benchmark_conversation", engine)
+
+
+def classify_sequentially(bot: CustomerServiceBot, user_input) -> str:
+    """The two-step fallback classification the fallback router chain replaced."""
+    chitchat_reasoning_chain, _ = bot.get_chain("chitchat")
+    router_reasoning_chain, _ = bot.get_chain("router")
+    input_message = bot.get_fallback_input(user_input)
+
+    if chitchat_reasoning_chain.invoke(input_message).chitchat:
+        return "chitchat"
+    return router_reasoning_chain.invoke(input_message).intent
+
+
+def measure(function, runs: int) -> float:
+    """Return the median wall time of `function` in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Stub LLM latency (s)"
+    )
+    parser.add_argument("--runs", type=int, default=10, help="Runs per scenario")
+    args = parser.parse_args()
+
+    user_input = {"customer_input": "Do you ship to the Azores?"}
+
+    print(
+        f"{'scenario':<12}{'two-step (ms)':>15}{'fused sync (ms)':>17}"
+        f"{'fused async (ms)':>18}"
+    )
+    for chitchat in (False, True):
+        bot = build_bot(args.latency, chitchat)
+        before = measure(lambda: classify_sequentially(bot, user_input), args.runs)
+        after = measure(lambda: bot.classify_unknown_intent(user_input), args.runs)
+        after_async = measure(
+            lambda: asyncio.run(bot.aclassify_unknown_intent(user_input)), args.runs
+        )
+        scenario = "chitchat" if chitchat else "intent"
+        print(f"{scenario:<12}{before:>15.1f}{after:>17.1f}{after_async:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark routing latency against the number of route utterances.
+
+Builds route layers over synthetic utterance sets of growing size and compares the
+exact search of `MatrixRouteLayer` with the FAISS HNSW index of `FaissRouteLayer`:
+build time (first start), load time (saved index), per-query latency, the recall
+of the top-k utterances and the agreement of the routing decisions. Utterances and
+queries are random unit vectors clustered by route and by topic within a route, so
+no encoder is needed. Artefacts go to a temporary directory.
+
+Usage:
+    python -m benchmarks.route_index --sizes 1000 10000 100000
+"""
+
+# Import necessary modules and classes
+import argparse
+import tempfile
+import time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from pydantic.v1 import PrivateAttr
+from semantic_router import Route
+from semantic_router.encoders import BaseEncoder
+
+from cobuy.chatbot.router.route_layer import (
+    FaissRouteLayer,
+    MatrixRouteLayer,
+    normalise_rows,
+)
+
+ROUTES = ["order_status", "create_order", "product_information", "support_information"]
+
+
+class LookupEncoder(BaseEncoder):
+    """Encoder returning precomputed vectors; utterance `i` is the text "u<i>"."""
+
+    name: str = "lookup"
+    type: str = "lookup"
+    score_threshold: float = 0.5
+    _vectors: Any = PrivateAttr()
+
+    def __init__(self, vectors: np.ndarray, **data):
+        super().__init__(**data)
+        self._vectors = vectors
+
+    def __call__(self, docs: List[str]) -> List[List[float]]:
+        return self._vectors[[int(doc[1:]) for doc in docs]]
+
+
+def synthetic_vectors(count: int, dim: int, rng: np.random.Generator):
+    """Unit vectors around a centroid per route and per topic, with their routes."""
+    centroids = normalise_rows(rng.standard_normal((len(ROUTES), dim)))
+    topics = normalise_rows(
+        rng.standard_normal((len(ROUTES), 50, dim)).reshape(-1, dim)
+    )
+    routes = rng.integers(len(ROUTES), size=count)
+    topic = routes * 50 + rng.integers(50, size=count)
+    noise = normalise_rows(rng.standard_normal((count, dim)))
+    return normalise_rows(centroids[routes] + 0.8 * topics[topic] + 0.6 * noise), routes
+
+
+def query_latencies(route_layer, queries) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Route every query, returning the latencies in microseconds and the routes."""
+    latencies, decisions = [], []
+    for query in queries:
+        start = time.perf_counter()
+        routes = route_layer.retrieve_multiple_routes(vector=query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        decisions.append(routes[0].name if routes else None)
+    return np.asarray(latencies), decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384, help="MiniLM dimension")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'utterances':>10}{'build s':>9}{'load ms':>9}{'exact p50 us':>14}"
+        f"{'faiss p50 us':>14}{'faiss p95 us':>14}{'recall@5':>10}{'same route':>12}"
+    )
+    for size in args.sizes:
+        rng = np.random.default_rng(args.seed)
+        vectors, labels = synthetic_vectors(size + args.queries, args.dim, rng)
+        queries = vectors[size:]
+        encoder = LookupEncoder(vectors[:size])
+        routes = [
+            Route(
+                name=name,
+                utterances=[f"u{i}" for i in np.flatnonzero(labels[:size] == r)],
+            )
+            for r, name in enumerate(ROUTES)
+        ]
+
+        exact = MatrixRouteLayer(encoder, routes, embeddings_dir=None)
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            FaissRouteLayer(
+                encoder, routes, embeddings_dir=directory, ef_search=args.ef_search
+            )
+            build_s = time.perf_counter() - start
+            start = time.perf_counter()
+            faiss_layer = FaissRouteLayer(
+                encoder, routes, embeddings_dir=directory, ef_search=args.ef_search
+            )
+            load_ms = (time.perf_counter() - start) * 1000
+
+            # Warm both code paths before timing
+            query_latencies(exact, queries[:20])
+            query_latencies(faiss_layer, queries[:20])
+            exact_latencies, exact_decisions = query_latencies(exact, queries)
+            faiss_latencies, faiss_decisions = query_latencies(faiss_layer, queries)
+
+            recall = np.mean(
+                [
+                    len(
+                        set(exact._search(query, 5)[1])
+                        & set(faiss_layer._search(query, 5)[1])
+                    )
+                    / 5
+                    for query in queries
+                ]
+            )
+        same = np.mean([a == b for a, b in zip(exact_decisions, faiss_decisions)])
+
+        print(
+            f"{size:>10}{build_s:>9.2f}{load_ms:>9.1f}"
+            f"{np.percentile(exact_latencies, 50):>14.1f}"
+            f"{np.percentile(faiss_latencies, 50):>14.1f}"
+            f"{np.percentile(faiss_latencies, 95):>14.1f}"
+            f"{recall:>10.1%}{same:>12.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark the encoders of the intent route layer.
+
+Each encoder runs in a fresh Python process, which reports:
+- load: from process start until the route layer is built, imports included;
+- RSS: resident memory once every message is classified;
+- latency: median and p95 time to encode and route one message;
+- accuracy: the first matched route against the labels of the dataset.
+The route decisions of every encoder are then compared with those of the first
+encoder that ran. When both the layer encoder and its ONNX export ran, their
+agreement is saved in `ONNX_AGREEMENT_PATH` with the hash of `layer.json`; the
+bot accepts the onnx router encoder only with this report.
+
+Usage:
+    python -m benchmarks.router_encoders --encoders layer onnx
+"""
+
+# Import necessary modules and classes
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+START = time.perf_counter()
+
+
+def run_child(encoder: str, dataset: str) -> dict:
+    """Build the route layer with `encoder` and classify the dataset."""
+    import numpy as np
+
+    from cobuy.chatbot.router.loader import (
+        load_intention_classifier,
+        load_labelled_messages,
+    )
+
+    route_layer = load_intention_classifier(encoder)
+    loaded = time.perf_counter()
+
+    messages, labels = load_labelled_messages(dataset)
+    decisions, latencies = [], []
+    for message in messages:
+        start = time.perf_counter()
+        vector = route_layer.encoder([message])[0]
+        routes = route_layer.retrieve_multiple_routes(vector=vector)
+        latencies.append((time.perf_counter() - start) * 1000)
+        decisions.append(routes[0].name if routes else "None")
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "load_ms": (loaded - START) * 1000,
+        # Kilobytes on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "accuracy": float(np.mean([d == y for d, y in zip(decisions, labels)])),
+        "decisions": decisions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--encoders", nargs="+", default=["layer", "onnx"])
+    parser.add_argument("--dataset", default="synthetic_intetions.json")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.dataset)))
+        return
+
+    from cobuy.chatbot.router.encoders import ONNX_AGREEMENT_PATH, layer_digest
+    from cobuy.chatbot.router.loader import FILE_PATH
+
+    results = {}
+    for encoder in args.encoders:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.router_encoders",
+                "--child",
+                encoder,
+                "--dataset",
+                args.dataset,
+            ],
+            capture_output=True,
+            text=True,
+        )
+        if output.returncode:
+            # Typically a missing optional dependency of the encoder
+            print(f"Skipping {encoder}: {output.stderr.strip().splitlines()[-1]}")
+            continue
+        results[encoder] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    if not results:
+        return
+    reference = next(iter(results))
+    print(
+        f"{'encoder':<10}{'load ms':>10}{'RSS MB':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'accuracy':>10}{f'same as {reference}':>16}"
+    )
+    for encoder, result in results.items():
+        same = sum(
+            a == b for a, b in zip(result["decisions"], results[reference]["decisions"])
+        )
+        agreement = f"{same}/{len(result['decisions'])}"
+        print(
+            f"{encoder:<10}{result['load_ms']:>10.0f}{result['rss_mb']:>9.0f}"
+            f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+            f"{result['accuracy']:>10.1%}"
+            f"{agreement:>16}"
+        )
+
+    if "layer" in results and "onnx" in results:
+        decisions = results["onnx"]["decisions"]
+        same = sum(a == b for a, b in zip(decisions, results["layer"]["decisions"]))
+        report = {
+            "measured_at": datetime.datetime.now(datetime.timezone.utc).isoformat(
+                timespec="seconds"
+            ),
+            "layer_sha256": layer_digest(FILE_PATH),
+            "dataset": args.dataset,
+            "messages": len(decisions),
+            "agreement": same / len(decisions),
+            "encoders": {
+                encoder: {k: v for k, v in results[encoder].items() if k != "decisions"}
+                for encoder in ("layer", "onnx")
+            },
+        }
+        os.makedirs(os.path.dirname(ONNX_AGREEMENT_PATH), exist_ok=True)
+        with open(ONNX_AGREEMENT_PATH, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nAgreement {report['agreement']:.1%} saved to {ONNX_AGREEMENT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
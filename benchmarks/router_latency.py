@@ -0,0 +1,119 @@
+"""Benchmark the startup and per-query latency of the intent route layer.
+
+Compares `RouteLayer`, which encodes every utterance of `layer.json` when it is
+built and scores queries utterance by utterance, with `MatrixRouteLayer`, which
+loads the persisted utterance embeddings and scores a query with one matrix
+product. Startup excludes loading the encoder model, which both share. The
+embeddings are persisted to a temporary directory, so the repository is untouched.
+
+Usage:
+    python -m benchmarks.router_latency --encoder hashing
+"""
+
+# Import necessary modules and classes
+import argparse
+import copy
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from semantic_router import RouteLayer
+from semantic_router.encoders import AutoEncoder
+from semantic_router.layer import LayerConfig
+
+from benchmarks.stubs import HashingEncoder
+from cobuy.chatbot.router.loader import FILE_PATH as LAYER_PATH
+from cobuy.chatbot.router.loader import load_labelled_messages
+from cobuy.chatbot.router.route_layer import MatrixRouteLayer
+
+
+def timed(function):
+    """Return the result of `function` and its wall time in milliseconds."""
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def query_latencies(route_layer, vectors) -> list:
+    """Time `retrieve_multiple_routes` on every vector, in microseconds."""
+    latencies = []
+    for vector in vectors:
+        start = time.perf_counter()
+        route_layer.retrieve_multiple_routes(vector=vector)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--encoder",
+        choices=["layer", "hashing"],
+        default="layer",
+        help="Encoder of layer.json or the hashing stand-in",
+    )
+    parser.add_argument("--dataset", default="synthetic_intetions.json")
+    args = parser.parse_args()
+
+    config = LayerConfig.from_file(LAYER_PATH)
+    if args.encoder == "hashing":
+        encoder, load_ms = timed(HashingEncoder)
+    else:
+        encoder, load_ms = timed(
+            lambda: AutoEncoder(
+                type=config.encoder_type, name=config.encoder_name
+            ).model
+        )
+    print(f"Encoder {encoder.name} loaded in {load_ms:.0f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        before, before_ms = timed(
+            lambda: RouteLayer(encoder=encoder, routes=copy.deepcopy(config.routes))
+        )
+        _, cold_ms = timed(
+            lambda: MatrixRouteLayer(
+                encoder, copy.deepcopy(config.routes), embeddings_dir=directory
+            )
+        )
+        after, warm_ms = timed(
+            lambda: MatrixRouteLayer(
+                encoder, copy.deepcopy(config.routes), embeddings_dir=directory
+            )
+        )
+
+    print(f"\n{'startup':<34}{'ms':>8}")
+    print(f"{'RouteLayer (encodes utterances)':<34}{before_ms:>8.1f}")
+    print(f"{'MatrixRouteLayer, first start':<34}{cold_ms:>8.1f}")
+    print(f"{'MatrixRouteLayer, saved matrix':<34}{warm_ms:>8.1f}")
+
+    messages, _ = load_labelled_messages(args.dataset)
+    vectors = [np.asarray(vector) for vector in encoder(messages)]
+
+    # Warm both code paths before timing
+    query_latencies(before, vectors[:10])
+    query_latencies(after, vectors[:10])
+    latencies = {
+        "RouteLayer": query_latencies(before, vectors),
+        "MatrixRouteLayer": query_latencies(after, vectors),
+    }
+
+    print(f"\n{'per query':<34}{'p50 us':>8}{'p95 us':>8}")
+    for name, values in latencies.items():
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"{name:<34}{p50:>8.1f}{p95:>8.1f}")
+    speedup = statistics.median(latencies["RouteLayer"]) / statistics.median(
+        latencies["MatrixRouteLayer"]
+    )
+    print(f"Median speedup: {speedup:.1f}x")
+
+    same = sum(
+        {route.name for route in before.retrieve_multiple_routes(vector=vector)}
+        == {route.name for route in after.retrieve_multiple_routes(vector=vector)}
+        for vector in vectors
+    )
+    print(f"Same matched routes on {same}/{len(vectors)} messages of {args.dataset}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Check that a candidate route layer does not regress on the current one.
+
+Both layers classify the held-out split of `synthetic_intetions.json`. The report
+gives the precision and recall of each intent, the rejection rate of the messages
+labelled "None", the per-query latency of `retrieve_multiple_routes` (encoding
+included) and the encoder throughput. The script exits with status 1, printing
+the metrics past their limits, when the candidate regresses more than allowed.
+
+The messages of `new_intentions.jsonl` are reported separately and never gate:
+the trainer adds them to the candidate's utterances, so the candidate would be
+scored on its own training data. It runs offline on CPU: the Hub is not
+contacted and the hashing stand-in needs no model at all.
+
+Usage:
+    python -m benchmarks.router_regression --candidate path/to/layer.json
+    python -m benchmarks.router_regression --candidate layer.json --encoder hashing
+"""
+
+# Import necessary modules and classes
+import os
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import argparse
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from semantic_router.encoders import BaseEncoder
+from semantic_router.layer import LayerConfig
+
+from benchmarks.stubs import HashingEncoder
+from cobuy.chatbot.router.encoders import create_router_encoder
+from cobuy.chatbot.router.loader import FILE_PATH as LAYER_PATH
+from cobuy.chatbot.router.loader import load_labelled_messages, load_router_split
+from cobuy.chatbot.router.route_layer import MatrixRouteLayer
+
+NONE_LABEL = "None"
+
+
+def evaluation_sets(
+    test_size: float, random_state: int
+) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Messages and labels of the held-out synthetic split, which gates, and of the
+    new messages, which are only reported.
+    """
+    _, _, X_test, y_test = load_router_split(test_size, random_state)
+    return {
+        "held-out": (X_test, y_test),
+        "new": load_labelled_messages("new_intentions.jsonl"),
+    }
+
+
+def load_encoder(name: str, config: LayerConfig, encoders: Dict) -> BaseEncoder:
+    """Create the encoder of a layer, shared by layers naming the same model."""
+    key = (name, config.encoder_type, config.encoder_name)
+    if key not in encoders:
+        encoders[key] = (
+            HashingEncoder()
+            if name == "hashing"
+            else create_router_encoder(name, config)
+        )
+    return encoders[key]
+
+
+def evaluate(
+    route_layer: MatrixRouteLayer,
+    messages: List[str],
+    labels: List[str],
+    repeats: int,
+    batch_size: int,
+) -> Dict[str, float]:
+    """Classify every message `repeats` times and return the layer's metrics."""
+    # Warm the encoder and the scoring path before timing
+    for message in messages[:5]:
+        route_layer.retrieve_multiple_routes(message)
+
+    latencies, predictions = [], []
+    for _ in range(repeats):
+        predictions = []
+        for message in messages:
+            start = time.perf_counter()
+            routes = route_layer.retrieve_multiple_routes(message)
+            latencies.append((time.perf_counter() - start) * 1000)
+            predictions.append(routes[0].name if routes else NONE_LABEL)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(messages), batch_size):
+            route_layer.encoder(messages[i : i + batch_size])
+    throughput = repeats * len(messages) / (time.perf_counter() - start)
+
+    metrics = {}
+    predicted, expected = np.array(predictions), np.array(labels)
+    for intent in sorted(set(labels) - {NONE_LABEL}):
+        hits = np.sum((predicted == intent) & (expected == intent))
+        metrics[f"{intent} precision"] = hits / max(np.sum(predicted == intent), 1)
+        metrics[f"{intent} recall"] = hits / max(np.sum(expected == intent), 1)
+    metrics["accuracy"] = float(np.mean(predicted == expected))
+    # Without "None" labels the rate is undefined, and NaN would pass any limit
+    if np.any(expected == NONE_LABEL):
+        metrics["None rejection"] = np.mean(
+            predicted[expected == NONE_LABEL] == NONE_LABEL
+        )
+    metrics["p50 ms"], metrics["p99 ms"] = np.percentile(latencies, [50, 99])
+    metrics["encoder texts/s"] = throughput
+    return {name: float(value) for name, value in metrics.items()}
+
+
+def regression(
+    name: str, baseline: float, candidate: float, args: argparse.Namespace
+) -> Optional[str]:
+    """Describe the limit a metric of the candidate breaks, None if it passes."""
+    if name.endswith(" ms"):
+        limit = baseline * args.max_latency_ratio
+        return f"> {limit:.3f}" if candidate > limit else None
+    if name.endswith(" texts/s"):
+        limit = baseline / args.max_latency_ratio
+        return f"< {limit:.1f}" if candidate < limit else None
+    limit = baseline - args.max_quality_drop
+    return f"< {limit:.3f}" if candidate < limit else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidate", required=True, help="Layer file to check")
+    parser.add_argument("--baseline", default=LAYER_PATH, help="Layer file it replaces")
+    parser.add_argument(
+        "--encoder",
+        choices=["layer", "onnx", "hashing"],
+        default="layer",
+        help="Encoder named in the layer files, its ONNX export or the hashing "
+        "stand-in",
+    )
+    parser.add_argument(
+        "--max-quality-drop",
+        type=float,
+        default=0.02,
+        help="Largest allowed drop of accuracy, precision, recall or rejection",
+    )
+    parser.add_argument(
+        "--max-latency-ratio",
+        type=float,
+        default=1.25,
+        help="Largest allowed latency increase, and throughput decrease, as a ratio",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--test-size", type=float, default=0.1)
+    parser.add_argument("--random-state", type=int, default=0)
+    args = parser.parse_args()
+
+    sets = evaluation_sets(args.test_size, args.random_state)
+    results, encoders = {name: {} for name in sets}, {}
+    with tempfile.TemporaryDirectory() as directory:
+        for role, path in (("baseline", args.baseline), ("candidate", args.candidate)):
+            config = LayerConfig.from_file(path)
+            route_layer = MatrixRouteLayer(
+                load_encoder(args.encoder, config, encoders),
+                config.routes,
+                embeddings_dir=directory,
+            )
+            for name, (messages, labels) in sets.items():
+                if messages:
+                    results[name][role] = evaluate(
+                        route_layer, messages, labels, args.repeats, args.batch_size
+                    )
+
+    failures = []
+    for set_name, (messages, labels) in sets.items():
+        gating = set_name == "held-out"
+        print(
+            f"{set_name} messages ({'gating' if gating else 'reported only'}): "
+            f"{len(messages)}, {labels.count(NONE_LABEL)} labelled {NONE_LABEL}, "
+            f"encoder {args.encoder}"
+        )
+        if not results[set_name]:
+            print("  none\n")
+            continue
+        baseline, candidate = (
+            results[set_name]["baseline"],
+            results[set_name]["candidate"],
+        )
+        if NONE_LABEL not in labels:
+            print(f"  None rejection skipped: no message labelled {NONE_LABEL}")
+
+        print(f"{'metric':<34}{'baseline':>10}{'candidate':>11}{'change':>9}")
+        for name in list(baseline) + [n for n in candidate if n not in baseline]:
+            before, after = baseline.get(name, 0.0), candidate.get(name, 0.0)
+            limit = regression(name, before, after, args) if gating else None
+            print(
+                f"{name:<34}{before:>10.3f}{after:>11.3f}{after - before:>+9.3f}"
+                f"{'  FAIL' if limit else ''}"
+            )
+            if limit:
+                failures.append(f"{name}: {before:.3f} -> {after:.3f}, limit {limit}")
+        print()
+
+    if failures:
+        print(f"{args.candidate} regresses on {args.baseline}:")
+        print("\n".join(f"  {failure}" for failure in failures))
+        sys.exit(1)
+    print(f"{args.candidate} passes every limit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark the bot's cold start.
+
+Each mode runs in a fresh Python process and reports:
+- time to first prompt: from process start until the bot can read a message;
+- time to first answer: from sending the first message until it is answered.
+
+Modes:
+- eager: every component is built before the first prompt (previous behaviour);
+- lazy: components are built by the first turn that needs them;
+- warm: components are built in the background once the prompt is shown.
+
+Usage:
+    python -m benchmarks.startup --stub-llm --think-time 2
+"""
+
+# Import necessary modules and classes
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+START = time.perf_counter()
+
+
+def run_child(mode: str, question: str, stub_llm: bool, think_time: float) -> dict:
+    """Start the bot in the current process and time its startup milestones."""
+    from dotenv import load_dotenv
+
+    from cobuy import BotEngine, CustomerServiceBot
+
+    load_dotenv()
+    imported = time.perf_counter()
+
+    llm = None
+    if stub_llm:
+        from benchmarks.stubs import StubChatModel
+
+        llm = StubChatModel(
+            rules=[("product identification", '{"results": []}')],
+            default="Hello!",
+        )
+
+    engine = BotEngine(llm=llm)
+    if mode == "eager":
+        engine.warm_up(background=False)
+    bot = CustomerServiceBot("benchmark_user", "benchmark_conversation", engine)
+    if mode == "warm":
+        engine.warm_up(background=True)
+    first_prompt = time.perf_counter()
+
+    # Simulate the user typing the first message
+    time.sleep(think_time)
+    asked = time.perf_counter()
+    bot.process_user_input({"customer_input": question})
+    first_answer = time.perf_counter()
+
+    return {
+        "import_ms": (imported - START) * 1000,
+        "first_prompt_ms": (first_prompt - START) * 1000,
+        "first_answer_ms": (first_answer - asked) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stub-llm", action="store_true", help="Use a stubbed LLM")
+    parser.add_argument("--question", default="Does the CineView 8K TV support HDR?")
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="Seconds between the first prompt and the first message",
+    )
+    parser.add_argument("--child", choices=["eager", "lazy", "warm"])
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_child(args.child, args.question, args.stub_llm, args.think_time)
+        print(json.dumps(result))
+        return
+
+    print(
+        f"{'mode':<8}{'import (ms)':>14}{'first prompt (ms)':>20}"
+        f"{'first answer (ms)':>20}"
+    )
+    for mode in ("eager", "lazy", "warm"):
+        command = [sys.executable, "-m", "benchmarks.startup", "--child", mode]
+        command += ["--question", args.question, "--think-time", str(args.think_time)]
+        if args.stub_llm:
+            command.append("--stub-llm")
+        output = subprocess.run(command, capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:<8}{result['import_ms']:>14.0f}{result['first_prompt_ms']:>20.0f}"
+            f"{result['first_answer_ms']:>20.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark time-to-first-token of `stream_user_input` against a stubbed LLM.
+
+Compares when the first token reaches the caller with `stream_user_input` and
+`astream_user_input` against the full-turn latency of `process_user_input`, on
+the product information path (reasoning chain, then streamed response chain).
+
+Usage:
+    python -m benchmarks.streaming_ttft --latency 0.2 --token-latency 0.02
+"""
+
+# Import necessary modules and classes
+import argparse
+import asyncio
+import statistics
+import time
+import warnings
+
+from benchmarks.stubs import StubChatModel, build_stub_engine
+from cobuy.chatbot.bot import CustomerServiceBot
+
+# A 40-word answer, in the range of the response chains' instructions
+ANSWER = " ".join(["token"] * 40)
+
+
+def measure_stream(stream) -> tuple:
+    """Return the time to the first token and to the end of `stream` in ms."""
+    start = time.perf_counter()
+    first = None
+    for _ in stream:
+        if first is None:
+            first = time.perf_counter()
+    end = time.perf_counter()
+    return (first - start) * 1000, (end - start) * 1000
+
+
+async def ameasure_stream(stream) -> tuple:
+    """Return the time to the first token and to the end of `stream` in ms."""
+    start = time.perf_counter()
+    first = None
+    async for _ in stream:
+        if first is None:
+            first = time.perf_counter()
+    end = time.perf_counter()
+    return (first - start) * 1000, (end - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Stub LLM latency (s)"
+    )
+    parser.add_argument(
+        "--token-latency", type=float, default=0.02, help="Stub per-token latency (s)"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Runs per mode")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    llm = StubChatModel(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        rules=[("product identification", '{"results": []}')],
+        default=ANSWER,
+    )
+    bot = CustomerServiceBot(
+        "benchmark_user",
+        "benchmark_conversation",
+        build_stub_engine(llm, intent="product_information"),
+    )
+    user_input = {"customer_input": "Does the CineView 8K TV support HDR?"}
+
+    full, sync_stream, async_stream = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        bot.process_user_input(dict(user_input))
+        full.append((time.perf_counter() - start) * 1000)
+        sync_stream.append(measure_stream(bot.stream_user_input(dict(user_input))))
+        async_stream.append(
+            asyncio.run(ameasure_stream(bot.astream_user_input(dict(user_input))))
+        )
+
+    print(f"{'mode':<22}{'first token (ms)':>18}{'complete (ms)':>16}")
+    print(
+        f"{'process_user_input':<22}{statistics.median(full):>18.1f}{statistics.median(full):>16.1f}"
+    )
+    for name, results in (
+        ("stream_user_input", sync_stream),
+        ("astream_user_input", async_stream),
+    ):
+        ttft = statistics.median(first for first, _ in results)
+        total = statistics.median(end for _, end in results)
+        print(f"{name:<22}{ttft:>18.1f}{total:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
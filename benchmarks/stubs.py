@@ -0,0 +1,236 @@
+# Import necessary modules and classes
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from semantic_router import Route
+from semantic_router.encoders import BaseEncoder
+from semantic_router.schema import RouteChoice
+
+from cobuy.chatbot.agents.order_agent import OrderAgent
+from cobuy.chatbot.backends import LocalVectorStore, hash_embedding
+from cobuy.chatbot.chains.chitchat import ChitChatClassifierChain, ChitChatResponseChain
+from cobuy.chatbot.chains.product_info import (
+    ProductInfoReasoningChain,
+    ProductInfoResponseChain,
+)
+from cobuy.chatbot.chains.router import FallbackRouterChain, RouterChain
+from cobuy.chatbot.engine import BotEngine, IntentRouter
+from cobuy.chatbot.memory import MemoryManager
+from cobuy.chatbot.reloading import ReloadableComponent
+from cobuy.chatbot.router.loader import FILE_PATH as LAYER_PATH
+from cobuy.chatbot.router.route_layer import MatrixRouteLayer
+from cobuy.chatbot.telemetry import Telemetry
+
+# Support documents indexed by the stub vector store
+SUPPORT_DOCUMENTS = [
+    "Standard delivery takes 3 to 5 business days and is free for orders over 50 euros.",
+    "Products can be returned within 30 days of delivery for a full refund.",
+    "Every product comes with a two-year warranty covering manufacturing defects.",
+    "We accept credit cards, PayPal and bank transfers. Payment is charged at checkout.",
+    "Customer support is available by chat and email every day from 9am to 9pm.",
+    "User manuals can be downloaded from the product page in PDF format.",
+]
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model stand-in that sleeps for a fixed latency and replies by rule.
+
+    The reply is the first rule whose pattern appears in the rendered prompt, or
+    `default` when no rule matches. When streamed, the reply is split on spaces and
+    each token takes `token_latency` after the initial `latency`. Used to benchmark
+    the bot's own overhead and concurrency without network access.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    rules: List[Tuple[str, str]] = []
+    default: str = "OK"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        self.calls += 1
+        prompt = "\n".join(str(message.content) for message in messages)
+        return next(
+            (reply for pattern, reply in self.rules if pattern in prompt),
+            self.default,
+        )
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        words = self._reply(messages).split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(messages):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(messages):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self.bind()
+
+
+def build_stub_vector_store(
+    embeddings: Embeddings, texts: List[str] = SUPPORT_DOCUMENTS
+) -> LocalVectorStore:
+    """Build a local vector store holding the given support documents."""
+    vector_store = LocalVectorStore(embeddings)
+    vector_store.add_texts(texts)
+    return vector_store
+
+
+class HashingEncoder(BaseEncoder):
+    """Route layer encoder stand-in using `hash_embedding` after a fixed latency."""
+
+    name: str = "hashing"
+    type: str = "hashing"
+    score_threshold: float = 0.3
+    size: int = 256
+    latency: float = 0.0
+
+    def __call__(self, docs: List[Any]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [hash_embedding(doc, self.size) for doc in docs]
+
+
+def build_stub_route_layer(encoder: BaseEncoder) -> MatrixRouteLayer:
+    """Build a route layer with the routes of `router/layer.json` on another encoder.
+
+    Args:
+        encoder: The encoder replacing the sentence transformer. Its score
+            threshold applies to every route.
+
+    Returns:
+        The route layer.
+    """
+    with open(LAYER_PATH) as file:
+        config = json.load(file)
+    routes = [
+        Route(name=route["name"], utterances=route["utterances"])
+        for route in config["routes"]
+    ]
+    return MatrixRouteLayer(encoder=encoder, routes=routes, embeddings_dir=None)
+
+
+class StubRouter:
+    """Route layer stand-in that always returns the same intent."""
+
+    def __init__(self, intent: Optional[str]):
+        self.intent = intent
+
+    def encoder(self, docs: List[str]) -> List[List[float]]:
+        return [[0.0] for _ in docs]
+
+    def retrieve_multiple_routes(self, text=None, vector=None) -> List[RouteChoice]:
+        if self.intent is None:
+            return []
+        return [RouteChoice(name=self.intent, similarity_score=1.0)]
+
+
+def build_stub_engine(llm: BaseChatModel, intent: Optional[str] = None):
+    """Build an engine stand-in whose chains and agent run on `llm`.
+
+    The RAG pipeline is left out, so the support information intent is not
+    available.
+
+    Args:
+        llm: The chat model shared by every chain.
+        intent: The intent returned by the stub router, None for no route.
+
+    Returns:
+        An object exposing the attributes of BotEngine used by a bot session.
+    """
+    router = StubRouter(intent)
+    engine = SimpleNamespace(
+        settings=None,
+        memory=MemoryManager(),
+        telemetry=Telemetry(),
+        llm=llm,
+        executor=ThreadPoolExecutor(),
+        intention_classifier=router,
+        router_encoder=router.encoder,
+        intent_router=ReloadableComponent(lambda: IntentRouter(router, router.encoder)),
+        local_classifier=None,
+        prefetcher=None,
+        response_cache=None,
+        conversation_lock=lambda user_id, conversation_id: threading.Lock(),
+        async_conversation_lock=lambda user_id, conversation_id: asyncio.Lock(),
+    )
+
+    def add_memory(runnable):
+        return BotEngine.add_memory_to_runnable(engine, runnable)
+
+    engine.chain_map = {
+        "product_information": {
+            "reasoning": ProductInfoReasoningChain(llm=llm),
+            "response": add_memory(ProductInfoResponseChain(llm=llm)),
+        },
+        "chitchat": {
+            "reasoning": ChitChatClassifierChain(llm=llm),
+            "response": add_memory(ChitChatResponseChain(llm=llm)),
+        },
+        "router": {"reasoning": RouterChain(llm=llm)},
+        "fallback": {"reasoning": FallbackRouterChain(llm=llm)},
+    }
+    engine.agent_map = {"order": add_memory(OrderAgent(llm=llm).agent_executor)}
+    return engine
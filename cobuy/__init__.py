@@ -1,4 +1,5 @@
 from cobuy.chatbot.bot import CustomerServiceBot
 from cobuy.chatbot.dev_bot import DevCustomerServiceBot
+from cobuy.chatbot.engine import BotEngine
 
-__all__ = ["CustomerServiceBot", "DevCustomerServiceBot"]
+__all__ = ["BotEngine", "CustomerServiceBot", "DevCustomerServiceBot"]
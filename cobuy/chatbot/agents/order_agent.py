@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_openai import ChatOpenAI
@@ -9,12 +9,15 @@ from cobuy.chatbot.tools.get_order import GetOrderTool
 
 
 class OrderAgent:
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: ChatOpenAI, tools_llm: Optional[ChatOpenAI] = None):
         self.llm = llm
         self._agent_executor = None  # Placeholder for lazy initialization
 
-        create_order_tool = CreateOrderTool()
-        check_order_tool = GetOrderTool()
+        # The tools' reasoning chains share the agent's language model unless
+        # another one is given
+        self.tools_llm = tools_llm if tools_llm is not None else llm
+        create_order_tool = CreateOrderTool(llm=self.tools_llm)
+        check_order_tool = GetOrderTool(llm=self.tools_llm)
         self.tools: List = [create_order_tool, check_order_tool]
 
         # Define the prompt template for product identification
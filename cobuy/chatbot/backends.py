@@ -0,0 +1,267 @@
+# Import necessary modules and classes
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore, VectorStore
+
+from cobuy.chatbot.cache.embeddings import CachedQueryEmbeddings, QueryEmbeddingCache
+from cobuy.data.loader import BASE_DIR as DATA_DIR
+
+# Backend profiles: "openai" uses OpenAI and Pinecone, "offline" runs in-process
+BACKENDS = ("openai", "offline")
+
+# Environment variable selecting the backend when none is configured
+BACKEND_ENV_VAR = "COBUY_BACKEND"
+
+# File holding the offline vector store, written by `generate_embeddings.py`
+OFFLINE_INDEX_PATH = os.path.join(DATA_DIR, "pdfs", "offline_index.json")
+
+# Locates the JSON schema in the format instructions of a PydanticOutputParser
+_SCHEMA_PATTERN = re.compile(
+    r"Here is the output schema:\s*```\s*(\{.*?\})\s*```", re.DOTALL
+)
+
+
+def get_backend(backend: Optional[str] = None) -> str:
+    """Resolve the backend to use.
+
+    Args:
+        backend: The backend name, or None to read `COBUY_BACKEND` (default "openai").
+
+    Returns:
+        The backend name.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = backend or os.getenv(BACKEND_ENV_VAR) or "openai"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    return backend
+
+
+def schema_example(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None):
+    """Build the simplest instance of a JSON schema.
+
+    Defaults and the first allowed value of enums are used where present; other
+    values are empty (empty strings and lists, zero, false).
+
+    Args:
+        schema: A JSON schema as generated by pydantic.
+        defs: The definitions referenced by `$ref`, taken from `schema` if None.
+
+    Returns:
+        A JSON-compatible value valid against the schema.
+    """
+    defs = schema.get("$defs", {}) if defs is None else defs
+
+    if "$ref" in schema:
+        return schema_example(defs[schema["$ref"].split("/")[-1]], defs)
+    if "default" in schema:
+        return schema["default"]
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return schema_example(schema["anyOf"][0], defs)
+    if "allOf" in schema:
+        return schema_example(schema["allOf"][0], defs)
+
+    kind = schema.get("type", "object" if "properties" in schema else "null")
+    if kind == "object":
+        return {
+            name: schema_example(field, defs)
+            for name, field in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        item = schema_example(schema.get("items", {}), defs)
+        return [item] * schema.get("minItems", 0)
+    return {"string": "", "integer": 0, "number": 0.0, "boolean": False}.get(kind)
+
+
+class OfflineChatModel(BaseChatModel):
+    """Deterministic chat model answering without a language model.
+
+    When the prompt carries the format instructions of a PydanticOutputParser, the
+    reply is the simplest instance of the requested schema (see `schema_example`),
+    so every structured chain parses it. Otherwise the reply is `response`. Tools
+    can be bound but are never called.
+    """
+
+    response: str = "This is an offline response, no language model was called."
+    latency: float = 0.0  # Seconds slept per call, to emulate a remote model
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"response": self.response}
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        match = _SCHEMA_PATTERN.search(prompt)
+        content = (
+            json.dumps(schema_example(json.loads(match.group(1))))
+            if match
+            else self.response
+        )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        """Accept tools, which the model never calls."""
+        return self.bind()
+
+
+def hash_embedding(text: str, size: int = 256) -> List[float]:
+    """Embed a text by hashing its words into a normalised bag-of-words vector.
+
+    Texts sharing words get similar vectors, which is enough for routing and
+    retrieval to behave plausibly without a model.
+    """
+    vector = np.zeros(size, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        vector[zlib.crc32(word.encode()) % size] += 1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class HashingEmbeddings(Embeddings):
+    """Local embeddings computed by `hash_embedding`."""
+
+    def __init__(self, size: int = 256, latency: float = 0.0):
+        """Initialize the embeddings.
+
+        Args:
+            size: Dimension of the vectors.
+            latency: Seconds slept per call, to emulate a remote model.
+        """
+        self.size = size
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [hash_embedding(text, self.size) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [hash_embedding(text, self.size) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class LocalVectorStore(InMemoryVectorStore):
+    """In-process vector store whose relevance scores are its cosine similarities."""
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: score
+
+
+def create_chat_model(backend: Optional[str] = None, **kwargs: Any) -> BaseChatModel:
+    """Create the chat model of a backend.
+
+    Args:
+        backend: The backend name, see `get_backend`.
+        **kwargs: Arguments of ChatOpenAI, ignored offline.
+
+    Returns:
+        ChatOpenAI or OfflineChatModel.
+    """
+    if get_backend(backend) == "offline":
+        return OfflineChatModel()
+
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(**kwargs)
+
+
+def create_embeddings(
+    backend: Optional[str] = None, model: str = "text-embedding-3-small"
+) -> Embeddings:
+    """Create the embeddings of a backend.
+
+    Args:
+        backend: The backend name, see `get_backend`.
+        model: The OpenAI embeddings model, ignored offline.
+
+    Returns:
+        OpenAIEmbeddings or HashingEmbeddings.
+    """
+    if get_backend(backend) == "offline":
+        return HashingEmbeddings()
+
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=model)
+
+
+def create_vector_store(
+    backend: Optional[str] = None,
+    index_name: str = "rag",
+    embeddings_model: str = "text-embedding-3-small",
+    query_cache: Optional[QueryEmbeddingCache] = None,
+) -> VectorStore:
+    """Create the vector store of a backend.
+
+    Offline, the store is loaded from `OFFLINE_INDEX_PATH` if `generate_embeddings.py`
+    wrote it, and is empty otherwise.
+
+    Args:
+        backend: The backend name, see `get_backend`.
+        index_name: The Pinecone index, ignored offline.
+        embeddings_model: The OpenAI embeddings model, ignored offline.
+        query_cache: Cache of the query embeddings, None to embed every query.
+
+    Returns:
+        PineconeVectorStore or LocalVectorStore.
+    """
+    embeddings = create_embeddings(backend, embeddings_model)
+    if query_cache is not None:
+        embeddings = CachedQueryEmbeddings(
+            embeddings, query_cache, f"{get_backend(backend)}:{embeddings_model}"
+        )
+    if get_backend(backend) == "offline":
+        if os.path.exists(OFFLINE_INDEX_PATH):
+            return LocalVectorStore.load(OFFLINE_INDEX_PATH, embeddings)
+        return LocalVectorStore(embeddings)
+
+    from langchain_pinecone import PineconeVectorStore
+    from pinecone import Pinecone
+
+    return PineconeVectorStore(index=Pinecone().Index(index_name), embedding=embeddings)
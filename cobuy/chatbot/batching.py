@@ -0,0 +1,187 @@
+# Import necessary modules and classes
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+# Queued by `MicroBatcher.close` to stop the worker
+_STOP = object()
+
+
+class BatchingStats:
+    """Thread-safe counters of a micro-batcher."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.batches = 0  # Calls of the batched function
+        self.items = 0  # Items processed by those calls
+        self.max_batch_size = 0
+
+    def record(self, batch_size: int) -> None:
+        """Record a call of the batched function on `batch_size` items."""
+        with self._lock:
+            self.batches += 1
+            self.items += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and the mean batch size."""
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+            }
+
+
+class MicroBatcher:
+    """Collect items submitted by concurrent callers and process them together.
+
+    A worker thread waits for a first item, keeps collecting for up to `max_wait`
+    seconds or until `max_batch_size` items are pending, then calls the batched
+    function once. Items arriving while a batch is processed form the next one,
+    so under load batches grow without waiting for the window.
+    """
+
+    def __init__(
+        self,
+        function: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.002,
+        name: str = "cobuy-batcher",
+    ):
+        """Initialize the batcher; its worker starts with the first submission.
+
+        Args:
+            function: Processes a list of items, returning one result per item.
+            max_batch_size: Most items processed by one call.
+            max_wait: Longest time the first item of a batch waits for others, in
+                seconds.
+            name: Name of the worker thread.
+        """
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self.stats = BatchingStats()
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item.
+
+        Args:
+            item: The item to process.
+
+        Returns:
+            A future resolving to the result of the item, or raising the error of
+            its batch.
+        """
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._worker.start()
+
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def map(self, items: Sequence[Any]) -> List[Any]:
+        """Process items, possibly batched with those of other callers.
+
+        Args:
+            items: The items to process.
+
+        Returns:
+            Their results, in order.
+        """
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        """Stop the worker once the queued items are processed; a later submission
+        starts a new one.
+        """
+        with self._lock:
+            if self._worker is not None:
+                self._queue.put(_STOP)
+                self._worker = None
+
+    def _collect(self) -> List[Any]:
+        """Block until a batch is ready and return its (item, future) pairs, or an
+        empty list once the batcher is closed.
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = (
+                    self._queue.get(timeout=timeout)
+                    if timeout > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Process the batch first, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self.function(items)
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.stats.record(len(batch))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class BatchingEncoder:
+    """Encoder sharing batched forward passes between concurrent callers.
+
+    Texts encoded by concurrent turns within the batch window go through the
+    wrapped encoder together, instead of one forward pass each.
+    """
+
+    def __init__(self, encoder: Callable[[List[str]], List[List[float]]], **kwargs):
+        """Initialize the encoder.
+
+        Args:
+            encoder: The wrapped encoder, mapping texts to embeddings.
+            **kwargs: Arguments of MicroBatcher.
+        """
+        self.encoder = encoder
+        self.batcher = MicroBatcher(encoder, name="cobuy-encoder", **kwargs)
+
+    @property
+    def stats(self) -> BatchingStats:
+        """Counters of the batched passes."""
+        return self.batcher.stats
+
+    def close(self) -> None:
+        """Stop the worker thread, releasing the wrapped encoder."""
+        self.batcher.close()
+
+    def __call__(self, docs: List[str]) -> List[List[float]]:
+        return self.batcher.map(docs)
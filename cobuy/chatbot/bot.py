@@ -1,37 +1,64 @@
 # Import necessary classes and modules for chatbot functionality
-from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from langchain.schema.runnable.base import Runnable
+from langchain.schema.runnable.base import Runnable, RunnableLambda
+from langchain_core.messages import get_buffer_string
 from langchain_core.messages.ai import AIMessage
+from langchain_core.messages.human import HumanMessage
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_openai import ChatOpenAI
+from semantic_router.schema import RouteChoice
 
-from cobuy.chatbot.agents.order_agent import OrderAgent
-from cobuy.chatbot.chains.chitchat import ChitChatClassifierChain, ChitChatResponseChain
-from cobuy.chatbot.chains.product_info import (
-    ProductInfoReasoningChain,
-    ProductInfoResponseChain,
+from cobuy.chatbot.engine import BotEngine
+from cobuy.chatbot.streaming import (
+    aiterate_in_task,
+    astream_agent_answer,
+    iterate_in_thread,
+    iterate_in_worker,
 )
-from cobuy.chatbot.chains.router import RouterChain
-from cobuy.chatbot.memory import MemoryManager
-from cobuy.chatbot.rag.rag import RAGPipeline
-from cobuy.chatbot.router.loader import load_intention_classifier
+from cobuy.chatbot.telemetry import set_intent, span
+
+logger = logging.getLogger(__name__)
 
 
 class CustomerServiceBot:
     """A bot that handles customer service interactions by processing user inputs and
     routing them through configured reasoning and response chains.
+
+    Instances are lightweight per-conversation sessions: the language model, chains,
+    agent, RAG pipeline and router are owned by a shared `BotEngine`.
     """
 
-    def __init__(self, user_id: str, conversation_id: str):
-        """Initialize the bot with session and language model configurations.
+    __slots__ = ("engine", "user_id", "conversation_id", "memory_config")
+
+    def __init__(
+        self,
+        user_id: str,
+        conversation_id: str,
+        engine: Optional[BotEngine] = None,
+    ):
+        """Initialize the bot session on top of a shared engine.
 
         Args:
             user_id: Identifier for the user.
             conversation_id: Identifier for the conversation.
+            engine: The engine to run the conversation on. Defaults to the
+                process-wide shared engine.
         """
-        # Initialize the memory manager to manage session history
-        self.memory = MemoryManager()
+        self.engine = engine if engine is not None else BotEngine.shared()
         self.user_id = user_id
         self.conversation_id = conversation_id
         self.memory_config = {
@@ -40,52 +67,87 @@ class CustomerServiceBot:
                 "conversation_id": self.conversation_id,
             }
         }
-        # Configure the language model with specific parameters for response generation
-        self.llm = ChatOpenAI(temperature=0.0, model="gpt-4o-mini")
-
-        # Map intent names to their corresponding reasoning and response chains
-        self.chain_map = {
-            "product_information": {
-                "reasoning": ProductInfoReasoningChain(llm=self.llm),  # Reasoning chain
-                "response": self.add_memory_to_runnable(
-                    ProductInfoResponseChain(llm=self.llm)  # Response chain with memory
-                ),
-            },
-            "chitchat": {
-                "reasoning": ChitChatClassifierChain(llm=self.llm),
-                "response": self.add_memory_to_runnable(
-                    ChitChatResponseChain(llm=self.llm)
-                ),
-            },
-            "router": {
-                "reasoning": RouterChain(llm=self.llm),
-            },
-        }
 
-        self.agent_map = {
-            "order": self.add_memory_to_runnable(
-                OrderAgent(llm=self.llm).agent_executor
-            )
-        }
+    @property
+    def memory(self):
+        """The memory manager shared by every conversation of the engine."""
+        return self.engine.memory
 
-        self.rag = self.add_memory_to_runnable(
-            RAGPipeline(
-                index_name="rag",
-                embeddings_model="text-embedding-3-small",
-                llm=self.llm,
-                memory=True,
-            ).rag_chain
-        )
+    @property
+    def llm(self):
+        """The language model shared by every conversation of the engine."""
+        return self.engine.llm
+
+    @property
+    def chain_map(self):
+        """Map of intent names to their reasoning and response chains."""
+        return self.engine.chain_map
+
+    @property
+    def agent_map(self):
+        """Map of intent names to their agents."""
+        return self.engine.agent_map
+
+    @property
+    def rag(self):
+        """The RAG chain used for support information."""
+        return self.engine.rag
 
-        # Load the intention classifier to determine user intents
-        self.intention_classifier = load_intention_classifier()
+    @property
+    def intention_classifier(self):
+        """The route layer used to classify user intents."""
+        return self.engine.intention_classifier
 
-        # Map of intentions to their corresponding handlers
-        self.intent_handlers: Dict[Optional[str], Callable[[Dict[str, str]], str]] = {
+    @property
+    def intent_handlers(
+        self,
+    ) -> Dict[Optional[str], Callable[[Dict[str, str]], str]]:
+        """Map of intentions to their corresponding handlers."""
+        return {
             "product_information": self.handle_product_information,
             "create_order": self.handle_order_intent,
             "order_status": self.handle_order_intent,
             "support_information": self.handle_support_information,
+            "chitchat": self.handle_chitchat_intent,
+        }
+
+    @property
+    def async_intent_handlers(
+        self,
+    ) -> Dict[Optional[str], Callable[[Dict[str, str]], Awaitable[str]]]:
+        """Async counterparts of the intent handlers, used by `aprocess_user_input`."""
+        return {
+            "product_information": self.ahandle_product_information,
+            "create_order": self.ahandle_order_intent,
+            "order_status": self.ahandle_order_intent,
+            "support_information": self.ahandle_support_information,
+            "chitchat": self.ahandle_chitchat_intent,
+        }
+
+    @property
+    def stream_intent_handlers(
+        self,
+    ) -> Dict[Optional[str], Callable[[Dict[str, str]], Iterator[str]]]:
+        """Streaming counterparts of the intent handlers, used by `stream_user_input`."""
+        return {
+            "product_information": self.stream_product_information,
+            "create_order": self.stream_order_intent,
+            "order_status": self.stream_order_intent,
+            "support_information": self.stream_support_information,
+            "chitchat": self.stream_chitchat_intent,
+        }
+
+    @property
+    def astream_intent_handlers(
+        self,
+    ) -> Dict[Optional[str], Callable[[Dict[str, str]], AsyncIterator[str]]]:
+        """Async streaming intent handlers, used by `astream_user_input`."""
+        return {
+            "product_information": self.astream_product_information,
+            "create_order": self.astream_order_intent,
+            "order_status": self.astream_order_intent,
+            "support_information": self.astream_support_information,
+            "chitchat": self.astream_chitchat_intent,
         }
 
     def add_memory_to_runnable(
@@ -99,17 +161,7 @@ class CustomerServiceBot:
         Returns:
             An instance of RunnableWithMessageHistory that incorporates session history.
         """
-        return RunnableWithMessageHistory(
-            runnable=original_runnable,
-            get_session_history=self.memory.get_session_history,  # Retrieve session history
-            input_messages_key="customer_input",  # Key for user inputs
-            history_messages_key="chat_history",  # Key for chat history
-            history_factory_config=self.memory.get_history_factory_config(),  # Config for history factory
-        ).with_config(
-            {
-                "run_name": original_runnable.__class__.__name__
-            }  # Add runnable name for tracking
-        )
+        return self.engine.add_memory_to_runnable(original_runnable)
 
     def get_chain(self, intent: str) -> Tuple[Optional[Runnable], Optional[Runnable]]:
         """Retrieve the reasoning and response chains based on user intent.
@@ -149,13 +201,73 @@ class CustomerServiceBot:
         Returns:
             The classified intent of the user input.
         """
-        # Retrieve possible routes for the user's input using the classifier
-        intent_routes = self.intention_classifier.retrieve_multiple_routes(
-            user_input["customer_input"]
-        )
+        return self.classify_user_input(user_input)[0]
+
+    def classify_user_input(
+        self, user_input: Dict[str, str]
+    ) -> Tuple[Optional[str], List[float]]:
+        """Classify the user intent and return the embedding used by the router.
+
+        Inputs the route layer cannot place go to the local classifier, if any.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The classified intent ("chitchat" included), or None to leave it to
+            the LLM fallback, and the embedding of the input text.
+        """
+        # Encode the input, then retrieve the possible routes for its vector, with
+        # the same router even if a retrained one is swapped in meanwhile
+        with self.engine.intent_router.lease() as router:
+            with span("router.encode"):
+                vector = router.encoder([user_input["customer_input"]])[0]
+            with span("router.match"):
+                intent_routes = router.classifier.retrieve_multiple_routes(
+                    vector=vector
+                )
+
+        logger.debug("Intent routes: %s", intent_routes)
+
+        intention = self._intent_from_routes(intent_routes)
+        if intention is None:
+            intention = self.classify_unrouted(vector, router.local_classifier)
+        return intention, vector
+
+    def classify_unrouted(
+        self, vector: List[float], local_classifier: Optional[Any]
+    ) -> Optional[str]:
+        """Classify an input the route layer could not place with the local
+        classifier, sparing the LLM fallback when it is confident.
+
+        Args:
+            vector: The embedding of the input text.
+            local_classifier: The local classifier of the router that encoded the
+                input, None if disabled or not trained for its encoder.
+
+        Returns:
+            The intent or "chitchat", or None if the local classifier is disabled
+            or not confident enough.
+        """
+        if local_classifier is None:
+            return None
 
-        print("Intent Routes:", intent_routes)
+        with span("router.local") as attributes:
+            intention, attributes["confidence"] = local_classifier.predict(vector)
+        logger.debug("Local intent: %s", intention)
+        return intention
 
+    @staticmethod
+    def _intent_from_routes(intent_routes: List[RouteChoice]) -> Optional[str]:
+        """Pick the intent from the routes matched by the classifier.
+
+        Args:
+            intent_routes: The routes retrieved for the user input.
+
+        Returns:
+            The name of the first matched route, "None" for a route without a name,
+            or None if no route matched.
+        """
         # Handle cases where no intent is identified
         if len(intent_routes) == 0:
             return None
@@ -168,11 +280,156 @@ class CustomerServiceBot:
         else:
             return intention
 
-    def handle_product_information(self, user_input: Dict[str, str]) -> str:
+    def get_user_intents(
+        self, user_inputs: List[Dict[str, str]]
+    ) -> List[Optional[str]]:
+        """Classify the intents of many inputs with a single encoder pass.
+
+        Args:
+            user_inputs: The inputs from the users.
+
+        Returns:
+            The classified intent of each input, in input order.
+        """
+        if not user_inputs:
+            return []
+
+        # Encode every message at once, then match each vector against the routes
+        with self.engine.intent_router.lease() as router:
+            with span("router.encode", batch_size=len(user_inputs)):
+                vectors = router.encoder(
+                    [user_input["customer_input"] for user_input in user_inputs]
+                )
+            with span("router.match", batch_size=len(user_inputs)):
+                intentions = [
+                    self._intent_from_routes(
+                        router.classifier.retrieve_multiple_routes(vector=vector)
+                    )
+                    for vector in vectors
+                ]
+        return [
+            (
+                self.classify_unrouted(vector, router.local_classifier)
+                if intention is None
+                else intention
+            )
+            for intention, vector in zip(intentions, vectors)
+        ]
+
+    async def aget_user_intent(self, user_input: Dict[str, str]):
+        """Asynchronously classify the user intent based on the input text.
+
+        The route layer encodes the input locally on the CPU, so it runs in a worker
+        thread to keep the event loop free for other conversations.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The classified intent of the user input.
+        """
+        return (await self.aclassify_user_input(user_input))[0]
+
+    async def aclassify_user_input(
+        self, user_input: Dict[str, str]
+    ) -> Tuple[Optional[str], List[float]]:
+        """Asynchronously classify the user intent and return the input embedding.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The classified intent and the embedding of the input text.
+        """
+        return await asyncio.to_thread(self.classify_user_input, user_input)
+
+    def cache_vector(self, vector: List[float]) -> Optional[List[float]]:
+        """Return the key of the input in the response cache.
+
+        The key is only the message embedding, so a message following earlier
+        turns, such as "how much is it?", is not keyed: its answer depends on the
+        conversation and must not be served to, or from, another one.
+
+        Args:
+            vector: The embedding of the input text computed by the router.
+
+        Returns:
+            The vector, or None if the response cache is disabled or the
+            conversation has history.
+        """
+        if self.engine.response_cache is None:
+            return None
+        history = self.memory.get_session_history(self.user_id, self.conversation_id)
+        if self.memory.window(history, summarize=False):
+            return None
+        return vector
+
+    def get_cached_response(
+        self,
+        user_input: Dict[str, str],
+        intention: Optional[str],
+        vector: Optional[List[float]],
+    ) -> Optional[str]:
+        """Look up a cached response for the input and record the turn in history.
+
+        Args:
+            user_input: The input text from the user.
+            intention: The classified intent of the input.
+            vector: The key of the input returned by `cache_vector`.
+
+        Returns:
+            The cached response, or None if the response cache is disabled, the
+            input has no key, the intent is not cached or no similar query was
+            answered before.
+        """
+        cache = self.engine.response_cache
+        if cache is None or vector is None:
+            return None
+
+        with span("cache.lookup"):
+            response = cache.lookup(intention, vector)
+
+        if response is not None:
+            # The chains write the history of a turn; a cache hit skips them
+            self.memory.get_session_history(
+                self.user_id, self.conversation_id
+            ).add_messages(
+                [
+                    HumanMessage(content=user_input["customer_input"]),
+                    AIMessage(content=response),
+                ]
+            )
+
+        return response
+
+    def cache_response(
+        self,
+        intention: Optional[str],
+        vector: Optional[List[float]],
+        response: str,
+        started: float,
+    ) -> None:
+        """Store a generated response in the response cache, if enabled.
+
+        Args:
+            intention: The classified intent of the input.
+            vector: The key of the input returned by `cache_vector`, None to skip.
+            response: The generated response.
+            started: `time.perf_counter()` reading taken before generating it.
+        """
+        cache = self.engine.response_cache
+        if cache is not None and vector is not None:
+            latency_ms = (time.perf_counter() - started) * 1000
+            cache.store(intention, vector, response, latency_ms)
+
+    def handle_product_information(
+        self, user_input: Dict[str, str], prefetched: Optional[Dict[str, str]] = None
+    ) -> str:
         """Handle the product information intent by processing user input and providing a response.
 
         Args:
             user_input: The input text from the user.
+            prefetched: Output of the reasoning chain computed speculatively, if any.
 
         Returns:
             The content of the response after processing through the chains.
@@ -180,8 +437,10 @@ class CustomerServiceBot:
         # Retrieve reasoning and response chains for the product information intent
         reasoning_chain, response_chain = self.get_chain("product_information")
 
-        # Process user input through the reasoning chain
-        reasoning_output: AIMessage = reasoning_chain.invoke(user_input)
+        # Process user input through the reasoning chain unless it was prefetched
+        reasoning_output: AIMessage = (
+            prefetched if prefetched is not None else reasoning_chain.invoke(user_input)
+        )
 
         # Generate a response using the output of the reasoning chain
         response: AIMessage = response_chain.invoke(
@@ -190,6 +449,31 @@ class CustomerServiceBot:
 
         return response.content
 
+    async def ahandle_product_information(
+        self, user_input: Dict[str, str], prefetched: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Asynchronously handle the product information intent.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Output of the reasoning chain computed speculatively, if any.
+
+        Returns:
+            The content of the response after processing through the chains.
+        """
+        reasoning_chain, response_chain = self.get_chain("product_information")
+
+        if prefetched is not None:
+            reasoning_output: AIMessage = prefetched
+        else:
+            reasoning_output = await reasoning_chain.ainvoke(user_input)
+
+        response: AIMessage = await response_chain.ainvoke(
+            reasoning_output, config=self.memory_config
+        )
+
+        return response.content
+
     def handle_order_intent(self, user_input: Dict[str, str]) -> str:
         """Handle the order intent by processing user input and providing a response.
 
@@ -213,12 +497,65 @@ class CustomerServiceBot:
 
         return response["output"]
 
-    def handle_support_information(self, user_input: Dict[str, str]) -> str:
+    async def ahandle_order_intent(self, user_input: Dict[str, str]) -> str:
+        """Asynchronously handle the order intent.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The content of the response after processing through the agent.
+        """
+        agent = self.get_agent("order")
+
+        response: Dict[str, str] = await agent.ainvoke(
+            {
+                "customer_id": self.user_id,
+                "customer_input": user_input["customer_input"],
+            },
+            config=self.memory_config,
+        )
+
+        return response["output"]
+
+    def handle_support_information(
+        self, user_input: Dict[str, str], prefetched: Optional[str] = None
+    ) -> str:
+        """Handle the support information intent through the RAG chain.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Retrieved context computed speculatively, if any.
+
+        Returns:
+            The answer generated from the retrieved support documents.
+        """
+        if prefetched is not None:
+            user_input = {**user_input, "context": prefetched}
 
         response = self.rag.invoke(user_input, config=self.memory_config)
 
         return response
 
+    async def ahandle_support_information(
+        self, user_input: Dict[str, str], prefetched: Optional[str] = None
+    ) -> str:
+        """Asynchronously handle the support information intent.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Retrieved context computed speculatively, if any.
+
+        Returns:
+            The answer generated from the retrieved support documents.
+        """
+        if prefetched is not None:
+            user_input = {**user_input, "context": prefetched}
+
+        response = await self.rag.ainvoke(user_input, config=self.memory_config)
+
+        return response
+
     def handle_chitchat_intent(self, user_input: Dict[str, str]) -> str:
         """Handle the chitchat intent by providing a response.
 
@@ -233,14 +570,30 @@ class CustomerServiceBot:
         response = chitchat_response_chain.invoke(user_input, config=self.memory_config)
         return response
 
-    def handle_unknown_intent(self, user_input: Dict[str, str]) -> str:
-        """Handle unknown intents by providing a chitchat response.
+    async def ahandle_chitchat_intent(self, user_input: Dict[str, str]) -> str:
+        """Asynchronously handle the chitchat intent.
 
         Args:
             user_input: The input text from the user.
 
         Returns:
-            The content of the response after processing through the new chain.
+            The content of the response after processing through the chitchat chain.
+        """
+        _, chitchat_response_chain = self.get_chain("chitchat")
+
+        response = await chitchat_response_chain.ainvoke(
+            user_input, config=self.memory_config
+        )
+        return response
+
+    def get_fallback_input(self, user_input: Dict[str, str]) -> Dict[str, Any]:
+        """Build the input shared by the LLM fallback classifiers.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The input message for the chitchat and router classification chains.
         """
         possible_intention = [
             "Product Information",
@@ -250,29 +603,89 @@ class CustomerServiceBot:
             "Chitchat",
         ]
 
-        chitchat_reasoning_chain, _ = self.get_chain("chitchat")
-
         input_message = {}
 
         input_message["customer_input"] = user_input["customer_input"]
         input_message["possible_intentions"] = possible_intention
-        input_message["chat_history"] = self.memory.get_session_history(
-            self.user_id, self.conversation_id
+        # Only the windowed history, rendered as text for the system prompts. The
+        # summary is not refreshed here; the response chains do that.
+        input_message["chat_history"] = get_buffer_string(
+            self.memory.window(
+                self.memory.get_session_history(self.user_id, self.conversation_id),
+                summarize=False,
+            )
         )
 
-        reasoning_output1 = chitchat_reasoning_chain.invoke(input_message)
+        return input_message
+
+    def classify_unknown_intent(self, user_input: Dict[str, str]) -> str:
+        """Classify an input the semantic router could not place.
+
+        A single LLM call decides between chitchat and the intents.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            "chitchat" or the intent returned by the fallback router chain.
+        """
+        fallback_reasoning_chain, _ = self.get_chain("fallback")
+        input_message = self.get_fallback_input(user_input)
+
+        return fallback_reasoning_chain.invoke(input_message).intent
+
+    async def aclassify_unknown_intent(self, user_input: Dict[str, str]) -> str:
+        """Asynchronously classify an input the semantic router could not place.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            "chitchat" or the intent returned by the fallback router chain.
+        """
+        fallback_reasoning_chain, _ = self.get_chain("fallback")
+        input_message = self.get_fallback_input(user_input)
+
+        return (await fallback_reasoning_chain.ainvoke(input_message)).intent
+
+    def handle_unknown_intent(self, user_input: Dict[str, str]) -> str:
+        """Handle unknown intents by providing a chitchat response.
+
+        Args:
+            user_input: The input text from the user.
 
-        if reasoning_output1.chitchat:
-            print("Chitchat")
+        Returns:
+            The content of the response after processing through the new chain.
+        """
+        new_intention = self.classify_unknown_intent(user_input)
+
+        if new_intention == "chitchat":
+            logger.debug("Unknown intent handled as chitchat")
             return self.handle_chitchat_intent(user_input)
         else:
-            router_reasoning_chain2, _ = self.get_chain("router")
-            reasoning_output2 = router_reasoning_chain2.invoke(input_message)
-            new_intention = reasoning_output2.intent
-            print("New Intention:", new_intention)
+            logger.debug("New intention: %s", new_intention)
             new_handler = self.intent_handlers.get(new_intention)
             return new_handler(user_input)
 
+    async def ahandle_unknown_intent(self, user_input: Dict[str, str]) -> str:
+        """Asynchronously handle unknown intents.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The content of the response after processing through the new chain.
+        """
+        new_intention = await self.aclassify_unknown_intent(user_input)
+
+        if new_intention == "chitchat":
+            logger.debug("Unknown intent handled as chitchat")
+            return await self.ahandle_chitchat_intent(user_input)
+        else:
+            logger.debug("New intention: %s", new_intention)
+            new_handler = self.async_intent_handlers.get(new_intention)
+            return await new_handler(user_input)
+
     def save_memory(self) -> None:
         """Save the current memory state of the bot."""
         self.memory.save_session_history(self.user_id, self.conversation_id)
@@ -286,11 +699,669 @@ class CustomerServiceBot:
         Returns:
             The content of the response after processing through the chains.
         """
-        # Classify the user's intent based on their input
-        intention = self.get_user_intent(user_input)
+        # Serialise turns of the same conversation across sessions and threads
+        with self.engine.conversation_lock(
+            self.user_id, self.conversation_id
+        ), self.engine.telemetry.turn():
+            # In speculative mode, start the handlers' first stages alongside the router
+            prefetcher = self.engine.prefetcher
+            speculation = prefetcher.start(user_input) if prefetcher else None
+
+            # Classify the user's intent based on their input
+            intention, vector = self.classify_user_input(user_input)
+            set_intent(intention)
+
+            logger.debug("Intent: %s", intention)
+
+            # Serve repeated questions of non-personalised intents from the cache
+            vector = self.cache_vector(vector)
+            response = self.get_cached_response(user_input, intention, vector)
+            if response is not None:
+                if speculation is not None:
+                    speculation.claim(None)  # Discard the prefetched stages
+                return response
+
+            # Route the input based on the identified intention
+            handler = self.intent_handlers.get(intention, self.handle_unknown_intent)
+
+            started = time.perf_counter()
+            prefetched = speculation.claim(intention) if speculation else None
+            if prefetched is not None:
+                response = handler(user_input, prefetched=prefetched)
+            else:
+                response = handler(user_input)
+
+            self.cache_response(intention, vector, response, started)
+            return response
+
+    async def aprocess_user_input(self, user_input: Dict[str, str]) -> str:
+        """Asynchronously process user input through the appropriate intention pipeline.
+
+        Every stage awaits its LLM, retrieval or database call, so a single event loop
+        can serve many conversations concurrently.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The content of the response after processing through the chains.
+        """
+        async with self.engine.async_conversation_lock(
+            self.user_id, self.conversation_id
+        ):
+            with self.engine.telemetry.turn():
+                prefetcher = self.engine.prefetcher
+                speculation = prefetcher.astart(user_input) if prefetcher else None
+
+                intention, vector = await self.aclassify_user_input(user_input)
+                set_intent(intention)
+
+                logger.debug("Intent: %s", intention)
+
+                vector = self.cache_vector(vector)
+
+                response = self.get_cached_response(user_input, intention, vector)
+                if response is not None:
+                    if speculation is not None:
+                        await speculation.claim(None)
+                    return response
+
+                handler = self.async_intent_handlers.get(
+                    intention, self.ahandle_unknown_intent
+                )
+
+                started = time.perf_counter()
+                prefetched = await speculation.claim(intention) if speculation else None
+                if prefetched is not None:
+                    response = await handler(user_input, prefetched=prefetched)
+                else:
+                    response = await handler(user_input)
+
+                self.cache_response(intention, vector, response, started)
+                return response
+
+    def batch_sessions(
+        self, user_inputs: List[Dict[str, str]]
+    ) -> List["CustomerServiceBot"]:
+        """Create one session per batch item on the same engine.
+
+        Items may carry their own "user_id" and "conversation_id"; otherwise each
+        item gets a conversation of its own, derived from this session's identifiers,
+        so replayed messages do not share history. Sessions are plain
+        `CustomerServiceBot`s, whatever the class of this one.
+
+        Args:
+            user_inputs: The inputs of the batch.
+
+        Returns:
+            The session of each item, in input order.
+        """
+        return [
+            CustomerServiceBot(
+                user_input.get("user_id", self.user_id),
+                user_input.get("conversation_id", f"{self.conversation_id}:{i}"),
+                engine=self.engine,
+            )
+            for i, user_input in enumerate(user_inputs)
+        ]
+
+    @staticmethod
+    def _batch_configs(
+        sessions: List["CustomerServiceBot"], max_concurrency: int
+    ) -> List[Dict[str, Any]]:
+        """Build the run configuration of each item of a batch."""
+        return [
+            {**session.memory_config, "max_concurrency": max_concurrency}
+            for session in sessions
+        ]
+
+    def batch_product_information(
+        self,
+        sessions: List["CustomerServiceBot"],
+        user_inputs: List[Dict[str, str]],
+        max_concurrency: int,
+    ) -> List[Union[str, Exception]]:
+        """Handle a group of product information inputs with batched chain calls.
+
+        Args:
+            sessions: The session of each input.
+            user_inputs: The inputs from the users.
+            max_concurrency: Maximum number of chain calls running at once.
+
+        Returns:
+            The response or the error of each input, in input order.
+        """
+        reasoning_chain, response_chain = self.get_chain("product_information")
+
+        results: List[Union[str, Exception]] = reasoning_chain.batch(
+            [dict(user_input) for user_input in user_inputs],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+
+        # Only the inputs whose reasoning succeeded go through the response chain
+        pending = [
+            i for i, result in enumerate(results) if not isinstance(result, Exception)
+        ]
+        responses = response_chain.batch(
+            [results[i] for i in pending],
+            config=self._batch_configs([sessions[i] for i in pending], max_concurrency),
+            return_exceptions=True,
+        )
+        for i, response in zip(pending, responses):
+            results[i] = (
+                response if isinstance(response, Exception) else response.content
+            )
+
+        return results
+
+    def batch_order_intent(
+        self,
+        sessions: List["CustomerServiceBot"],
+        user_inputs: List[Dict[str, str]],
+        max_concurrency: int,
+    ) -> List[Union[str, Exception]]:
+        """Handle a group of order inputs with a batched agent call.
+
+        Args:
+            sessions: The session of each input.
+            user_inputs: The inputs from the users.
+            max_concurrency: Maximum number of agent runs at once.
+
+        Returns:
+            The response or the error of each input, in input order.
+        """
+        agent = self.get_agent("order")
+
+        responses = agent.batch(
+            [
+                {
+                    "customer_id": session.user_id,
+                    "customer_input": user_input["customer_input"],
+                }
+                for session, user_input in zip(sessions, user_inputs)
+            ],
+            config=self._batch_configs(sessions, max_concurrency),
+            return_exceptions=True,
+        )
+
+        return [
+            response if isinstance(response, Exception) else response["output"]
+            for response in responses
+        ]
+
+    def batch_support_information(
+        self,
+        sessions: List["CustomerServiceBot"],
+        user_inputs: List[Dict[str, str]],
+        max_concurrency: int,
+    ) -> List[Union[str, Exception]]:
+        """Handle a group of support information inputs with a batched RAG call.
+
+        Args:
+            sessions: The session of each input.
+            user_inputs: The inputs from the users.
+            max_concurrency: Maximum number of RAG runs at once.
+
+        Returns:
+            The answer or the error of each input, in input order.
+        """
+        return self.rag.batch(
+            [
+                {"customer_input": user_input["customer_input"]}
+                for user_input in user_inputs
+            ],
+            config=self._batch_configs(sessions, max_concurrency),
+            return_exceptions=True,
+        )
+
+    def batch_chitchat_intent(
+        self,
+        sessions: List["CustomerServiceBot"],
+        user_inputs: List[Dict[str, str]],
+        max_concurrency: int,
+    ) -> List[Union[str, Exception]]:
+        """Handle a group of chitchat inputs with a batched chain call.
+
+        Args:
+            sessions: The session of each input.
+            user_inputs: The inputs from the users.
+            max_concurrency: Maximum number of chain calls running at once.
+
+        Returns:
+            The response or the error of each input, in input order.
+        """
+        _, chitchat_response_chain = self.get_chain("chitchat")
+
+        return chitchat_response_chain.batch(
+            [
+                {"customer_input": user_input["customer_input"]}
+                for user_input in user_inputs
+            ],
+            config=self._batch_configs(sessions, max_concurrency),
+            return_exceptions=True,
+        )
+
+    def batch_unknown_intent(
+        self,
+        sessions: List["CustomerServiceBot"],
+        user_inputs: List[Dict[str, str]],
+        max_concurrency: int,
+    ) -> List[Union[str, Exception]]:
+        """Handle a group of inputs without a known intent.
+
+        The fallback decides per input between chitchat and a new intention, so
+        each input runs the regular handler of its session, concurrently.
+
+        Args:
+            sessions: The session of each input.
+            user_inputs: The inputs from the users.
+            max_concurrency: Maximum number of inputs handled at once.
+
+        Returns:
+            The response or the error of each input, in input order.
+        """
+        handler = RunnableLambda(
+            lambda item: item[0].handle_unknown_intent(
+                {"customer_input": item[1]["customer_input"]}
+            )
+        )
+        return handler.batch(
+            list(zip(sessions, user_inputs)),
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+
+    @property
+    def batch_intent_handlers(
+        self,
+    ) -> Dict[
+        Optional[str],
+        Callable[
+            [List["CustomerServiceBot"], List[Dict[str, str]], int],
+            List[Union[str, Exception]],
+        ],
+    ]:
+        """Map of intents to their batch handlers."""
+        return {
+            "product_information": self.batch_product_information,
+            "create_order": self.batch_order_intent,
+            "order_status": self.batch_order_intent,
+            "support_information": self.batch_support_information,
+            "chitchat": self.batch_chitchat_intent,
+        }
+
+    def process_batch(
+        self, user_inputs: List[Dict[str, str]], max_concurrency: int = 8
+    ) -> List[Union[str, Exception]]:
+        """Process many user inputs, grouping them by intent.
+
+        All messages are classified with one batched encoder pass, and each intent
+        group runs through its chains with `.batch`, so up to `max_concurrency`
+        LLM calls are in flight at once. Items are independent conversations
+        (see `batch_sessions`); turns that share a conversation are not ordered
+        within a batch.
+
+        Args:
+            user_inputs: The inputs from the users, each with a "customer_input"
+                and optionally a "user_id" and a "conversation_id".
+            max_concurrency: Maximum number of chain calls running at once per
+                intent group.
+
+        Returns:
+            The response of each input, or the exception it raised, in input order.
+        """
+        sessions = self.batch_sessions(user_inputs)
+        try:
+            return self._process_batch(sessions, user_inputs, max_concurrency)
+        finally:
+            # Drop the histories of the conversations derived for the batch
+            for session, user_input in zip(sessions, user_inputs):
+                if "conversation_id" not in user_input:
+                    self.memory.discard(session.user_id, session.conversation_id)
+
+    def _process_batch(
+        self,
+        sessions: List["CustomerServiceBot"],
+        user_inputs: List[Dict[str, str]],
+        max_concurrency: int,
+    ) -> List[Union[str, Exception]]:
+        """Route and handle the inputs of `process_batch` on their sessions."""
+        results: List[Union[str, Exception]] = [None] * len(user_inputs)
+
+        try:
+            with self.engine.telemetry.turn(kind="batch.route"):
+                intentions = self.get_user_intents(user_inputs)
+        except Exception as e:
+            return [e] * len(user_inputs)
+
+        # Group item positions by intent, keeping input order within each group
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, intention in enumerate(intentions):
+            groups.setdefault(intention, []).append(i)
+
+        logger.debug(
+            "Intents: %s",
+            {intention: len(items) for intention, items in groups.items()},
+        )
+
+        for intention, items in groups.items():
+            handler = self.batch_intent_handlers.get(
+                intention, self.batch_unknown_intent
+            )
+            try:
+                # Each intent group is recorded as one turn of kind "batch"
+                with self.engine.telemetry.turn(kind="batch", intent=intention):
+                    responses = handler(
+                        [sessions[i] for i in items],
+                        [user_inputs[i] for i in items],
+                        max_concurrency,
+                    )
+            except Exception as e:
+                responses = [e] * len(items)
+
+            for i, response in zip(items, responses):
+                results[i] = response
+
+        return results
+
+    def stream_product_information(
+        self, user_input: Dict[str, str], prefetched: Optional[Dict[str, str]] = None
+    ) -> Iterator[str]:
+        """Stream the response to a product information query token by token.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Output of the reasoning chain computed speculatively, if any.
+
+        Yields:
+            The response tokens.
+        """
+        reasoning_chain, response_chain = self.get_chain("product_information")
+
+        reasoning_output = (
+            prefetched if prefetched is not None else reasoning_chain.invoke(user_input)
+        )
+
+        for chunk in response_chain.stream(reasoning_output, config=self.memory_config):
+            yield chunk.content
+
+    async def astream_product_information(
+        self, user_input: Dict[str, str], prefetched: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Asynchronously stream the response to a product information query.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Output of the reasoning chain computed speculatively, if any.
+
+        Yields:
+            The response tokens.
+        """
+        reasoning_chain, response_chain = self.get_chain("product_information")
+
+        if prefetched is not None:
+            reasoning_output = prefetched
+        else:
+            reasoning_output = await reasoning_chain.ainvoke(user_input)
+
+        async for chunk in response_chain.astream(
+            reasoning_output, config=self.memory_config
+        ):
+            yield chunk.content
+
+    def stream_order_intent(self, user_input: Dict[str, str]) -> Iterator[str]:
+        """Stream the order agent's final answer.
+
+        The agent streams through its async API on an engine worker thread.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The answer tokens.
+        """
+        yield from iterate_in_thread(
+            lambda: self.astream_order_intent(user_input), self.engine.executor
+        )
+
+    async def astream_order_intent(
+        self, user_input: Dict[str, str]
+    ) -> AsyncIterator[str]:
+        """Asynchronously stream the order agent's final answer.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The answer tokens.
+        """
+        agent = self.get_agent("order")
+
+        async for token in astream_agent_answer(
+            agent,
+            {
+                "customer_id": self.user_id,
+                "customer_input": user_input["customer_input"],
+            },
+            config=self.memory_config,
+        ):
+            yield token
+
+    def stream_support_information(
+        self, user_input: Dict[str, str], prefetched: Optional[str] = None
+    ) -> Iterator[str]:
+        """Stream the RAG answer to a support information query.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Retrieved context computed speculatively, if any.
+
+        Yields:
+            The answer tokens.
+        """
+        if prefetched is not None:
+            user_input = {**user_input, "context": prefetched}
+
+        yield from self.rag.stream(user_input, config=self.memory_config)
+
+    async def astream_support_information(
+        self, user_input: Dict[str, str], prefetched: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Asynchronously stream the RAG answer to a support information query.
+
+        Args:
+            user_input: The input text from the user.
+            prefetched: Retrieved context computed speculatively, if any.
+
+        Yields:
+            The answer tokens.
+        """
+        if prefetched is not None:
+            user_input = {**user_input, "context": prefetched}
+
+        async for token in self.rag.astream(user_input, config=self.memory_config):
+            yield token
+
+    def stream_chitchat_intent(self, user_input: Dict[str, str]) -> Iterator[str]:
+        """Stream the chitchat response.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The response tokens.
+        """
+        _, chitchat_response_chain = self.get_chain("chitchat")
+
+        yield from chitchat_response_chain.stream(user_input, config=self.memory_config)
+
+    async def astream_chitchat_intent(
+        self, user_input: Dict[str, str]
+    ) -> AsyncIterator[str]:
+        """Asynchronously stream the chitchat response.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The response tokens.
+        """
+        _, chitchat_response_chain = self.get_chain("chitchat")
+
+        async for token in chitchat_response_chain.astream(
+            user_input, config=self.memory_config
+        ):
+            yield token
+
+    def stream_unknown_intent(self, user_input: Dict[str, str]) -> Iterator[str]:
+        """Stream the response to an input the semantic router could not place.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The response tokens.
+        """
+        new_intention = self.classify_unknown_intent(user_input)
+
+        if new_intention == "chitchat":
+            yield from self.stream_chitchat_intent(user_input)
+        else:
+            yield from self.stream_intent_handlers[new_intention](user_input)
+
+    async def astream_unknown_intent(
+        self, user_input: Dict[str, str]
+    ) -> AsyncIterator[str]:
+        """Asynchronously stream the response to an unplaced input.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The response tokens.
+        """
+        new_intention = await self.aclassify_unknown_intent(user_input)
+
+        if new_intention == "chitchat":
+            stream = self.astream_chitchat_intent(user_input)
+        else:
+            stream = self.astream_intent_handlers[new_intention](user_input)
+
+        async for token in stream:
+            yield token
+
+    def stream_user_input(self, user_input: Dict[str, str]) -> Iterator[str]:
+        """Process user input and stream the response tokens as they are generated.
+
+        The chat history is written once the stream completes, as with
+        `process_user_input`. The turn runs on a worker thread, which holds the
+        conversation lock until the response is complete rather than until it is
+        consumed; stopping the iteration early cancels the turn.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The response tokens.
+        """
+        yield from iterate_in_worker(lambda: self._stream_turn(user_input))
+
+    def _stream_turn(self, user_input: Dict[str, str]) -> Iterator[str]:
+        """Run a streamed turn under the conversation lock, yielding its tokens."""
+        with self.engine.conversation_lock(
+            self.user_id, self.conversation_id
+        ), self.engine.telemetry.turn():
+            prefetcher = self.engine.prefetcher
+            speculation = prefetcher.start(user_input) if prefetcher else None
+
+            intention, vector = self.classify_user_input(user_input)
+            set_intent(intention)
+
+            logger.debug("Intent: %s", intention)
+
+            vector = self.cache_vector(vector)
+
+            response = self.get_cached_response(user_input, intention, vector)
+            if response is not None:
+                if speculation is not None:
+                    speculation.claim(None)
+                yield response
+                return
+
+            handler = self.stream_intent_handlers.get(
+                intention, self.stream_unknown_intent
+            )
+
+            started = time.perf_counter()
+            prefetched = speculation.claim(intention) if speculation else None
+            if prefetched is not None:
+                stream = handler(user_input, prefetched=prefetched)
+            else:
+                stream = handler(user_input)
+
+            tokens = []
+            for token in stream:
+                tokens.append(token)
+                yield token
+
+            self.cache_response(intention, vector, "".join(tokens), started)
+
+    async def astream_user_input(
+        self, user_input: Dict[str, str]
+    ) -> AsyncIterator[str]:
+        """Asynchronously process user input and stream the response tokens.
+
+        The turn runs in a task of its own, which holds the conversation lock and
+        the telemetry context until the response is complete rather than until
+        it is consumed; stopping the iteration early cancels the turn.
+
+        Args:
+            user_input: The input text from the user.
+
+        Yields:
+            The response tokens.
+        """
+        async for token in aiterate_in_task(lambda: self._astream_turn(user_input)):
+            yield token
+
+    async def _astream_turn(self, user_input: Dict[str, str]) -> AsyncIterator[str]:
+        """Run a streamed turn under the conversation lock, yielding its tokens."""
+        async with self.engine.async_conversation_lock(
+            self.user_id, self.conversation_id
+        ):
+            with self.engine.telemetry.turn():
+                prefetcher = self.engine.prefetcher
+                speculation = prefetcher.astart(user_input) if prefetcher else None
+
+                intention, vector = await self.aclassify_user_input(user_input)
+                set_intent(intention)
+
+                logger.debug("Intent: %s", intention)
+
+                vector = self.cache_vector(vector)
+
+                response = self.get_cached_response(user_input, intention, vector)
+                if response is not None:
+                    if speculation is not None:
+                        await speculation.claim(None)
+                    yield response
+                    return
+
+                handler = self.astream_intent_handlers.get(
+                    intention, self.astream_unknown_intent
+                )
+
+                started = time.perf_counter()
+                prefetched = await speculation.claim(intention) if speculation else None
+                if prefetched is not None:
+                    stream = handler(user_input, prefetched=prefetched)
+                else:
+                    stream = handler(user_input)
 
-        print("Intent:", intention)
+                tokens = []
+                async for token in stream:
+                    tokens.append(token)
+                    yield token
 
-        # Route the input based on the identified intention
-        handler = self.intent_handlers.get(intention, self.handle_unknown_intent)
-        return handler(user_input)
+                self.cache_response(intention, vector, "".join(tokens), started)
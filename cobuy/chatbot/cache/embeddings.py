@@ -0,0 +1,210 @@
+# Import necessary modules and classes
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_text(text: str) -> str:
+    """Normalise a customer input for embedding lookups.
+
+    Unicode compatibility forms are unified, the text is case-folded and runs of
+    whitespace become single spaces. None of this changes the tokens of an uncased
+    encoder such as MiniLM, but it does for cased models, e.g. the OpenAI
+    embeddings, which must be cached on the exact text.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class EmbeddingCacheStats:
+    """Thread-safe counters of the query embedding cache."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Entries dropped by the LRU limit
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """Increment one of the counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and the hit rate as a dictionary."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate,
+            }
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of the embeddings of customer inputs.
+
+    One cache can serve several encoders: entries are keyed by a namespace, such as
+    the encoder name, and the text, normalised or not as the namespace needs.
+    Embeddings are kept as read-only float32 arrays, a fraction of the memory of
+    lists of Python floats, and converted to lists only when returned.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of embeddings kept across all namespaces.
+        """
+        self.max_entries = max_entries
+        self.stats = EmbeddingCacheStats()
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, str], np.ndarray]" = OrderedDict()
+
+    def embed(
+        self,
+        namespace: Hashable,
+        texts: Sequence[str],
+        encoder: Callable[[List[str]], List[List[float]]],
+        normalise: bool = True,
+    ) -> List[List[float]]:
+        """Embed texts, encoding only those not cached.
+
+        Args:
+            namespace: Identifies the encoder.
+            texts: The texts to embed.
+            encoder: Embeds a list of texts; called at most once, on the texts
+                missing from the cache, as given, one per distinct key.
+            normalise: Whether texts equal after `normalise_text` share an entry;
+                only correct for encoders insensitive to case and Unicode forms.
+
+        Returns:
+            One embedding per text, in order.
+        """
+        keys = [
+            (namespace, normalise_text(text) if normalise else text) for text in texts
+        ]
+
+        with self._lock:
+            vectors = [self._entries.get(key) for key in keys]
+            for key, vector in zip(keys, vectors):
+                if vector is not None:
+                    self._entries.move_to_end(key)
+
+        # Repeats within the call are encoded once and count as hits
+        missing: Dict[Tuple[Hashable, str], str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        self.stats.increment("hits", len(keys) - len(missing))
+        self.stats.increment("misses", len(missing))
+        if missing:
+            encoded = {}
+            for key, vector in zip(missing, encoder(list(missing.values()))):
+                vector = np.array(vector, dtype=np.float32)
+                vector.flags.writeable = False
+                encoded[key] = vector
+            with self._lock:
+                for key, vector in encoded.items():
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                evicted = 0
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    evicted += 1
+            self.stats.increment("evictions", evicted)
+            vectors = [encoded[k] if v is None else v for k, v in zip(keys, vectors)]
+
+        return [vector.tolist() for vector in vectors]
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedEncoder:
+    """Route layer encoder answering repeated inputs from a `QueryEmbeddingCache`."""
+
+    def __init__(
+        self,
+        encoder: Callable[[List[str]], List[List[float]]],
+        cache: QueryEmbeddingCache,
+        namespace: Hashable,
+        normalise: bool = True,
+    ):
+        """Initialize the encoder.
+
+        Args:
+            encoder: The wrapped encoder, mapping texts to embeddings.
+            cache: The cache, possibly shared with other encoders.
+            namespace: Key of this encoder's entries, e.g. its model name.
+            normalise: Whether inputs equal after `normalise_text` share an entry,
+                as they do for the uncased MiniLM of the route layer.
+        """
+        self.encoder = encoder
+        self.cache = cache
+        self.namespace = namespace
+        self.normalise = normalise
+
+    def __call__(self, docs: List[str]) -> List[List[float]]:
+        return self.cache.embed(self.namespace, docs, self.encoder, self.normalise)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """LangChain embeddings whose query embeddings go through a
+    `QueryEmbeddingCache`. Documents are always embedded by the wrapped model.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: QueryEmbeddingCache,
+        namespace: Hashable,
+        normalise: bool = False,
+    ):
+        """Initialize the embeddings.
+
+        Args:
+            embeddings: The wrapped embeddings model.
+            cache: The cache, possibly shared with other encoders.
+            namespace: Key of this model's entries, e.g. its model name.
+            normalise: Whether queries equal after `normalise_text` share an entry.
+                Off by default: the OpenAI embeddings are case-sensitive.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = namespace
+        self.normalise = normalise
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.cache.embed(
+            self.namespace,
+            [text],
+            lambda texts: [self.embeddings.embed_query(texts[0])],
+            self.normalise,
+        )[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
@@ -0,0 +1,237 @@
+# Import necessary modules and classes
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+class LLMCacheStats:
+    """Thread-safe counters of the LLM call cache."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0  # Entries dropped by a size cap or the TTL
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """Increment one of the counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered by either tier."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and the hit rate as a dictionary."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate,
+            }
+
+
+class TieredLLMCache(BaseCache):
+    """Exact-match LLM response cache with an in-memory LRU tier and an optional
+    SQLite tier.
+
+    Entries are keyed by a hash of the rendered prompt and of the model parameters
+    (`llm_string`), so only identical calls to identically configured models hit.
+    Set it as the `cache` of a chat model; models created with `cache=False` opt out.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl: float = 24 * 3600.0,
+        db_path: Optional[str] = None,
+        max_rows: int = 100_000,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries of the in-memory tier.
+            ttl: Time to live of an entry in both tiers, in seconds.
+            db_path: SQLite file of the persistent tier, or None for memory only.
+            max_rows: Maximum number of entries of the SQLite tier.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.stats = LLMCacheStats()
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, RETURN_VAL_TYPE]]" = OrderedDict()
+
+        # The SQLite tier has its own lock, so disk reads never stall memory hits
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._rows = 0
+        # Access times of the entries promoted from disk, written with the next
+        # insert rather than committed on every hit
+        self._accessed: Dict[str, float] = {}
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, "
+                "generations TEXT, created REAL, accessed REAL)"
+            )
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE created < ?", (time.time() - ttl,)
+            )
+            self._db.commit()
+            self._rows = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[
+                0
+            ]
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Look up the generations of an identical earlier call.
+
+        Args:
+            prompt: The rendered prompt.
+            llm_string: The serialised model parameters.
+
+        Returns:
+            The cached generations, or None on a miss.
+        """
+        key = self._key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, generations = entry
+                if created >= now - self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats.increment("memory_hits")
+                    return generations
+                del self._memory[key]
+                self.stats.increment("evictions")
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT generations, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                fresh = row is not None and row[1] >= now - self.ttl
+                if fresh:
+                    self._accessed[key] = now
+            if fresh:
+                with warnings.catch_warnings():
+                    # The serialisation helpers are flagged as beta
+                    warnings.simplefilter("ignore", LangChainBetaWarning)
+                    generations = [loads(item) for item in json.loads(row[0])]
+                # Promote the entry to the memory tier
+                with self._lock:
+                    self._remember(key, row[1], generations)
+                self.stats.increment("disk_hits")
+                return generations
+
+        self.stats.increment("misses")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations of a call.
+
+        Args:
+            prompt: The rendered prompt.
+            llm_string: The serialised model parameters.
+            return_val: The generations returned by the model.
+        """
+        key = self._key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, now, return_val)
+        if self._db is not None:
+            generations = json.dumps([dumps(item) for item in return_val])
+            with self._db_lock:
+                self._flush_accessed()
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, generations, now, now),
+                ).rowcount
+                if inserted:
+                    self._rows += 1
+                else:
+                    self._db.execute(
+                        "UPDATE llm_cache SET generations = ?, created = ?, "
+                        "accessed = ? WHERE key = ?",
+                        (generations, now, now, key),
+                    )
+                if self._rows > self.max_rows:
+                    self._prune()
+                self._db.commit()
+
+        self.stats.increment("stores")
+
+    def _remember(self, key: str, created: float, generations: RETURN_VAL_TYPE) -> None:
+        """Add an entry to the memory tier, evicting the least recently used."""
+        self._memory[key] = (created, generations)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats.increment("evictions")
+
+    def _flush_accessed(self) -> None:
+        """Write the pending access times into the current transaction."""
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE llm_cache SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _prune(self) -> None:
+        """Bring the SQLite tier back under its cap, dropping the expired and the
+        least recently accessed entries (a tenth of the cap at once, so pruning
+        does not run on every insert).
+        """
+        evicted = self._db.execute(
+            "DELETE FROM llm_cache WHERE created < ?", (time.time() - self.ttl,)
+        ).rowcount
+        rows = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if rows > self.max_rows:
+            excess = rows - (self.max_rows - self.max_rows // 10)
+            evicted += self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed LIMIT ?)",
+                (excess,),
+            ).rowcount
+            rows -= excess
+        self.stats.increment("evictions", evicted)
+        self._rows = rows
+
+    def clear(self, **kwargs: Any) -> None:
+        """Drop every entry of both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+                self._rows = 0
+                self._accessed.clear()
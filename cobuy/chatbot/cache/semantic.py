@@ -0,0 +1,377 @@
+# Import necessary modules and classes
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from cobuy.data.loader import get_data_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Intents whose answers depend on the customer's orders; never cached
+NON_CACHEABLE_INTENTS = frozenset({"create_order", "order_status"})
+
+
+class CacheEntry(NamedTuple):
+    """A cached response and the query it answered."""
+
+    intent: str
+    vector: np.ndarray  # Normalised query embedding
+    response: str
+    created: float  # time.time() when the response was stored
+    latency_ms: float  # Time it took to generate the response
+
+
+class _IntentMatrix:
+    """Stacked vectors of the entries of one intent, updated in place.
+
+    Rows are appended into a buffer grown by doubling and removed by moving the
+    last row into their place, so a store or an eviction costs one row copy.
+    """
+
+    def __init__(self, dim: int):
+        self.ids: List[int] = []
+        self._rows: Dict[int, int] = {}
+        self._buffer = np.empty((16, dim), dtype=np.float32)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._buffer[: len(self.ids)]
+
+    def add(self, id_: int, vector: np.ndarray) -> None:
+        if len(self.ids) == len(self._buffer):
+            grown = np.empty((2 * len(self._buffer), self._buffer.shape[1]), np.float32)
+            grown[: len(self.ids)] = self._buffer
+            self._buffer = grown
+        self._buffer[len(self.ids)] = vector
+        self._rows[id_] = len(self.ids)
+        self.ids.append(id_)
+
+    def remove(self, id_: int) -> None:
+        row = self._rows.pop(id_)
+        last = len(self.ids) - 1
+        if row != last:
+            self._buffer[row] = self._buffer[last]
+            self.ids[row] = self.ids[last]
+            self._rows[self.ids[row]] = row
+        self.ids.pop()
+
+
+class SemanticCacheStats:
+    """Thread-safe counters describing how useful the response cache is."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0  # Entries dropped by the LRU limit or the TTL
+        self.invalidations = 0  # Times the cache was cleared by a data update
+        self.saved_ms = 0.0  # Generation time of the responses served from cache
+        self.lookup_ms = 0.0  # Time spent looking responses up
+
+    def record_lookup(self, hit: Optional[CacheEntry], duration_ms: float) -> None:
+        """Record the outcome of a lookup.
+
+        Args:
+            hit: The entry served, or None on a miss.
+            duration_ms: Time taken by the lookup.
+        """
+        with self._lock:
+            self.lookups += 1
+            self.lookup_ms += duration_ms
+            if hit is not None:
+                self.hits += 1
+                self.saved_ms += hit.latency_ms
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """Increment one of the integer counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and rates as a dictionary."""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hit_rate,
+                "saved_ms": self.saved_ms,
+                "lookup_ms": self.lookup_ms,
+                "net_saved_ms": self.saved_ms - self.lookup_ms,
+            }
+
+
+class SemanticResponseCache:
+    """Response cache keyed by intent and query embedding.
+
+    A lookup returns the response of the most similar cached query of the same
+    intent, if its cosine similarity reaches the threshold. Entries are evicted
+    least recently used first and expire after a time to live. Optionally, entries
+    are also written to a SQLite file so they survive restarts. The whole cache is
+    cleared when the product catalog or the support documents change.
+    """
+
+    def __init__(
+        self,
+        intents: Iterable[str] = ("product_information", "support_information"),
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        db_path: Optional[str] = None,
+        fingerprint: Callable[[], str] = get_data_fingerprint,
+        fingerprint_interval: float = 5.0,
+    ):
+        """Initialize the cache.
+
+        Args:
+            intents: Intents whose responses are cached.
+            threshold: Minimum cosine similarity for a cached query to match.
+            max_entries: Maximum number of entries kept across all intents.
+            ttl: Time to live of an entry, in seconds.
+            db_path: SQLite file backing the cache, or None to keep it in memory.
+            fingerprint: Callable identifying the data responses are built from.
+            fingerprint_interval: Minimum seconds between two fingerprint checks.
+
+        Raises:
+            ValueError: If an order intent is listed among the cached intents.
+        """
+        unsafe = NON_CACHEABLE_INTENTS.intersection(intents)
+        if unsafe:
+            raise ValueError(f"Intents cannot be cached: {sorted(unsafe)}")
+
+        self.intents = frozenset(intents)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = SemanticCacheStats()
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        # Ids of the entries kept in memory only; persisted entries take the
+        # positive rowid SQLite assigns, unique across the processes sharing a file
+        self._ids = itertools.count(-1, -1)
+        # Per-intent entry ids and stacked vectors, kept in step with the entries
+        self._matrices: Dict[str, _IntentMatrix] = {}
+
+        self._fingerprint = fingerprint
+        self._fingerprint_interval = fingerprint_interval
+        self._current_fingerprint = fingerprint()
+        self._checked_at = time.monotonic()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            # AUTOINCREMENT never reuses the id of a deleted row, so an id held in
+            # memory by another process never names a newer entry
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (id INTEGER PRIMARY KEY "
+                "AUTOINCREMENT, intent TEXT, vector BLOB, response TEXT, created REAL, "
+                "latency_ms REAL, fingerprint TEXT)"
+            )
+            self._load()
+
+    def _load(self) -> None:
+        """Load the persisted entries still valid for the current data."""
+        self._db.execute(
+            "DELETE FROM responses WHERE fingerprint != ? OR created < ?",
+            (self._current_fingerprint, time.time() - self.ttl),
+        )
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT id, intent, vector, response, created, latency_ms "
+            "FROM responses ORDER BY created"
+        ).fetchall()
+        for id_, intent, vector, response, created, latency_ms in rows:
+            self._entries[id_] = CacheEntry(
+                intent,
+                np.frombuffer(vector, dtype=np.float32),
+                response,
+                created,
+                latency_ms,
+            )
+        self._evict()
+
+    @staticmethod
+    def _normalise(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_fingerprint(self) -> None:
+        """Clear the cache if the underlying data changed since the last check."""
+        now = time.monotonic()
+        if now - self._checked_at < self._fingerprint_interval:
+            return
+        self._checked_at = now
+        fingerprint = self._fingerprint()
+        if fingerprint != self._current_fingerprint:
+            self._current_fingerprint = fingerprint
+            self.invalidate()
+
+    def _matrix(self, intent: str) -> Optional[_IntentMatrix]:
+        """Return the stacked vectors of an intent, None if it has no entry."""
+        matrix = self._matrices.get(intent)
+        if matrix is None:
+            ids = [i for i, entry in self._entries.items() if entry.intent == intent]
+            if not ids:
+                return None
+            matrix = _IntentMatrix(len(self._entries[ids[0]].vector))
+            for i in ids:
+                matrix.add(i, self._entries[i].vector)
+            self._matrices[intent] = matrix
+        return matrix
+
+    def _remove(self, ids: List[int]) -> None:
+        """Remove entries from memory and from the SQLite file."""
+        for i in ids:
+            entry = self._entries.pop(i)
+            matrix = self._matrices.get(entry.intent)
+            if matrix is not None:
+                matrix.remove(i)
+        persisted = [(i,) for i in ids if i > 0]
+        if self._db is not None and persisted:
+            try:
+                self._db.executemany("DELETE FROM responses WHERE id = ?", persisted)
+                self._db.commit()
+            except sqlite3.Error:
+                self._db.rollback()
+                logger.warning("Could not delete evicted responses", exc_info=True)
+        self.stats.increment("evictions", len(ids))
+
+    def _evict(self) -> None:
+        """Drop expired entries and the least recently used beyond the limit."""
+        deadline = time.time() - self.ttl
+        expired = [i for i, entry in self._entries.items() if entry.created < deadline]
+        overflow = len(self._entries) - len(expired) - self.max_entries
+        if overflow > 0:
+            skipped = set(expired)
+            alive = (i for i in self._entries if i not in skipped)
+            expired += list(itertools.islice(alive, overflow))
+        self._remove(expired)
+
+    def lookup(self, intent: Optional[str], vector: Sequence[float]) -> Optional[str]:
+        """Return the cached response of the most similar query, if any.
+
+        Args:
+            intent: The intent of the query.
+            vector: The query embedding.
+
+        Returns:
+            The cached response, or None on a miss or for an uncached intent.
+        """
+        if intent not in self.intents:
+            return None
+
+        start = time.perf_counter()
+        hit = None
+        with self._lock:
+            self._check_fingerprint()
+
+            matrix = self._matrix(intent)
+            if matrix is not None and matrix.ids:
+                scores = matrix.vectors @ self._normalise(vector)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    id_ = matrix.ids[best]
+                    entry = self._entries[id_]
+                    if entry.created >= time.time() - self.ttl:
+                        self._entries.move_to_end(id_)
+                        hit = entry
+                    else:
+                        self._evict()
+
+        self.stats.record_lookup(hit, (time.perf_counter() - start) * 1000)
+        return hit.response if hit is not None else None
+
+    def store(
+        self,
+        intent: Optional[str],
+        vector: Sequence[float],
+        response: str,
+        latency_ms: float = 0.0,
+    ) -> None:
+        """Cache a response.
+
+        Args:
+            intent: The intent of the query.
+            vector: The query embedding.
+            response: The response to cache.
+            latency_ms: Time it took to generate the response.
+        """
+        if intent not in self.intents or not isinstance(response, str):
+            return
+
+        entry = CacheEntry(
+            intent, self._normalise(vector), response, time.time(), latency_ms
+        )
+        with self._lock:
+            id_ = self._persist(entry) if self._db is not None else None
+            if id_ is None:
+                id_ = next(self._ids)
+            self._entries[id_] = entry
+            matrix = self._matrices.get(intent)
+            if matrix is not None:
+                matrix.add(id_, entry.vector)
+            self._evict()
+        self.stats.increment("stores")
+
+    def _persist(self, entry: CacheEntry) -> Optional[int]:
+        """Write an entry to the SQLite file.
+
+        Returns:
+            The id of the row, or None if the write failed; the entry is then kept
+            in memory only, as a failed cache write must not fail the turn.
+        """
+        try:
+            cursor = self._db.execute(
+                "INSERT INTO responses (intent, vector, response, created, "
+                "latency_ms, fingerprint) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entry.intent,
+                    entry.vector.tobytes(),
+                    entry.response,
+                    entry.created,
+                    entry.latency_ms,
+                    self._current_fingerprint,
+                ),
+            )
+            self._db.commit()
+        except sqlite3.Error:
+            self._db.rollback()
+            logger.warning("Could not persist a cached response", exc_info=True)
+            return None
+        return cursor.lastrowid
+
+    def invalidate(self) -> None:
+        """Drop every entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error:
+                    self._db.rollback()
+                    logger.warning(
+                        "Could not clear the cached responses", exc_info=True
+                    )
+        self.stats.increment("invalidations")
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -62,6 +62,16 @@ class ChitChatResponseChain(Runnable):
     def invoke(self, input, config=None, **kwargs):
         return self.chain.invoke(input, config=config)
 
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self.chain.ainvoke(input, config=config)
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self.chain.stream(input, config=config)
+
+    async def astream(self, input, config=None, **kwargs):
+        async for chunk in self.chain.astream(input, config=config):
+            yield chunk
+
 
 class ChitChatClassifier(BaseModel):
 
@@ -119,3 +129,13 @@ class ChitChatClassifierChain(Runnable):
             },
         )
         return result
+
+    async def ainvoke(self, input, config=None, **kwargs) -> ChitChatClassifier:
+        result = await self.chain.ainvoke(
+            {
+                "customer_input": input["customer_input"],
+                "chat_history": input["chat_history"],
+                "format_instructions": self.format_instructions,
+            },
+        )
+        return result
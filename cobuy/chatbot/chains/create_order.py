@@ -59,3 +59,12 @@ class CreateOrderReasoningChain(Runnable):
                 "format_instructions": self.format_instructions,
             },
         )
+
+    async def ainvoke(self, inputs):
+        return await self.chain.ainvoke(
+            {
+                "customer_input": inputs["customer_input"],
+                "products_list": self.products_list,
+                "format_instructions": self.format_instructions,
+            },
+        )
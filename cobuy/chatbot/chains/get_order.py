@@ -40,3 +40,11 @@ class GetOrderReasoningChain(Runnable):
                 "format_instructions": self.format_instructions,
             },
         )
+
+    async def ainvoke(self, inputs):
+        return await self.chain.ainvoke(
+            {
+                "customer_input": inputs["customer_input"],
+                "format_instructions": self.format_instructions,
+            },
+        )
@@ -2,7 +2,6 @@
 import json
 from typing import List, Optional
 
-from langchain import callbacks
 from langchain.output_parsers import PydanticOutputParser
 from langchain.schema.runnable.base import Runnable
 from pydantic import BaseModel, Field
@@ -169,21 +168,37 @@ class ProductInfoReasoningChain(Runnable):
 
         return output_string
 
-    def invoke(self, inputs) -> str:
-        with callbacks.collect_runs() as cb:
-            """Invoke the product information reasoning chain."""
-            response = self.chain.invoke(
-                {
-                    "customer_input": inputs["customer_input"],
-                    "categories": self.categories,
-                    "products": self.products,
-                    "format_instructions": self.format_instructions,
-                }
-            )
+    def invoke(self, inputs, config=None, **kwargs) -> str:
+        """Invoke the product information reasoning chain."""
+        response = self.chain.invoke(
+            {
+                "customer_input": inputs["customer_input"],
+                "categories": self.categories,
+                "products": self.products,
+                "format_instructions": self.format_instructions,
+            },
+            config=config,
+        )
+
+        # Generate and return the product information output
+        inputs["product_info"] = self._generate_output_string(response.results)
+        return inputs
+
+    async def ainvoke(self, inputs, config=None, **kwargs) -> str:
+        """Asynchronously invoke the product information reasoning chain."""
+        response = await self.chain.ainvoke(
+            {
+                "customer_input": inputs["customer_input"],
+                "categories": self.categories,
+                "products": self.products,
+                "format_instructions": self.format_instructions,
+            },
+            config=config,
+        )
 
-            # Generate and return the product information output
-            inputs["product_info"] = self._generate_output_string(response.results)
-            return inputs
+        # Generate and return the product information output
+        inputs["product_info"] = self._generate_output_string(response.results)
+        return inputs
 
 
 # Customer Service Response Chain - Uses a language model (LLM) to generate customer service responses
@@ -221,6 +236,18 @@ class ProductInfoResponseChain(Runnable):
         self.chain = self.prompt | self.llm
 
     def invoke(self, inputs, config):
-        with callbacks.collect_runs() as cb:
-            """Invoke the product information response chain."""
-            return self.chain.invoke(inputs, config=config)
+        """Invoke the product information response chain."""
+        return self.chain.invoke(inputs, config=config)
+
+    async def ainvoke(self, inputs, config):
+        """Asynchronously invoke the product information response chain."""
+        return await self.chain.ainvoke(inputs, config=config)
+
+    def stream(self, inputs, config=None, **kwargs):
+        """Stream the response message chunks as the LLM generates them."""
+        yield from self.chain.stream(inputs, config=config)
+
+    async def astream(self, inputs, config=None, **kwargs):
+        """Asynchronously stream the response message chunks."""
+        async for chunk in self.chain.astream(inputs, config=config):
+            yield chunk
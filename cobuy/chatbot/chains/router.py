@@ -1,6 +1,5 @@
 from typing import Literal
 
-from langchain import callbacks
 from langchain.output_parsers import PydanticOutputParser
 from langchain.schema.runnable.base import Runnable
 from pydantic import BaseModel, Field
@@ -84,11 +83,98 @@ class RouterChain(Runnable):
 
     def invoke(self, input, config=None, **kwargs):
         """Invoke the product information response chain."""
-        with callbacks.collect_runs() as cb:
-            return self.chain.invoke(
-                {
-                    "customer_input": input["customer_input"],
-                    "chat_history": input["chat_history"],
-                    "format_instructions": self.format_instructions,
-                },
-            )
+        return self.chain.invoke(
+            {
+                "customer_input": input["customer_input"],
+                "chat_history": input["chat_history"],
+                "format_instructions": self.format_instructions,
+            },
+        )
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        """Asynchronously invoke the router chain."""
+        return await self.chain.ainvoke(
+            {
+                "customer_input": input["customer_input"],
+                "chat_history": input["chat_history"],
+                "format_instructions": self.format_instructions,
+            },
+        )
+
+
+class FallbackClassification(BaseModel):
+
+    intent: Literal[
+        "product_information",
+        "create_order",
+        "order_status",
+        "support_information",
+        "chitchat",
+    ] = Field(
+        ...,
+        description="The intent of the user query, or chitchat",
+    )
+
+
+class FallbackRouterChain(Runnable):
+    """Classify a message as chitchat or one of the intents in a single call.
+
+    Used for the messages the route layer cannot place, in place of the chitchat
+    classifier followed by the router chain.
+    """
+
+    def __init__(self, llm, memory=False):
+        super().__init__()
+
+        self.llm = llm
+        prompt_template = PromptTemplate(
+            system_template="""
+            Classify the customer message for Cobuy, an electronics e-commerce platform,
+            into one of these intents:
+            - product_information: features, specifications or prices of products or categories.
+            - create_order: wants to order a product.
+            - order_status: asks about an existing order, usually by its order number.
+            - support_information: delivery, returns, refunds, warranties, payment methods,
+              user manuals, availability, promotions or customer support.
+            - chitchat: greetings, small talk or anything unrelated to shopping at Cobuy.
+            Use the conversation history to resolve references such as 'it'.
+
+            Conversation history:
+            {chat_history}
+
+            {format_instructions}
+            """,
+            human_template="Customer Query: {customer_input}",
+        )
+
+        self.prompt = generate_prompt_templates(prompt_template, memory=memory)
+
+        self.output_parser = PydanticOutputParser(
+            pydantic_object=FallbackClassification
+        )
+        self.format_instructions = self.output_parser.get_format_instructions()
+        self.chain = (self.prompt | self.llm | self.output_parser).with_config(
+            {"run_name": self.__class__.__name__}
+        )
+
+    def invoke(self, input, config=None, **kwargs) -> FallbackClassification:
+        """Invoke the fallback router chain."""
+        return self.chain.invoke(
+            {
+                "customer_input": input["customer_input"],
+                "chat_history": input["chat_history"],
+                "format_instructions": self.format_instructions,
+            },
+            config=config,
+        )
+
+    async def ainvoke(self, input, config=None, **kwargs) -> FallbackClassification:
+        """Asynchronously invoke the fallback router chain."""
+        return await self.chain.ainvoke(
+            {
+                "customer_input": input["customer_input"],
+                "chat_history": input["chat_history"],
+                "format_instructions": self.format_instructions,
+            },
+            config=config,
+        )
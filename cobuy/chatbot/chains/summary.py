@@ -0,0 +1,51 @@
+from typing import List
+
+from langchain.schema.runnable.base import Runnable
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+
+from cobuy.chatbot.chains.base import PromptTemplate, generate_prompt_templates
+
+
+class SummaryChain(Runnable):
+    """Fold older conversation turns into a rolling summary."""
+
+    def __init__(self, llm):
+        super().__init__()
+
+        self.llm = llm
+        prompt_template = PromptTemplate(
+            system_template="""
+            You maintain a running summary of a conversation between a customer and
+            the Cobuy e-commerce assistant. Extend the current summary with the new
+            messages. Keep product names, order IDs, quantities, preferences and
+            open requests; leave out greetings and small talk.
+            Answer with the summary only, in at most 100 words.
+
+            Current summary:
+            {summary}
+
+            New messages:
+            {messages}
+            """,
+            human_template="Update the summary.",
+        )
+
+        self.prompt = generate_prompt_templates(prompt_template, memory=False)
+        self.chain = (self.prompt | self.llm | StrOutputParser()).with_config(
+            {"run_name": self.__class__.__name__}
+        )
+
+    def invoke(self, inputs, config=None, **kwargs) -> str:
+        """Return the summary extended with `inputs["messages"]`."""
+        return self.chain.invoke(
+            {
+                "summary": inputs["summary"] or "(empty)",
+                "messages": get_buffer_string(inputs["messages"]),
+            },
+            config=config,
+        )
+
+    def summarize(self, summary: str, messages: List[BaseMessage]) -> str:
+        """Summarizer callable for `MemoryManager`."""
+        return self.invoke({"summary": summary, "messages": messages})
@@ -0,0 +1,223 @@
+# Import necessary modules and classes
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+
+class CoalescingStats:
+    """Thread-safe counters of a coalescer."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.calls = 0  # Calls actually made
+        self.saved = 0  # Calls that joined an identical call in flight
+
+    def record(self, shared: bool) -> None:
+        """Record a request, served by its own call or by joining another one."""
+        with self._lock:
+            if shared:
+                self.saved += 1
+            else:
+                self.calls += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and the fraction of requests saved."""
+        with self._lock:
+            requests = self.calls + self.saved
+            return {
+                "calls": self.calls,
+                "saved": self.saved,
+                "saved_rate": self.saved / requests if requests else 0.0,
+            }
+
+
+class Coalescer:
+    """Single-flight execution of identical concurrent requests.
+
+    While a call for a key is in flight, further requests for the same key wait
+    for it and receive its result (or exception) instead of making their own call.
+    The sync and async paths keep separate in-flight tables; async calls are only
+    shared within one event loop.
+    """
+
+    def __init__(self):
+        """Initialize the coalescer with no call in flight."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._async_calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], Any] = {}
+        self.stats = CoalescingStats()
+
+    def do(self, key: Hashable, call: Callable[[], Any]) -> Any:
+        """Run `call`, or wait for the identical call already in flight.
+
+        Args:
+            key: Identifies identical requests.
+            call: Makes the request.
+
+        Returns:
+            The result of the call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        self.stats.record(shared=not leader)
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+    async def ado(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `call`, or wait for the identical call already in flight.
+
+        Args:
+            key: Identifies identical requests.
+            call: Returns the awaitable making the request.
+
+        Returns:
+            The result of the call.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._async_calls.get((loop, key))
+            leader = future is None
+            if leader:
+                future = self._async_calls[(loop, key)] = loop.create_future()
+        self.stats.record(shared=not leader)
+
+        if not leader:
+            # Shielded, so a cancelled follower does not cancel the shared call
+            return await asyncio.shield(future)
+
+        try:
+            result = await call()
+        except BaseException as e:
+            with self._lock:
+                del self._async_calls[(loop, key)]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Retrieved here in case nobody joined
+            raise
+        with self._lock:
+            del self._async_calls[(loop, key)]
+        future.set_result(result)
+        return result
+
+
+class CoalescingChatModel(BaseChatModel):
+    """Chat model sharing one call between identical concurrent generations.
+
+    Two generations are identical when the rendered messages, the stop words, the
+    bound arguments (such as tools) and the wrapped model's parameters all match.
+    Every caller receives its own copy of the result. Streaming is not coalesced.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    coalescer: Coalescer
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def _key(
+        self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any
+    ) -> Tuple[str, str]:
+        return self._get_llm_string(stop=stop, **kwargs), dumps(messages)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        result = self.coalescer.do(
+            self._key(messages, stop, **kwargs),
+            lambda: self.inner._generate(messages, stop=stop, **kwargs),
+        )
+        # Callers may annotate the messages they receive
+        return copy.deepcopy(result)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        result = await self.coalescer.ado(
+            self._key(messages, stop, **kwargs),
+            lambda: self.inner._agenerate(messages, stop=stop, **kwargs),
+        )
+        return copy.deepcopy(result)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # Tokens are reported by this model's own run, not by the wrapped model
+        yield from self.inner._stream(messages, stop=stop, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in self.inner._astream(messages, stop=stop, **kwargs):
+            yield chunk
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        """Bind tools in the format of the wrapped model."""
+        # The wrapped model formats the tools; its bound arguments reach `_generate`
+        binding = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
@@ -1,7 +1,8 @@
 # Import necessary classes and modules for chatbot functionality
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from cobuy.chatbot.bot import CustomerServiceBot
+from cobuy.chatbot.engine import BotEngine
 from cobuy.chatbot.router.auxiliar import add_message
 
 
@@ -10,16 +11,24 @@ class DevCustomerServiceBot(CustomerServiceBot):
     interaction with developers for testing and updating intents.
     """
 
-    def __init__(self, user_id: str, conversation_id: str, intentions: List[str]):
+    def __init__(
+        self,
+        user_id: str,
+        conversation_id: str,
+        intentions: List[str],
+        engine: Optional[BotEngine] = None,
+    ):
         """Initialize the development bot with additional functionality.
 
         Args:
             user_id: Identifier for the user.
             conversation_id: Identifier for the conversation.
             intentions: A list of available intentions for the bot.
+            engine: The engine to run the conversation on. Defaults to the
+                process-wide shared engine.
         """
         # Initialize the base bot class
-        super().__init__(user_id, conversation_id)
+        super().__init__(user_id, conversation_id, engine=engine)
         self.intentions = intentions  # Store the list of available intentions
 
     def get_choice_from_list(self):
@@ -77,8 +86,8 @@ class DevCustomerServiceBot(CustomerServiceBot):
             "Intention": new_intention,
             "Message": user_input["customer_input"],  # User's input message
         }
-        # Save the new intention and message to a JSON file
-        add_message(new_item, "new_intentions.json")
+        # Append the new intention and message to the intention store
+        add_message(new_item, "new_intentions.jsonl")
 
     def process_user_input(self, user_input: Dict[str, str]) -> str:
         """Process user input by routing through the intention pipeline or allowing for updates.
@@ -0,0 +1,586 @@
+# Import necessary classes and modules for the shared bot engine
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+)
+
+from langchain.schema.runnable.base import Runnable
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.vectorstores import VectorStore
+
+from cobuy.chatbot.backends import create_chat_model
+from cobuy.chatbot.cache.llm import TieredLLMCache
+from cobuy.chatbot.cache.semantic import SemanticResponseCache
+from cobuy.chatbot.chains.chitchat import ChitChatClassifierChain, ChitChatResponseChain
+from cobuy.chatbot.chains.product_info import (
+    ProductInfoReasoningChain,
+    ProductInfoResponseChain,
+)
+from cobuy.chatbot.chains.router import FallbackRouterChain, RouterChain
+from cobuy.chatbot.chains.summary import SummaryChain
+from cobuy.chatbot.batching import BatchingEncoder
+from cobuy.chatbot.cache.embeddings import CachedEncoder, QueryEmbeddingCache
+from cobuy.chatbot.coalescing import Coalescer, CoalescingChatModel
+from cobuy.chatbot.memory import MemoryManager
+from cobuy.chatbot.reloading import ReloadableComponent
+from cobuy.chatbot.settings import BotSettings
+from cobuy.chatbot.speculative import SpeculativePrefetcher
+from cobuy.chatbot.telemetry import Telemetry
+
+# Longest wait, in seconds, between two attempts of an async turn to take the
+# lock of a conversation
+_LOCK_POLL_MAX_DELAY = 0.02
+
+
+class lazy_component:
+    """Descriptor building an engine component on first access, exactly once.
+
+    The built value is stored in the instance dictionary, so later accesses are
+    plain attribute lookups.
+    """
+
+    def __init__(self, builder: Callable[["BotEngine"], Any]):
+        self.builder = builder
+        self.name = builder.__name__
+        self.__doc__ = builder.__doc__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, engine: Optional["BotEngine"], owner: Optional[type] = None):
+        if engine is None:
+            return self
+        try:
+            return engine.__dict__[self.name]
+        except KeyError:
+            pass
+        with engine._component_lock(self.name):
+            if self.name not in engine.__dict__:
+                engine.__dict__[self.name] = self.builder(engine)
+        return engine.__dict__[self.name]
+
+
+class LazyMapping(Mapping):
+    """Read-only mapping whose values are built on first access, exactly once."""
+
+    def __init__(self, builders: Dict[str, Callable[[], Any]]):
+        """Initialize the mapping.
+
+        Args:
+            builders: Map of keys to the callables building their values.
+        """
+        self._builders = builders
+        self._lock = threading.RLock()
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            builder = self._builders[key]  # Raises KeyError for unknown keys
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = builder()
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._builders)
+
+    def __len__(self) -> int:
+        return len(self._builders)
+
+
+class IntentRouter(NamedTuple):
+    """A route layer, the encoder of user inputs built for it and the local
+    classifier of the messages it cannot place, trained on that encoder.
+    """
+
+    classifier: Any
+    encoder: Callable[[List[str]], List[List[float]]]
+    local_classifier: Any = None
+
+
+class BotEngine:
+    """Process-wide set of models, chains, agent, RAG pipeline and intent router.
+
+    Everything expensive to build lives here and is shared by every conversation.
+    Components are built on first use (or by `warm_up`) and never replaced, so the
+    engine is immutable once constructed; per-conversation state is limited to the
+    session handles (`CustomerServiceBot`) and the shared `MemoryManager`. The
+    intent router is the exception: with `router_reload`, a retrained
+    `layer.json` is swapped in between turns.
+    """
+
+    _shared: Optional["BotEngine"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        settings: Optional[BotSettings] = None,
+        llm: Optional[BaseChatModel] = None,
+        vector_store: Optional[VectorStore] = None,
+        intention_classifier: Optional[Any] = None,
+    ):
+        """Initialize the engine; its components are built lazily.
+
+        Args:
+            settings: Engine configuration. Defaults to `BotSettings()`.
+            llm: Chat model shared by every chain. Defaults to gpt-4o-mini, or the
+                offline stand-in for the offline backend.
+            vector_store: Vector store of the support documents. Defaults to the
+                Pinecone "rag" index, or the local index for the offline backend.
+            intention_classifier: Route layer classifying user intents. Defaults
+                to the one saved in `router/layer.json`.
+        """
+        self.settings = settings if settings is not None else BotSettings()
+
+        # One lock per lazily built component, so independent builds do not wait
+        self._build_lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._injected_llm = llm
+        self._injected_vector_store = vector_store
+        self._injected_intention_classifier = intention_classifier
+
+        # Shared memory manager holding the history of every conversation
+        self.memory = MemoryManager(
+            max_turns=self.settings.history_max_turns,
+            max_tokens=self.settings.history_max_tokens,
+            summarizer=self._summarize if self.settings.history_summarize else None,
+            max_sessions=self.settings.history_max_sessions,
+            idle_ttl=self.settings.history_idle_ttl,
+        )
+
+        # Per-turn spans and per-stage latency histograms of every conversation
+        self.telemetry = Telemetry()
+
+        # Map intent names to their corresponding reasoning and response chains
+        self.chain_map = LazyMapping(
+            {
+                "product_information": lambda: LazyMapping(
+                    {
+                        "reasoning": lambda: ProductInfoReasoningChain(
+                            llm=self.chain_llm("product_information.reasoning")
+                        ),
+                        "response": lambda: self.add_memory_to_runnable(
+                            ProductInfoResponseChain(
+                                llm=self.chain_llm("product_information.response")
+                            )
+                        ),
+                    }
+                ),
+                "chitchat": lambda: LazyMapping(
+                    {
+                        "reasoning": lambda: ChitChatClassifierChain(
+                            llm=self.chain_llm("chitchat.reasoning")
+                        ),
+                        "response": lambda: self.add_memory_to_runnable(
+                            ChitChatResponseChain(
+                                llm=self.chain_llm("chitchat.response")
+                            )
+                        ),
+                    }
+                ),
+                "router": lambda: LazyMapping(
+                    {
+                        "reasoning": lambda: RouterChain(
+                            llm=self.chain_llm("router.reasoning")
+                        ),
+                    }
+                ),
+                "fallback": lambda: LazyMapping(
+                    {
+                        "reasoning": lambda: FallbackRouterChain(
+                            llm=self.chain_llm("fallback.reasoning")
+                        ),
+                    }
+                ),
+                "memory": lambda: LazyMapping(
+                    {
+                        "summary": lambda: SummaryChain(
+                            llm=self.chain_llm("memory.summary")
+                        ),
+                    }
+                ),
+            }
+        )
+
+        self.agent_map = LazyMapping({"order": self._build_order_agent})
+
+        # Worker threads for calls that run concurrently within a sync turn
+        self.executor = ThreadPoolExecutor(thread_name_prefix="cobuy-engine")
+
+        # Per-conversation locks, dropped automatically once no turn holds them
+        self._locks_guard = threading.Lock()
+        self._conversation_locks: weakref.WeakValueDictionary = (
+            weakref.WeakValueDictionary()
+        )
+
+        self._frozen = True
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"{self.__class__.__name__} is immutable")
+        super().__setattr__(name, value)
+
+    def _component_lock(self, name: str) -> threading.Lock:
+        """Retrieve the lock serialising the construction of a component."""
+        with self._build_lock:
+            return self._build_locks.setdefault(name, threading.Lock())
+
+    @classmethod
+    def shared(cls) -> "BotEngine":
+        """Return the process-wide engine, creating it on first use.
+
+        Returns:
+            The shared BotEngine instance.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @lazy_component
+    def llm(self) -> BaseChatModel:
+        """The language model shared by every chain, using the LLM cache if enabled."""
+        if self._injected_llm is not None:
+            llm = self._injected_llm
+        else:
+            # Configure the language model with specific parameters for response generation
+            llm = create_chat_model(
+                self.settings.backend, temperature=0.0, model="gpt-4o-mini"
+            )
+
+        if self.llm_coalescer is not None:
+            llm = CoalescingChatModel(inner=llm, coalescer=self.llm_coalescer)
+        if self.llm_cache is not None:
+            llm = llm.model_copy(update={"cache": self.llm_cache})
+        return llm
+
+    @lazy_component
+    def uncached_llm(self) -> BaseChatModel:
+        """The shared language model, bypassing the LLM cache."""
+        if self.llm_cache is None:
+            return self.llm
+        return self.llm.model_copy(update={"cache": False})
+
+    @lazy_component
+    def llm_cache(self) -> Optional[TieredLLMCache]:
+        """Exact-match cache of LLM calls, if enabled in the settings."""
+        if not self.settings.llm_cache:
+            return None
+
+        return TieredLLMCache(
+            max_entries=self.settings.llm_cache_max_entries,
+            ttl=self.settings.llm_cache_ttl,
+            db_path=self.settings.llm_cache_path,
+            max_rows=self.settings.llm_cache_max_rows,
+        )
+
+    @lazy_component
+    def llm_coalescer(self) -> Optional[Coalescer]:
+        """Coalescer of identical concurrent LLM calls, if enabled in the settings."""
+        return Coalescer() if self.settings.coalesce_requests else None
+
+    @lazy_component
+    def retrieval_coalescer(self) -> Optional[Coalescer]:
+        """Coalescer of identical concurrent retrievals, if enabled in the settings."""
+        return Coalescer() if self.settings.coalesce_requests else None
+
+    def chain_llm(self, name: str) -> BaseChatModel:
+        """Return the language model of a chain, honouring the LLM cache opt-outs.
+
+        Args:
+            name: The chain name, e.g. "router.reasoning" or "order.tools".
+
+        Returns:
+            The shared language model, or its uncached copy if the chain opted out.
+        """
+        if name in self.settings.llm_cache_opt_out:
+            return self.uncached_llm
+        return self.llm
+
+    @lazy_component
+    def rag_pipeline(self):
+        """The RAG pipeline for support information."""
+        from cobuy.chatbot.rag.rag import RAGPipeline
+
+        return RAGPipeline(
+            index_name="rag",
+            embeddings_model="text-embedding-3-small",
+            llm=self.chain_llm("rag"),
+            memory=True,
+            coalescer=self.retrieval_coalescer,
+            vector_store=self._injected_vector_store,
+            backend=self.settings.backend,
+            query_cache=self.embedding_cache,
+        )
+
+    @lazy_component
+    def rag(self) -> RunnableWithMessageHistory:
+        """The RAG chain wrapped with session history."""
+        return self.add_memory_to_runnable(self.rag_pipeline.rag_chain)
+
+    @lazy_component
+    def intent_router(self) -> ReloadableComponent:
+        """The route layer and the encoder of user inputs, reloaded when
+        `router/layer.json` changes if enabled in the settings.
+
+        A turn leases one `IntentRouter` so that it encodes and matches with the
+        same model, even if a reload swaps in another meanwhile.
+        """
+        from cobuy.chatbot.router.loader import FILE_PATH
+
+        watch = None
+        if self.settings.router_reload and self._injected_intention_classifier is None:
+            watch = FILE_PATH
+
+        return ReloadableComponent(
+            self._build_intent_router,
+            watch=watch,
+            interval=self.settings.router_reload_interval,
+            retire=self._retire_intent_router,
+            name="intention_classifier",
+        )
+
+    @property
+    def intention_classifier(self):
+        """The route layer used to classify user intents."""
+        return self.intent_router.current.classifier
+
+    @property
+    def router_encoder(self) -> Callable[[List[str]], List[List[float]]]:
+        """Encoder of user inputs for the route layer."""
+        return self.intent_router.current.encoder
+
+    @property
+    def local_classifier(self):
+        """Classifier of the messages the route layer cannot place, if enabled and
+        trained for its encoder.
+        """
+        return self.intent_router.current.local_classifier
+
+    def _build_intent_router(self) -> IntentRouter:
+        """Load the route layer, then wrap its encoder to cache embeddings and batch
+        concurrent calls if enabled in the settings. The local classifier is loaded
+        with them, so a reload never pairs it with another encoder.
+        """
+        if self._injected_intention_classifier is not None:
+            classifier = self._injected_intention_classifier
+        else:
+            from cobuy.chatbot.router.encoders import check_onnx_agreement
+            from cobuy.chatbot.router.loader import FILE_PATH, load_intention_classifier
+
+            if self.settings.router_encoder == "onnx":
+                check_onnx_agreement(FILE_PATH)
+            # Load the intention classifier to determine user intents
+            classifier = load_intention_classifier(
+                self.settings.router_encoder, self.settings.route_index
+            )
+
+        model = classifier.encoder
+        encoder = model
+        if self.settings.encoder_batching:
+            encoder = BatchingEncoder(
+                encoder,
+                max_batch_size=self.settings.encoder_batch_max_size,
+                max_wait=self.settings.encoder_batch_window_ms / 1000,
+            )
+        # Repeated inputs are answered before they wait for a batch
+        if self.embedding_cache is not None:
+            encoder = CachedEncoder(
+                encoder, self.embedding_cache, getattr(model, "name", "router")
+            )
+        local_classifier = None
+        if self.settings.local_classifier:
+            from cobuy.chatbot.router.local_classifier import load_local_classifier
+
+            local_classifier = load_local_classifier(
+                getattr(model, "name", None), self.settings.local_classifier_threshold
+            )
+        return IntentRouter(classifier, encoder, local_classifier)
+
+    @staticmethod
+    def _retire_intent_router(router: IntentRouter) -> None:
+        """Stop the batching worker of a replaced router, which holds its model."""
+        encoder = router.encoder
+        while encoder is not None:
+            if isinstance(encoder, BatchingEncoder):
+                encoder.close()
+            encoder = getattr(encoder, "encoder", None)
+
+    @lazy_component
+    def embedding_cache(self) -> Optional[QueryEmbeddingCache]:
+        """Cache of the embeddings of customer inputs, shared by the router encoder
+        and the RAG query embeddings, if enabled in the settings.
+        """
+        if not self.settings.embedding_cache:
+            return None
+
+        return QueryEmbeddingCache(
+            max_entries=self.settings.embedding_cache_max_entries
+        )
+
+    @lazy_component
+    def prefetcher(self) -> Optional[SpeculativePrefetcher]:
+        """Prefetcher of side-effect-free handler stages, if speculative mode is on."""
+        if not self.settings.speculative:
+            return None
+
+        stages = {
+            "product_information": lambda user_input: self.chain_map[
+                "product_information"
+            ]["reasoning"].invoke(user_input),
+            "support_information": lambda user_input: self.rag_pipeline.retrieve_context(
+                user_input["customer_input"]
+            ),
+        }
+        async_stages = {
+            "product_information": lambda user_input: self.chain_map[
+                "product_information"
+            ]["reasoning"].ainvoke(user_input),
+            "support_information": lambda user_input: self.rag_pipeline.aretrieve_context(
+                user_input["customer_input"]
+            ),
+        }
+        intents = self.settings.speculative_intents
+
+        return SpeculativePrefetcher(
+            stages={k: v for k, v in stages.items() if k in intents},
+            async_stages={k: v for k, v in async_stages.items() if k in intents},
+            executor=self.executor,
+        )
+
+    @lazy_component
+    def response_cache(self) -> Optional[SemanticResponseCache]:
+        """Semantic response cache, if enabled in the settings."""
+        if not self.settings.response_cache:
+            return None
+
+        return SemanticResponseCache(
+            intents=self.settings.response_cache_intents,
+            threshold=self.settings.response_cache_threshold,
+            max_entries=self.settings.response_cache_max_entries,
+            ttl=self.settings.response_cache_ttl,
+            db_path=self.settings.response_cache_path,
+        )
+
+    def _summarize(self, summary: str, messages: List[BaseMessage]) -> str:
+        """Fold messages leaving the history window into the rolling summary."""
+        return self.chain_map["memory"]["summary"].summarize(summary, messages)
+
+    def _build_order_agent(self) -> RunnableWithMessageHistory:
+        """Build the order agent wrapped with session history."""
+        from cobuy.chatbot.agents.order_agent import OrderAgent
+
+        agent = OrderAgent(
+            llm=self.chain_llm("order.agent"), tools_llm=self.chain_llm("order.tools")
+        )
+        return self.add_memory_to_runnable(agent.agent_executor)
+
+    def warm_up(self, background: bool = True) -> Optional[Future]:
+        """Build every component ahead of the first turn that needs it.
+
+        Args:
+            background: Build on an engine worker thread instead of blocking.
+
+        Returns:
+            A future completing once everything is built when `background` is
+            True, otherwise None.
+        """
+
+        def build_all():
+            # Accessing a component builds it
+            self.intent_router
+            for chains in self.chain_map.values():
+                dict(chains)
+            dict(self.agent_map)
+            self.rag
+            self.prefetcher
+            self.response_cache
+
+        if background:
+            return self.executor.submit(build_all)
+        build_all()
+        return None
+
+    def add_memory_to_runnable(
+        self, original_runnable: Runnable[Any, Any]
+    ) -> RunnableWithMessageHistory:
+        """Wrap a runnable with session history functionality.
+
+        Args:
+            original_runnable: The runnable instance to which session history will be added.
+
+        Returns:
+            An instance of RunnableWithMessageHistory that incorporates session history.
+        """
+        return RunnableWithMessageHistory(
+            runnable=original_runnable,
+            get_session_history=self.memory.get_prompt_history,  # Retrieve windowed history
+            input_messages_key="customer_input",  # Key for user inputs
+            history_messages_key="chat_history",  # Key for chat history
+            history_factory_config=self.memory.get_history_factory_config(),  # Config for history factory
+        ).with_config(
+            {
+                "run_name": original_runnable.__class__.__name__
+            }  # Add runnable name for tracking
+        )
+
+    def conversation_lock(self, user_id: str, conversation_id: str) -> threading.Lock:
+        """Retrieve the lock serialising the turns of a conversation.
+
+        Sync turns hold it directly and async turns through
+        `async_conversation_lock`, so turns of both kinds exclude each other.
+
+        Args:
+            user_id: Identifier for the user.
+            conversation_id: Identifier for the conversation.
+
+        Returns:
+            The threading lock shared by every session of the conversation.
+        """
+        with self._locks_guard:
+            lock = self._conversation_locks.get((user_id, conversation_id))
+            if lock is None:
+                lock = threading.Lock()
+                self._conversation_locks[(user_id, conversation_id)] = lock
+            return lock
+
+    @asynccontextmanager
+    async def async_conversation_lock(
+        self, user_id: str, conversation_id: str
+    ) -> AsyncIterator[None]:
+        """Hold the lock of a conversation from async code.
+
+        The lock is the `conversation_lock` of sync turns. It is polled rather
+        than awaited in a worker thread: blocked waiters would take the threads
+        the holding turn needs, and a cancelled wait would leave it acquired.
+
+        Args:
+            user_id: Identifier for the user.
+            conversation_id: Identifier for the conversation.
+        """
+        lock = self.conversation_lock(user_id, conversation_id)
+        delay = 0.001
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _LOCK_POLL_MAX_DELAY)
+        try:
+            yield
+        finally:
+            lock.release()
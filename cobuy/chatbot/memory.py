@@ -1,13 +1,18 @@
 # Import necessary modules and classes
 import json
-from typing import Dict, List, Tuple
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
 
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
 from langchain_core.messages.ai import AIMessage
 from langchain_core.messages.human import HumanMessage
 from langchain_core.runnables import ConfigurableFieldSpec
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from cobuy.chatbot.telemetry import span
 
 
 class InMemoryHistory(BaseChatMessageHistory, BaseModel):
@@ -17,26 +22,119 @@ class InMemoryHistory(BaseChatMessageHistory, BaseModel):
     """
 
     messages: List[BaseMessage] = Field(default_factory=list)
+    summary: str = ""  # Rolling summary of the messages no longer replayed
+    summarized: int = 0  # Number of leading messages folded into the summary
+    _token_counts: List[int] = PrivateAttr(default_factory=list)
 
     def add_messages(self, messages: List[BaseMessage]):
         """Add a list of messages to the in-memory store."""
-        self.messages.extend(messages)
+        with span("memory.write", messages=len(messages)):
+            self.messages.extend(messages)
+
+    def token_counts(self, counter: Callable[[BaseMessage], int]) -> List[int]:
+        """Return the token count of every message, counting each message once.
+
+        Args:
+            counter: Counts the tokens of a message.
+
+        Returns:
+            The token counts, aligned with `messages`.
+        """
+        counts = self._token_counts
+        for message in self.messages[len(counts) :]:
+            counts.append(counter(message))
+        return counts
 
     def clear(self) -> None:
         """Clear all messages from the in-memory store."""
         self.messages = []
+        self.summary = ""
+        self.summarized = 0
+        self._token_counts = []
+
+
+def count_tokens(message: BaseMessage) -> int:
+    """Estimate the tokens of a message at four characters per token, plus the
+    per-message overhead of the chat format. Needs no tokenizer download.
+    """
+    return len(get_buffer_string([message])) // 4 + 4
+
+
+class WindowedHistory(BaseChatMessageHistory):
+    """View of a conversation history exposing only what is replayed into prompts.
+
+    Reads return the window selected by the `MemoryManager` policy; writes go to
+    the full history.
+    """
+
+    def __init__(self, history: InMemoryHistory, manager: "MemoryManager"):
+        """Initialize the view.
+
+        Args:
+            history: The full history of the conversation.
+            manager: The memory manager whose policy selects the window.
+        """
+        self.history = history
+        self.manager = manager
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """The summary of older turns, if any, followed by the recent turns."""
+        return self.manager.window(self.history)
+
+    def add_messages(self, messages: List[BaseMessage]) -> None:
+        """Add a list of messages to the full history."""
+        self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        """Clear the full history."""
+        self.history.clear()
 
 
 class MemoryManager:
     """Manages session history and configuration for user interactions.
 
     Stores session-specific configurations and provides access to
-    session histories.
+    session histories. Prompts only replay a window of each history: the last
+    `max_turns` turns that fit in `max_tokens`, optionally preceded by a rolling
+    summary of the older turns, so prompt size stays flat in long conversations.
+    Histories idle for `idle_ttl` seconds, or the least recently used beyond
+    `max_sessions`, are evicted, so memory stays bounded in a long-lived process.
     """
 
-    def __init__(self):
-        """Initialize session manager."""
-        self.store: Dict[Tuple[str, str], InMemoryHistory] = {}
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        summarizer: Optional[Callable[[str, List[BaseMessage]], str]] = None,
+        token_counter: Callable[[BaseMessage], int] = count_tokens,
+        max_sessions: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+    ):
+        """Initialize session manager.
+
+        Args:
+            max_turns: Maximum number of turns replayed, None for no limit.
+            max_tokens: Token budget of the replayed messages and summary, None for
+                no limit.
+            summarizer: Folds messages leaving the window into the rolling summary,
+                given the current summary. None drops them instead.
+            token_counter: Counts the tokens of a message.
+            max_sessions: Maximum number of histories kept, None for no limit.
+            idle_ttl: Seconds after its last use a history is evicted, None to
+                keep it.
+        """
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # Histories with their last use, least recently used first
+        self.store: "OrderedDict[Tuple[str, str], Tuple[InMemoryHistory, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
         self.history_factory_config = [
             ConfigurableFieldSpec(
                 id="user_id",
@@ -68,11 +166,109 @@ class MemoryManager:
         Returns:
             An instance of BaseChatMessageHistory for managing the chat history.
         """
-        if (user_id, conversation_id) not in self.store:
-            # Initialize new in-memory history if not already stored
-            self.store[(user_id, conversation_id)] = InMemoryHistory()
+        key = (user_id, conversation_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self.store.get(key)
+            # Initialize new in-memory history if not already stored; the lock keeps
+            # concurrent sessions of the same conversation on a single history
+            history = entry[0] if entry is not None else InMemoryHistory()
+            self.store[key] = (history, now)
+            self.store.move_to_end(key)
+            self._evict(now)
+
+        return history
+
+    def discard(self, user_id: str, conversation_id: str) -> None:
+        """Drop the history of a conversation, if any.
+
+        Args:
+            user_id: Identifier for the user.
+            conversation_id: Identifier for the conversation.
+        """
+        with self._lock:
+            self.store.pop((user_id, conversation_id), None)
+
+    def _evict(self, now: float) -> None:
+        """Drop the idle and least recently used histories; call with the lock."""
+        while self.store:
+            _, last_used = next(iter(self.store.values()))
+            idle = self.idle_ttl is not None and now - last_used > self.idle_ttl
+            full = self.max_sessions is not None and len(self.store) > self.max_sessions
+            if not (idle or full):
+                break
+            self.store.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def get_prompt_history(
+        self, user_id: str, conversation_id: str
+    ) -> BaseChatMessageHistory:
+        """Retrieve the history of a conversation as replayed into prompts.
+
+        Args:
+            user_id: Identifier for the user.
+            conversation_id: Identifier for the conversation.
+
+        Returns:
+            A view of the session history exposing the windowed messages.
+        """
+        return WindowedHistory(self.get_session_history(user_id, conversation_id), self)
+
+    def window(
+        self, history: InMemoryHistory, summarize: bool = True
+    ) -> List[BaseMessage]:
+        """Select the messages of a history to replay into a prompt.
+
+        The window holds whole turns, newest first, until `max_turns` or the token
+        budget is reached. With a summarizer, the turns left out are folded into the
+        rolling summary. The newest half of the window is kept out of the fold, so
+        summarising happens every few turns rather than on every turn.
+
+        Args:
+            history: The full history of the conversation.
+            summarize: Whether to fold turns leaving the window into the summary.
+                Otherwise, the current summary is used as is.
+
+        Returns:
+            The summary as a system message, if any, followed by the recent turns.
+        """
+        messages = history.messages
+        counts = history.token_counts(self.token_counter)
+        budget = self.max_tokens
+        if budget is not None and history.summary:
+            budget -= self.token_counter(SystemMessage(history.summary))
+
+        # Scan back from the newest message; a turn starts with a human message
+        starts: List[int] = []
+        tokens = 0
+        for i in range(len(messages) - 1, history.summarized - 1, -1):
+            tokens += counts[i]
+            if budget is not None and tokens > budget:
+                break
+            if isinstance(messages[i], HumanMessage):
+                starts.append(i)
+                if self.max_turns is not None and len(starts) >= self.max_turns:
+                    break
+        else:
+            # Everything since the summary fits
+            starts.append(history.summarized)
+        first = starts[-1] if starts else len(messages)
+
+        if summarize and self.summarizer is not None and first > history.summarized:
+            first = starts[(len(starts) - 1) // 2] if starts else len(messages)
+            with span("memory.summarize", messages=first - history.summarized):
+                history.summary = self.summarizer(
+                    history.summary, messages[history.summarized : first]
+                )
+            history.summarized = first
 
-        return self.store[(user_id, conversation_id)]
+        window = messages[first:]
+        if history.summary:
+            summary = f"Summary of the earlier conversation: {history.summary}"
+            window = [SystemMessage(summary)] + window
+        return window
 
     def get_history_factory_config(self) -> List[ConfigurableFieldSpec]:
         """Retrieve configuration settings for history factory.
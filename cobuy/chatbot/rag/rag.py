@@ -1,21 +1,24 @@
 from operator import itemgetter
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 from langchain_core.documents.base import Document
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Index, Pinecone
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from langchain_core.vectorstores import VectorStore
+from langchain_openai import ChatOpenAI
 
+from cobuy.chatbot.backends import create_vector_store
+from cobuy.chatbot.cache.embeddings import QueryEmbeddingCache
 from cobuy.chatbot.chains.base import PromptTemplate, generate_prompt_templates
+from cobuy.chatbot.coalescing import Coalescer
+from cobuy.chatbot.telemetry import span
 
 
 class RAGPipeline:
     """
     A class to encapsulate a Retrieval-Augmented Generation (RAG) pipeline.
-    This class sets up a Pinecone vector store for document retrieval and a language model for question answering.
+    This class sets up a vector store (Pinecone, or a local one offline) for document retrieval and a language model for question answering.
     """
 
     def __init__(
@@ -24,27 +27,37 @@ class RAGPipeline:
         embeddings_model: str,
         llm: ChatOpenAI,
         memory: bool = False,
+        coalescer: Optional[Coalescer] = None,
+        vector_store: Optional[VectorStore] = None,
+        backend: Optional[str] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
     ):
         """
-        Initializes the RAGPipeline with Pinecone, vector store, and LLM components.
+        Initializes the RAGPipeline with vector store and LLM components.
 
         Args:
             index_name (str): The name of the Pinecone index.
             embeddings_model (str): The OpenAI model to use for embeddings.
             llm (ChatOpenAI): The language model for question answering.
+            memory (bool): Whether the prompt includes the chat history.
+            coalescer (Coalescer, optional): Shares one retrieval between concurrent
+                identical queries.
+            vector_store (VectorStore, optional): Vector store to retrieve from
+                instead of the one of the backend.
+            backend (str, optional): "openai" for the Pinecone index, "offline" for
+                the local index. Defaults to the COBUY_BACKEND environment variable.
+            query_cache (QueryEmbeddingCache, optional): Cache of the query
+                embeddings of the backend's vector store.
         """
         # Load environment variables from a .env file
         load_dotenv()
 
-        # Initialize Pinecone and set up the index
-        self.pc = Pinecone()
-        self.index: Index = self.pc.Index(index_name)
-
         # Create a vector store with the given index and embedding model
-        self.vector_store = PineconeVectorStore(
-            index=self.index,
-            embedding=OpenAIEmbeddings(model=embeddings_model),
-        )
+        if vector_store is None:
+            vector_store = create_vector_store(
+                backend, index_name, embeddings_model, query_cache
+            )
+        self.vector_store = vector_store
 
         # Configure the retriever with similarity search and score threshold
         self.retriever = self.vector_store.as_retriever(
@@ -71,13 +84,71 @@ class RAGPipeline:
 
         # Initialize the language model
         self.llm = llm
+        self.coalescer = coalescer
 
-        # Combine components into a RAG chain
-
-        context = itemgetter("customer_input") | self.retriever | self._format_docs
+        # Combine components into a RAG chain. The retrieval step is skipped when the
+        # input already carries a prefetched `context`.
+        self._retrieval_chain = (
+            itemgetter("customer_input") | self.retriever | self._format_docs
+        )
+        context = RunnableLambda(self._get_context, afunc=self._aget_context)
         first_step = RunnablePassthrough.assign(context=context)
         self._rag_chain = first_step | self.prompt | self.llm | StrOutputParser()
 
+    def retrieve_context(self, customer_input: str) -> str:
+        """
+        Retrieves and formats the context documents for a customer query.
+
+        Args:
+            customer_input (str): The customer query.
+
+        Returns:
+            str: The formatted context for the RAG prompt.
+        """
+        with span("retrieval"):
+            if self.coalescer is None:
+                return self._retrieval_chain.invoke({"customer_input": customer_input})
+            return self.coalescer.do(
+                customer_input,
+                lambda: self._retrieval_chain.invoke(
+                    {"customer_input": customer_input}
+                ),
+            )
+
+    async def aretrieve_context(self, customer_input: str) -> str:
+        """
+        Asynchronously retrieves and formats the context documents for a customer query.
+
+        Args:
+            customer_input (str): The customer query.
+
+        Returns:
+            str: The formatted context for the RAG prompt.
+        """
+        with span("retrieval"):
+            if self.coalescer is None:
+                return await self._retrieval_chain.ainvoke(
+                    {"customer_input": customer_input}
+                )
+            return await self.coalescer.ado(
+                customer_input,
+                lambda: self._retrieval_chain.ainvoke(
+                    {"customer_input": customer_input}
+                ),
+            )
+
+    def _get_context(self, inputs: Dict[str, Any]) -> str:
+        """Return the prefetched context if present, otherwise retrieve it."""
+        if "context" in inputs:
+            return inputs["context"]
+        return self.retrieve_context(inputs["customer_input"])
+
+    async def _aget_context(self, inputs: Dict[str, Any]) -> str:
+        """Asynchronously return the prefetched context or retrieve it."""
+        if "context" in inputs:
+            return inputs["context"]
+        return await self.aretrieve_context(inputs["customer_input"])
+
     @staticmethod
     def _format_docs(documents: List[Document]):
         """
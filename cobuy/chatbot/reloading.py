@@ -0,0 +1,192 @@
+# Import necessary modules and classes
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadStats:
+    """Thread-safe counters of a reloadable component."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.failures = 0  # Builds that raised; the current value was kept
+        self.retired = 0  # Replaced values released by their last turn
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        """Increment one of the counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counters as a dictionary."""
+        with self._lock:
+            return {
+                "reloads": self.reloads,
+                "failures": self.failures,
+                "retired": self.retired,
+            }
+
+
+class _Generation:
+    """One built value of a reloadable component and the turns leasing it."""
+
+    def __init__(self, value: Any, version: int):
+        self.value = value
+        self.version = version
+        self.leases = 0
+        self.retired = False
+
+
+class ReloadableComponent:
+    """Engine component rebuilt when the file it is built from changes.
+
+    A watcher thread polls the file and builds the new value in the background;
+    turns keep using the current one meanwhile and are never blocked by a build.
+    The new value is then swapped in atomically: turns starting afterwards lease
+    it, while turns in flight finish on the value they leased. A replaced value is
+    retired, and released, only once its last turn ends.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], Any],
+        watch: Optional[str] = None,
+        interval: float = 5.0,
+        retire: Optional[Callable[[Any], None]] = None,
+        name: str = "component",
+    ):
+        """Build the first value and start watching `watch`, if given.
+
+        Args:
+            build: Builds the value, e.g. by loading the watched file.
+            watch: Path of the file whose changes trigger a reload, None to only
+                reload on `reload` calls.
+            interval: Seconds between checks of the file.
+            retire: Releases a replaced value, e.g. stops its worker threads.
+            name: Name of the component, for logs and the watcher thread.
+        """
+        self.build = build
+        self.watch = watch
+        self.interval = interval
+        self.retire = retire
+        self.name = name
+        self.stats = ReloadStats()
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()  # One build at a time
+        self._signature = self._file_signature()
+        self._current = _Generation(build(), version=0)
+        self._stopped = threading.Event()
+        self._watcher = None
+        if watch is not None:
+            self._watcher = threading.Thread(
+                target=self._watch, name=f"cobuy-reload-{name}", daemon=True
+            )
+            self._watcher.start()
+
+    @property
+    def current(self) -> Any:
+        """The latest value. Use `lease` to keep one value for a whole turn."""
+        return self._current.value
+
+    @property
+    def version(self) -> int:
+        """Number of reloads of the current value."""
+        return self._current.version
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        """Use the current value for the duration of the block.
+
+        The value is not retired before the block ends, even if a reload swaps
+        another one in meanwhile.
+
+        Yields:
+            The value current when the block starts.
+        """
+        with self._lock:
+            generation = self._current
+            generation.leases += 1
+        try:
+            yield generation.value
+        finally:
+            with self._lock:
+                generation.leases -= 1
+                release = self._should_retire(generation)
+            if release:
+                self._retire(generation)
+
+    def reload(self) -> bool:
+        """Build a new value in the calling thread and swap it in.
+
+        Returns:
+            True if the value was replaced, False if the build failed, in which
+            case the current value is kept.
+        """
+        with self._reload_lock:
+            signature = self._file_signature()
+            try:
+                value = self.build()
+            except Exception:
+                logger.exception(
+                    "Reload of %s failed, keeping the current one", self.name
+                )
+                self.stats.increment("failures")
+                self._signature = signature  # Retry on the next change only
+                return False
+
+            with self._lock:
+                previous = self._current
+                self._current = _Generation(value, previous.version + 1)
+                release = self._should_retire(previous)
+            self._signature = signature
+
+        logger.info("Reloaded %s, version %d", self.name, self.version)
+        self.stats.increment("reloads")
+        if release:
+            self._retire(previous)
+        return True
+
+    def close(self) -> None:
+        """Stop watching the file."""
+        self._stopped.set()
+
+    def _should_retire(self, generation: _Generation) -> bool:
+        """Claim the retirement of a generation no turn uses; call with the lock."""
+        if generation.leases or generation.retired or generation is self._current:
+            return False
+        generation.retired = True
+        return True
+
+    def _retire(self, generation: _Generation) -> None:
+        if self.retire is not None:
+            try:
+                self.retire(generation.value)
+            except Exception:
+                logger.exception(
+                    "Retiring version %d of %s failed", generation.version, self.name
+                )
+        generation.value = None  # Let the value be garbage collected
+        self.stats.increment("retired")
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        """Modification time and size of the watched file, None if absent."""
+        if self.watch is None:
+            return None
+        try:
+            status = os.stat(self.watch)
+        except FileNotFoundError:
+            return None
+        return status.st_mtime_ns, status.st_size
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            signature = self._file_signature()
+            if signature is not None and signature != self._signature:
+                self.reload()
@@ -1,108 +1,257 @@
 import json
+import logging
 import os
-from typing import Dict, List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
 
 # Define the base directory for file operations
 BASE_DIR = os.path.dirname(__file__)
 
 
-def add_message(new_item: Dict[str, str], file_name: str):
-    """Add a single message to a JSON file, assigning it a unique ID.
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on `path`, shared with other processes and threads.
 
     Args:
-        new_item: The message to add, provided as a dictionary.
-        file_name: The name of the JSON file to store the messages.
+        path: The lock file, created if missing.
     """
-    try:
-        file_path = os.path.join(BASE_DIR, file_name)
-
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            # Assign an initial ID when creating a new file
-            new_item["Id"] = "1"
-            data = [new_item]
-
-            # Write the data to a new file
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(data, file, indent=4)
+    with open(path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
         else:
-            # Load existing messages from the file
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-
-            # Determine the next ID based on existing data
-            if data:
-                max_id = max(int(item.get("Id")) for item in data)
-                new_item["Id"] = str(max_id + 1)
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
             else:
-                new_item["Id"] = "1"  # Start from ID 1 if the file is empty
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class IntentionStore:
+    """Append-only JSON Lines file of labelled messages.
+
+    Each line is one {"Intention", "Message", "Id"} record. Appends take a file
+    lock, so concurrent sessions and processes never lose each other's messages,
+    and cost the same whatever the size of the file: the last assigned ID is kept
+    in a counter file next to the store instead of being found by a scan. The
+    counter is not versioned, so it is reconciled with the ID of the last line,
+    read from the end of the file, in case the store was updated elsewhere, e.g.
+    by a `git pull`.
+    """
+
+    def __init__(self, path: str):
+        """Open the store, migrating the JSON file of the same name on first use.
+
+        Args:
+            path: The `.jsonl` file, created on the first append.
+
+        Raises:
+            ValueError: If the path is not a `.jsonl` file, which appending lines
+                would corrupt.
+        """
+        if not path.endswith(".jsonl"):
+            raise ValueError(f"Intention stores are .jsonl files, got {path}")
+        self.path = path
+        self.counter_path = f"{path}.id"
+        self.lock_path = f"{path}.lock"
+
+        legacy_path = os.path.splitext(path)[0] + ".json"
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            self.migrate(legacy_path)
+
+    def append(self, item: Dict[str, Any]) -> int:
+        """Append one message, assigning it the next ID.
+
+        Args:
+            item: The message; its "Id" is set.
+
+        Returns:
+            The assigned ID.
+        """
+        return self.extend([item])[0]
+
+    def extend(self, items: List[Dict[str, Any]]) -> List[int]:
+        """Append messages with one write, assigning them consecutive IDs.
+
+        Args:
+            items: The messages; their "Id" is set.
+
+        Returns:
+            The assigned IDs, in order.
+        """
+        if not items:
+            return []
+
+        with file_lock(self.lock_path):
+            first_id = self._last_id() + 1
+            ids = list(range(first_id, first_id + len(items)))
+            for item, item_id in zip(items, ids):
+                item["Id"] = item_id
+
+            # Save the counter first: a crash then leaves a gap, never a duplicate
+            self._save_last_id(ids[-1])
+            lines = "".join(
+                json.dumps(item, ensure_ascii=False) + "\n" for item in items
+            )
+            with open(self.path, "a+", encoding="utf-8") as file:
+                if file.tell() and not self._ends_with_newline():
+                    lines = "\n" + lines  # Isolate a line torn by a crash
+                file.write(lines)
+                file.flush()
+                os.fsync(file.fileno())
+        return ids
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Stream the stored messages in append order, skipping corrupt lines."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt line %d of %s", number, self.path)
+
+    def migrate(self, legacy_path: str) -> int:
+        """Copy the messages of a JSON list file into the store, once.
+
+        Args:
+            legacy_path: The JSON file written by the former `add_message`.
+
+        Returns:
+            The number of migrated messages, 0 if the store already existed.
+        """
+        with file_lock(self.lock_path):
+            if os.path.exists(self.path):
+                return 0
+            with open(legacy_path, encoding="utf-8") as file:
+                items = json.load(file)
+
+            for item in items:
+                item["Id"] = int(item["Id"])
+            temporary_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                for item in items:
+                    file.write(json.dumps(item, ensure_ascii=False) + "\n")
+            self._save_last_id(max((item["Id"] for item in items), default=0))
+            os.replace(temporary_path, self.path)
+
+        logger.info(
+            "Migrated %d messages from %s to %s", len(items), legacy_path, self.path
+        )
+        return len(items)
+
+    def _last_id(self) -> int:
+        """Read the last assigned ID: the counter, unless the last line is newer."""
+        try:
+            with open(self.counter_path, encoding="utf-8") as file:
+                counter = int(file.read())
+        except (FileNotFoundError, ValueError):
+            counter = 0
+        return max(counter, self._tail_id())
 
-            # Add the new message to the list
-            data.append(new_item)
+    def _tail_id(self, block_size: int = 4096) -> int:
+        """Read the ID of the last valid line, reading the file backwards by blocks.
 
-            # Save the updated list back to the file
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(data, file, indent=4)
+        Args:
+            block_size: Bytes read at a time from the end of the file.
 
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from file {file_name}: {e}")
-        raise
-    except (IOError, OSError) as e:
-        print(f"Error accessing or writing to file {file_name}: {e}")
-        raise
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        raise
+        Returns:
+            The ID, or 0 if the store is missing or has no valid line.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as file:
+            end = file.seek(0, os.SEEK_END)
+            partial = b""
+            while end > 0:
+                start = max(0, end - block_size)
+                file.seek(start)
+                lines = (file.read(end - start) + partial).split(b"\n")
+                end = start
+                # The first piece may be the end of a line starting further back
+                partial = lines.pop(0) if end > 0 else b""
+                for line in reversed(lines):
+                    if not line.strip():
+                        continue
+                    try:
+                        return int(json.loads(line)["Id"])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # A line torn by a crash
+        return 0
 
+    def _save_last_id(self, last_id: int) -> None:
+        temporary_path = f"{self.counter_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(str(last_id))
+        os.replace(temporary_path, self.counter_path)
 
-def add_messages(new_items: List[Dict[str, str]], file_name: str):
-    """Add multiple messages to a JSON file, assigning unique IDs to each.
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+
+def open_store(file_name: str, directory: Optional[str] = None) -> IntentionStore:
+    """Open the intention store of a file in the `router` folder.
 
     Args:
-        new_items: A list of dictionaries representing the messages to add.
-        file_name: The name of the JSON file to store the messages.
+        file_name: Name of the store, e.g. "new_intentions.jsonl".
+        directory: Folder of the store. Defaults to the `router` folder.
+
+    Returns:
+        The store.
     """
-    file_path: str = os.path.join(BASE_DIR, file_name)
-    try:
-
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            # Assign sequential IDs starting from 1 for a new file
-            for i, item in enumerate(new_items, 1):
-                item["Id"] = str(i)
-
-            # Write all new items to a new file
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(new_items, file, indent=4)
-        else:
-            # Load existing messages from the file
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
+    return IntentionStore(os.path.join(directory or BASE_DIR, file_name))
 
-            # Determine the starting ID for the new items
-            if data:
-                max_id = max(int(item.get("Id")) for item in data)
-            else:
-                max_id = 1  # Start from ID 1 if the file is empty
-
-            # Assign unique IDs to each new item
-            for new_item in new_items:
-                max_id += 1
-                new_item["Id"] = str(max_id)
-
-            # Add the new items to the existing data
-            data.extend(new_items)
-
-            # Save the updated data back to the file
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(data, file, indent=4)
-
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from file {file_path}: {e}")
-        raise
-    except (IOError, OSError) as e:
-        print(f"Error accessing or writing to file {file_path}: {e}")
-        raise
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        raise
+
+def iter_messages(file_name: str) -> Iterator[Dict[str, Any]]:
+    """Stream the messages of an intention store in the `router` folder.
+
+    Args:
+        file_name: Name of the store, e.g. "new_intentions.jsonl".
+
+    Yields:
+        The {"Intention", "Message", "Id"} records, in append order.
+    """
+    yield from open_store(file_name)
+
+
+def add_message(new_item: Dict[str, Any], file_name: str) -> int:
+    """Add a single message to an intention store, assigning it a unique ID.
+
+    Args:
+        new_item: The message to add, provided as a dictionary.
+        file_name: The name of the JSON Lines file to store the messages.
+
+    Returns:
+        The ID of the message.
+    """
+    return open_store(file_name).append(new_item)
+
+
+def add_messages(new_items: List[Dict[str, Any]], file_name: str) -> List[int]:
+    """Add multiple messages to an intention store, assigning unique IDs to each.
+
+    Args:
+        new_items: A list of dictionaries representing the messages to add.
+        file_name: The name of the JSON Lines file to store the messages.
+
+    Returns:
+        The IDs of the messages, in order.
+    """
+    return open_store(file_name).extend(new_items)
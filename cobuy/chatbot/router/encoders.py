@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic.v1 import PrivateAttr
+from semantic_router.encoders import AutoEncoder, BaseEncoder
+from semantic_router.layer import LayerConfig
+
+# Encoders of the route layer: the one named in `layer.json`, or the int8 ONNX
+# export of the same MiniLM, which needs neither torch nor transformers
+ROUTER_ENCODERS = ("layer", "onnx")
+
+# Published int8 export of sentence-transformers/all-MiniLM-L6-v2
+ONNX_REPO_ID = "Xenova/all-MiniLM-L6-v2"
+ONNX_MODEL_FILE = "onnx/model_quantized.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+
+# Folder checked for `model_quantized.onnx` and `tokenizer.json` before the Hub
+ONNX_MODEL_DIR = os.path.join(os.path.dirname(__file__), "models", "all-MiniLM-L6-v2")
+
+# Int8 quantization changes the weights, so the bot only serves the export once
+# `benchmarks.router_encoders` has shown, in this report, that it routes the
+# dataset like the original model with the current `layer.json`
+ONNX_AGREEMENT_PATH = os.path.join(ONNX_MODEL_DIR, "agreement.json")
+ONNX_MIN_AGREEMENT = 0.99
+
+
+class OnnxEncoder(BaseEncoder):
+    """MiniLM sentence encoder running an int8 ONNX export on onnxruntime.
+
+    Embeddings are computed as by `HuggingFaceEncoder`: mean pooling of the token
+    embeddings over the attention mask, then L2 normalisation. The int8 weights
+    only approximate those of `source_name`, so the embeddings, and the routes
+    near a threshold, can differ. Only onnxruntime (the `onnx` extra), tokenizers
+    and huggingface_hub are needed.
+    """
+
+    # Distinct from the original model: the embeddings differ, so caches and the
+    # local classifier keyed by encoder name must not mix them
+    name: str = ONNX_REPO_ID
+    type: str = "onnx"
+    source_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    score_threshold: float = 0.5
+    model_dir: str = ONNX_MODEL_DIR
+    max_length: int = 512
+    batch_size: int = 32
+    threads: Optional[int] = None
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: List[str] = PrivateAttr()
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        self._session, self._tokenizer = self._initialize_model()
+        self._input_names = [
+            model_input.name for model_input in self._session.get_inputs()
+        ]
+
+    def _model_file(self, file_name: str) -> str:
+        """Path of a model file, downloaded from the Hub if not in `model_dir`."""
+        path = os.path.join(self.model_dir, os.path.basename(file_name))
+        if os.path.exists(path):
+            return path
+
+        from huggingface_hub import hf_hub_download
+
+        return hf_hub_download(ONNX_REPO_ID, file_name)
+
+    def _initialize_model(self):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError(
+                "Please install onnxruntime to use OnnxEncoder. "
+                "You can install it with: `pip install onnxruntime`"
+            )
+        from tokenizers import Tokenizer
+
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        session = onnxruntime.InferenceSession(
+            self._model_file(ONNX_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+        tokenizer = Tokenizer.from_file(self._model_file(ONNX_TOKENIZER_FILE))
+        tokenizer.enable_truncation(max_length=self.max_length)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        return session, tokenizer
+
+    def __call__(self, docs: List[str]) -> List[List[float]]:
+        all_embeddings = []
+        for i in range(0, len(docs), self.batch_size):
+            encodings = self._tokenizer.encode_batch(docs[i : i + self.batch_size])
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array(
+                    [e.attention_mask for e in encodings], dtype=np.int64
+                ),
+                "token_type_ids": np.array(
+                    [e.type_ids for e in encodings], dtype=np.int64
+                ),
+            }
+            token_embeddings = self._session.run(
+                None, {name: inputs[name] for name in self._input_names}
+            )[0]
+
+            # Mean pooling over the real tokens, then L2 normalisation
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(
+                mask.sum(axis=1), 1e-9, None
+            )
+            embeddings /= np.clip(
+                np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None
+            )
+            all_embeddings.extend(embeddings.tolist())
+        return all_embeddings
+
+
+def create_router_encoder(encoder: str, config: LayerConfig) -> BaseEncoder:
+    """Create the encoder of the route layer.
+
+    Args:
+        encoder: One of `ROUTER_ENCODERS`.
+        config: The route layer configuration read from `layer.json`.
+
+    Returns:
+        The encoder.
+
+    Raises:
+        ValueError: If the encoder is unknown, or is "onnx" while `layer.json` uses
+            another model than the exported one.
+    """
+    if encoder == "layer":
+        return AutoEncoder(type=config.encoder_type, name=config.encoder_name).model
+    if encoder == "onnx":
+        if config.encoder_name != OnnxEncoder.__fields__["source_name"].default:
+            raise ValueError(
+                f"No ONNX export of {config.encoder_name}, the encoder of layer.json"
+            )
+        return OnnxEncoder()
+    raise ValueError(f"Unknown encoder {encoder!r}, expected one of {ROUTER_ENCODERS}")
+
+
+def layer_digest(path: str) -> str:
+    """Hash of a layer file, identifying the thresholds an agreement was measured on."""
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def check_onnx_agreement(
+    layer_path: str, report_path: str = ONNX_AGREEMENT_PATH
+) -> Dict[str, Any]:
+    """Check that the ONNX export was shown to route like the original model.
+
+    Args:
+        layer_path: The layer file the bot loads.
+        report_path: The report written by `benchmarks.router_encoders`.
+
+    Returns:
+        The report.
+
+    Raises:
+        ValueError: If there is no report for this layer file, or the route
+            decisions of the two encoders agree less than `ONNX_MIN_AGREEMENT`.
+    """
+    if not os.path.exists(report_path):
+        raise ValueError(
+            f"No {report_path}: run `python -m benchmarks.router_encoders` before "
+            "selecting the onnx router encoder"
+        )
+    with open(report_path, encoding="utf-8") as file:
+        report = json.load(file)
+    if report.get("layer_sha256") != layer_digest(layer_path):
+        raise ValueError(
+            f"{report_path} was measured on another {os.path.basename(layer_path)}: "
+            "run `python -m benchmarks.router_encoders` again"
+        )
+    if report["agreement"] < ONNX_MIN_AGREEMENT:
+        raise ValueError(
+            f"The onnx router encoder agrees with the layer encoder on "
+            f"{report['agreement']:.1%} of the routes, below {ONNX_MIN_AGREEMENT:.0%}"
+        )
+    return report
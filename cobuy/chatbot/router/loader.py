@@ -1,16 +1,35 @@
+import json
 import os
+from typing import List, Tuple
 
 from semantic_router import RouteLayer
+from semantic_router.layer import LayerConfig
+
+from cobuy.chatbot.router.auxiliar import iter_messages
+from cobuy.chatbot.router.encoders import create_router_encoder
+from cobuy.chatbot.router.route_layer import FaissRouteLayer, MatrixRouteLayer
 
 FILENAME = "layer.json"
 BASE_DIR = os.path.dirname(__file__)
 FILE_PATH = os.path.join(BASE_DIR, FILENAME)
 
 
-def load_intention_classifier() -> RouteLayer:
+def load_intention_classifier(
+    encoder: str = "layer", route_index: str = "exact"
+) -> RouteLayer:
     """
     Load json a file in the `router` folder.
 
+    The utterance embeddings are read from `router/embeddings/` when they were
+    saved for the same encoder and utterances, and encoded and saved otherwise.
+
+    Args:
+        encoder: "layer" for the encoder named in the file, or "onnx" for its
+            int8 ONNX export, which runs without torch.
+        route_index: "exact" to score every utterance, or "faiss" to search an
+            approximate HNSW index, saved next to the embeddings, for large
+            utterance sets.
+
     Returns:
         RouteLayer object to classify user intentions.
 
@@ -21,6 +40,61 @@ def load_intention_classifier() -> RouteLayer:
     if not os.path.exists(FILE_PATH):
         raise FileNotFoundError(f"File not found: {FILE_PATH}")
 
-    rl = RouteLayer.from_json(FILE_PATH)
+    config = LayerConfig.from_file(FILE_PATH)
+    route_layer_class = FaissRouteLayer if route_index == "faiss" else MatrixRouteLayer
+    rl = route_layer_class(
+        encoder=create_router_encoder(encoder, config), routes=config.routes
+    )
 
     return rl
+
+
+def load_labelled_messages(file_name: str) -> Tuple[List[str], List[str]]:
+    """
+    Load the messages and intent labels of a json file in the `router` folder.
+
+    Args:
+        file_name: Name of the file, e.g. "synthetic_intetions.json", or of an
+            intention store, e.g. "new_intentions.jsonl".
+
+    Returns:
+        The messages and their labels; "None" labels messages outside every route.
+    """
+    if file_name.endswith(".jsonl"):
+        data = list(iter_messages(file_name))
+    else:
+        with open(os.path.join(BASE_DIR, file_name), encoding="utf-8") as file:
+            data = json.load(file)
+
+    return [item["Message"] for item in data], [item["Intention"] for item in data]
+
+
+def load_router_split(
+    test_size: float = 0.1, random_state: int = 0
+) -> Tuple[List[str], List[str], List[str], List[str]]:
+    """
+    Build the train and held-out sets used to train and evaluate the router.
+
+    As in `train_evaluate_router.ipynb`, the synthetic messages are split with
+    stratification, and the new messages all go to the train set.
+
+    Args:
+        test_size: Fraction of the synthetic messages held out.
+        random_state: Seed of the split.
+
+    Returns:
+        The train messages, train labels, test messages and test labels.
+    """
+    from sklearn.model_selection import train_test_split
+
+    messages, labels = load_labelled_messages("synthetic_intetions.json")
+    X_train, X_test, y_train, y_test = train_test_split(
+        messages,
+        labels,
+        test_size=test_size,
+        random_state=random_state,
+        stratify=labels,
+    )
+
+    new_messages, new_labels = load_labelled_messages("new_intentions.jsonl")
+    return X_train + new_messages, y_train + new_labels, X_test, y_test
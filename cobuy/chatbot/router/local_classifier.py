@@ -0,0 +1,221 @@
+"""Second-stage intent classifier for the messages the route layer cannot place.
+
+Train it, report its accuracy on the held-out split and save it next to
+`layer.json`:
+
+    python -m cobuy.chatbot.router.local_classifier --threshold 0.8
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cobuy.chatbot.router.loader import (
+    BASE_DIR,
+    load_intention_classifier,
+    load_router_split,
+)
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.path.join(BASE_DIR, "local_classifier.pkl")
+
+# The datasets label messages outside every route "None"; the bot answers them
+# as chitchat
+CHITCHAT_LABEL = "chitchat"
+
+
+def to_class(label: Optional[str]) -> str:
+    """Map a dataset label to a class of the classifier."""
+    return CHITCHAT_LABEL if label in (None, "None") else label
+
+
+class LocalIntentClassifier:
+    """Multinomial logistic regression over the route layer embeddings.
+
+    Logistic regression is fitted by minimising the log loss, so its probabilities
+    are calibrated well enough to gate on: `predict` only answers when the most
+    likely class reaches `threshold`, leaving the other messages to the LLM.
+    """
+
+    def __init__(self, model, encoder_name: Optional[str], threshold: float = 0.8):
+        """Initialize the classifier.
+
+        Args:
+            model: A fitted scikit-learn classifier with `predict_proba`.
+            encoder_name: Name of the encoder that produced the training embeddings.
+            threshold: Minimum probability for a prediction to be returned.
+        """
+        self.model = model
+        self.encoder_name = encoder_name
+        self.threshold = threshold
+
+    @classmethod
+    def fit(
+        cls,
+        vectors: Sequence[Sequence[float]],
+        labels: Sequence[Optional[str]],
+        encoder_name: Optional[str],
+        threshold: float = 0.8,
+    ) -> "LocalIntentClassifier":
+        """Train a classifier.
+
+        Args:
+            vectors: Embeddings of the training messages.
+            labels: Their intent labels; "None" and None become "chitchat".
+            encoder_name: Name of the encoder that produced the embeddings.
+            threshold: Minimum probability for a prediction to be returned.
+
+        Returns:
+            The trained classifier.
+        """
+        from sklearn.linear_model import LogisticRegression
+
+        model = LogisticRegression(max_iter=1000)
+        model.fit(np.asarray(vectors), [to_class(label) for label in labels])
+        return cls(model, encoder_name, threshold)
+
+    def predict_proba(self, vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        """Return the probability of every class, in the order of `classes`."""
+        return self.model.predict_proba(np.asarray(vectors))
+
+    @property
+    def classes(self) -> List[str]:
+        """The classes: the intents and "chitchat"."""
+        return list(self.model.classes_)
+
+    def predict(self, vector: Sequence[float]) -> Tuple[Optional[str], float]:
+        """Classify one embedding.
+
+        Args:
+            vector: The embedding of the message.
+
+        Returns:
+            The predicted class, or None below the threshold, and its probability.
+        """
+        probabilities = self.predict_proba([vector])[0]
+        best = int(np.argmax(probabilities))
+        confidence = float(probabilities[best])
+        if confidence < self.threshold:
+            return None, confidence
+        return self.classes[best], confidence
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        """Save the classifier to a pickle file."""
+        with open(path, "wb") as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(
+        path: str = MODEL_PATH, threshold: Optional[float] = None
+    ) -> "LocalIntentClassifier":
+        """Load a classifier saved by `save`.
+
+        Args:
+            path: The pickle file.
+            threshold: Overrides the saved threshold if given.
+
+        Returns:
+            The classifier.
+        """
+        with open(path, "rb") as file:
+            classifier = pickle.load(file)
+        if threshold is not None:
+            classifier.threshold = threshold
+        return classifier
+
+
+def load_local_classifier(
+    encoder_name: Optional[str], threshold: Optional[float] = None
+) -> Optional[LocalIntentClassifier]:
+    """Load the saved classifier if it was trained on the given encoder.
+
+    Args:
+        encoder_name: Name of the encoder of the route layer in use.
+        threshold: Overrides the saved threshold if given.
+
+    Returns:
+        The classifier, or None if none was saved or it was trained on another
+        encoder.
+    """
+    if not os.path.exists(MODEL_PATH):
+        return None
+
+    classifier = LocalIntentClassifier.load(MODEL_PATH, threshold)
+    if classifier.encoder_name != encoder_name:
+        logger.warning(
+            "Ignoring %s: trained on %s, the router uses %s",
+            MODEL_PATH,
+            classifier.encoder_name,
+            encoder_name,
+        )
+        return None
+    return classifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--threshold", type=float, default=0.8, help="Minimum confidence to answer"
+    )
+    args = parser.parse_args()
+
+    route_layer = load_intention_classifier()
+    encoder = route_layer.encoder
+    X_train, y_train, X_test, y_test = load_router_split()
+
+    start = time.perf_counter()
+    classifier = LocalIntentClassifier.fit(
+        encoder(X_train), y_train, encoder.name, args.threshold
+    )
+    print(f"Trained on {len(X_train)} messages in {time.perf_counter() - start:.1f} s")
+
+    # Replay the held-out messages through the route layer, then the gate
+    vectors = encoder(X_test)
+    classes = [to_class(label) for label in y_test]
+    local_correct = router_correct = fallback = 0
+    answered = answered_correct = 0
+    for vector, expected in zip(vectors, classes):
+        routes = route_layer.retrieve_multiple_routes(vector=vector)
+        routed = routes[0].name if routes else None
+        probabilities = classifier.predict_proba([vector])[0]
+        local_correct += classifier.classes[int(np.argmax(probabilities))] == expected
+        if routed is not None:
+            router_correct += routed == expected
+            continue
+
+        fallback += 1
+        predicted, _ = classifier.predict(vector)
+        if predicted is not None:
+            answered += 1
+            answered_correct += predicted == expected
+
+    total = len(classes)
+    print(f"Held-out messages: {total}")
+    print(f"Local classifier accuracy (ungated): {local_correct / total:.1%}")
+    print(f"Routed by the route layer: {total - fallback} ({router_correct} correct)")
+    print(
+        f"Unrouted, answered locally: {answered}/{fallback} "
+        f"({answered_correct} correct)"
+    )
+    print(
+        "Accuracy of the turns classified without the LLM: "
+        f"{(router_correct + answered_correct) / max(total - fallback + answered, 1):.1%}"
+    )
+    print(
+        "Turns avoiding an LLM classification call: "
+        f"{(total - fallback + answered) / total:.1%} "
+        f"(without the local classifier: {(total - fallback) / total:.1%})"
+    )
+
+    classifier.save()
+    print(f"Saved {MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from semantic_router import RouteLayer
+from semantic_router.encoders import BaseEncoder
+from semantic_router.schema import RouteChoice
+
+logger = logging.getLogger(__name__)
+
+# Utterance embeddings of `layer.json`, one `.npy` file per encoder and utterances
+EMBEDDINGS_DIR = os.path.join(os.path.dirname(__file__), "embeddings")
+
+
+def embeddings_key(encoder: BaseEncoder, utterances: Sequence[str]) -> str:
+    """Key of the embeddings of `utterances` produced by `encoder`.
+
+    Any change to the encoder or to the utterances, their order included, gives
+    another key, so stale embeddings are never loaded.
+    """
+    digest = hashlib.sha256(f"{encoder.type}\0{encoder.name}".encode())
+    for utterance in utterances:
+        digest.update(b"\0" + utterance.encode())
+    return digest.hexdigest()[:16]
+
+
+def normalise_rows(matrix: Any) -> np.ndarray:
+    """Scale the rows of a matrix to unit length, leaving zero rows as they are."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def load_utterance_embeddings(
+    encoder: BaseEncoder, utterances: Sequence[str], directory: Optional[str]
+) -> np.ndarray:
+    """Load the normalised embeddings of the utterances, encoding them on a miss.
+
+    Args:
+        encoder: The encoder of the route layer.
+        utterances: The utterances of every route, in index order.
+        directory: Where the embeddings are persisted, None to always encode.
+
+    Returns:
+        A float32 matrix with one unit row per utterance, memory-mapped when loaded.
+    """
+    if directory is None:
+        return normalise_rows(encoder(list(utterances)))
+
+    path = os.path.join(directory, f"{embeddings_key(encoder, utterances)}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+
+    logger.info("Encoding %d route utterances into %s", len(utterances), path)
+    embeddings = normalise_rows(encoder(list(utterances)))
+    save_utterance_embeddings(embeddings, encoder, utterances, directory)
+    return embeddings
+
+
+def save_utterance_embeddings(
+    embeddings: np.ndarray,
+    encoder: BaseEncoder,
+    utterances: Sequence[str],
+    directory: str = EMBEDDINGS_DIR,
+) -> str:
+    """Save normalised utterance embeddings where `load_utterance_embeddings` looks.
+
+    Args:
+        embeddings: One normalised row per utterance.
+        encoder: The encoder that produced them.
+        utterances: The utterances of every route, in index order.
+        directory: The embeddings folder.
+
+    Returns:
+        The path of the saved file.
+    """
+    path = os.path.join(directory, f"{embeddings_key(encoder, utterances)}.npy")
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename, so concurrent workers never load a partial file
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        np.save(file, np.asarray(embeddings, dtype=np.float32))
+    os.replace(temporary_path, path)
+    return path
+
+
+class MatrixRouteLayer(RouteLayer):
+    """Route layer scoring all utterances with one matrix-vector product.
+
+    The utterance embeddings are loaded from `embeddings_dir` instead of being
+    encoded at every start, and stored normalised, so the cosine similarities of a
+    query are `matrix @ query`. Routes are then picked as by `RouteLayer`: the
+    `top_k` most similar utterances are grouped by route.
+    """
+
+    def __init__(
+        self,
+        encoder: BaseEncoder,
+        routes: List[Any],
+        top_k: int = 5,
+        aggregation: str = "sum",
+        embeddings_dir: Optional[str] = EMBEDDINGS_DIR,
+    ):
+        """Initialize the route layer.
+
+        Args:
+            encoder: The encoder of the utterances and queries.
+            routes: The routes and their utterances.
+            top_k: Number of most similar utterances considered per query.
+            aggregation: How the scores of a route are combined by `__call__`.
+            embeddings_dir: Where the utterance embeddings are persisted, None to
+                encode them at every start.
+        """
+        self.embeddings_dir = embeddings_dir
+        self._matrix: Optional[np.ndarray] = None
+        super().__init__(
+            encoder=encoder, routes=routes, top_k=top_k, aggregation=aggregation
+        )
+
+    def _add_routes(self, routes: List[Any]):
+        route_names, utterances, _, _ = self._extract_routes_details(
+            routes, include_metadata=True
+        )
+        embeddings = load_utterance_embeddings(
+            self.encoder, utterances, self.embeddings_dir
+        )
+        # Share the matrix with the index rather than copying it
+        self.index.index = embeddings
+        self.index.routes = np.array(route_names)
+        self.index.utterances = np.array(utterances)
+        self._set_matrix(embeddings, embeddings_key(self.encoder, utterances))
+
+    def add(self, route: Any):
+        super().add(route)
+        self._set_matrix(normalise_rows(self.index.index))
+
+    def delete(self, route_name: str):
+        super().delete(route_name)
+        if self.index.index is not None and len(self.index.index):
+            self._set_matrix(normalise_rows(self.index.index))
+        else:
+            self._matrix = None
+
+    def _set_matrix(self, matrix: np.ndarray, key: Optional[str] = None) -> None:
+        """Use `matrix` for scoring and map its rows to route indices.
+
+        Args:
+            matrix: The normalised utterance embeddings.
+            key: Their `embeddings_key` if persisted, None after a change.
+        """
+        self._route_names, self._route_ids = np.unique(
+            self.index.routes, return_inverse=True
+        )
+        self._matrix = matrix
+
+    @staticmethod
+    def _query(vector: Any) -> np.ndarray:
+        """Normalise a query vector."""
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def _search(self, vector: Any, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the `top_k` utterances most similar to a query vector.
+
+        Returns:
+            Their cosine similarities and row indices, in no particular order.
+        """
+        similarities = self._matrix @ self._query(vector)
+        top_k = min(top_k, len(similarities))
+        top = np.argpartition(similarities, -top_k)[-top_k:]
+        return similarities[top], top
+
+    def _retrieve(
+        self, xq: Any, top_k: int = 5, route_filter: Optional[List[str]] = None
+    ) -> List[Dict]:
+        if self._matrix is None or route_filter is not None:
+            return super()._retrieve(xq, top_k=top_k, route_filter=route_filter)
+
+        scores, top = self._search(xq, top_k)
+        return [
+            {"route": str(self.index.routes[i]), "score": float(score)}
+            for score, i in zip(scores, top)
+        ]
+
+    def retrieve_multiple_routes(
+        self,
+        text: Optional[str] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[RouteChoice]:
+        """Return every route whose best score among the `top_k` most similar
+        utterances passes its threshold, most similar first.
+
+        Args:
+            text: The query, encoded if no vector is given.
+            vector: The embedding of the query.
+
+        Returns:
+            The matched routes with their best similarity.
+        """
+        if self._matrix is None:
+            return super().retrieve_multiple_routes(text=text, vector=vector)
+        if vector is None:
+            if text is None:
+                raise ValueError("Either text or vector must be provided")
+            vector = self._encode(text=text)
+
+        scores, top = self._search(vector, self.top_k)
+
+        # Best score of each route among the top utterances, -inf for the others
+        best = np.full(len(self._route_names), -np.inf, dtype=np.float32)
+        np.maximum.at(best, self._route_ids[top], scores)
+
+        choices = []
+        for i in np.argsort(-best):
+            route = self.check_for_matching_routes(str(self._route_names[i]))
+            if route is None:
+                continue
+            threshold = (
+                route.score_threshold
+                if route.score_threshold is not None
+                else self.score_threshold
+            )
+            if best[i] > threshold:
+                choices.append(
+                    RouteChoice(name=route.name, similarity_score=float(best[i]))
+                )
+        return choices
+
+
+class FaissRouteLayer(MatrixRouteLayer):
+    """Route layer finding the most similar utterances with a FAISS HNSW index.
+
+    The search is approximate, so it scales to large utterance sets; routes are
+    then picked from the `top_k` utterances found exactly as by `MatrixRouteLayer`.
+    The index is saved next to the utterance embeddings and loaded at later starts.
+    """
+
+    def __init__(
+        self,
+        encoder: BaseEncoder,
+        routes: List[Any],
+        top_k: int = 5,
+        aggregation: str = "sum",
+        embeddings_dir: Optional[str] = EMBEDDINGS_DIR,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+    ):
+        """Initialize the route layer.
+
+        Args:
+            encoder: The encoder of the utterances and queries.
+            routes: The routes and their utterances.
+            top_k: Number of most similar utterances considered per query.
+            aggregation: How the scores of a route are combined by `__call__`.
+            embeddings_dir: Where the utterance embeddings and the index are
+                persisted, None to build them at every start.
+            hnsw_m: Neighbours per node of the HNSW graph.
+            ef_search: Candidates explored per query; higher is slower but closer
+                to the exact search.
+        """
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self._faiss_index = None
+        super().__init__(
+            encoder=encoder,
+            routes=routes,
+            top_k=top_k,
+            aggregation=aggregation,
+            embeddings_dir=embeddings_dir,
+        )
+
+    def _build_index(self, matrix: np.ndarray):
+        import faiss
+
+        index = faiss.IndexHNSWFlat(
+            matrix.shape[1], self.hnsw_m, faiss.METRIC_INNER_PRODUCT
+        )
+        index.add(np.ascontiguousarray(matrix, dtype=np.float32))
+        return index
+
+    def _load_index(self, matrix: np.ndarray, key: Optional[str]):
+        """Load the saved index of `key`, building and saving it on a miss."""
+        import faiss
+
+        if key is None or self.embeddings_dir is None:
+            return self._build_index(matrix)
+
+        path = os.path.join(self.embeddings_dir, f"{key}.hnsw{self.hnsw_m}.faiss")
+        if os.path.exists(path):
+            return faiss.read_index(path)
+
+        logger.info("Building the route index %s", path)
+        index = self._build_index(matrix)
+        os.makedirs(self.embeddings_dir, exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        faiss.write_index(index, temporary_path)
+        os.replace(temporary_path, path)
+        return index
+
+    def _set_matrix(self, matrix: np.ndarray, key: Optional[str] = None) -> None:
+        super()._set_matrix(matrix, key)
+        self._faiss_index = self._load_index(matrix, key)
+        self._faiss_index.hnsw.efSearch = max(self.ef_search, self.top_k)
+
+    def _search(self, vector: Any, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores, ids = self._faiss_index.search(self._query(vector)[None, :], top_k)
+        # Missing neighbours are reported as -1
+        found = ids[0] >= 0
+        return scores[0][found], ids[0][found]
@@ -0,0 +1,350 @@
+"""Train the intent route layer and write a new version of `layer.json`.
+
+Replaces `train_evaluate_router.ipynb`: the labelled messages are split as in the
+notebook, the route thresholds are fitted on the train set and evaluated on the
+held-out set. Message embeddings are cached by content hash, so a retraining only
+encodes the messages added since the last run:
+
+    python -m cobuy.chatbot.router.trainer
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from semantic_router import Route
+from semantic_router.encoders import BaseEncoder
+from semantic_router.layer import LayerConfig
+
+from cobuy.chatbot.router.encoders import ROUTER_ENCODERS, create_router_encoder
+from cobuy.chatbot.router.loader import FILE_PATH, load_router_split
+from cobuy.chatbot.router.route_layer import (
+    EMBEDDINGS_DIR,
+    embeddings_key,
+    normalise_rows,
+    save_utterance_embeddings,
+)
+
+ROUTE_DESCRIPTIONS = {
+    "order_status": "The user wants to know the status of their order.",
+    "create_order": "The user intends to place an order for a product on the Cobuy platform.",
+    "product_information": "The user is interested in obtaining information about a specific product available on the Cobuy platform.",
+    "support_information": "The user is seeking information on pricing, availability, delivery, returns, customer support, and additional services like payment methods, user manuals, and warranties.",
+}
+
+# Candidate thresholds of the search
+THRESHOLD_GRID = np.round(np.arange(0.0, 1.0001, 0.01), 2)
+
+
+def message_hash(text: str) -> str:
+    """Content hash identifying a message in the embedding cache."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class MessageEmbeddingCache:
+    """Normalised message embeddings of one encoder, keyed by content hash and
+    saved as a `.npz` file in the embeddings folder.
+    """
+
+    def __init__(self, encoder: BaseEncoder, directory: str = EMBEDDINGS_DIR):
+        """Load the cache of `encoder`, empty if it was never saved.
+
+        Args:
+            encoder: The encoder of the messages.
+            directory: The embeddings folder.
+        """
+        self.encoder = encoder
+        self.path = os.path.join(
+            directory, f"messages_{embeddings_key(encoder, [])}.npz"
+        )
+        self.encoded = 0  # Messages encoded since the cache was loaded
+
+        self._rows: Dict[str, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                self._vectors = data["vectors"]
+                self._rows = {h: i for i, h in enumerate(data["hashes"].tolist())}
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the normalised embeddings of `texts`, encoding the missing ones.
+
+        Args:
+            texts: The messages.
+
+        Returns:
+            One row per message, in order.
+        """
+        hashes = [message_hash(text) for text in texts]
+        missing = {h: text for h, text in zip(hashes, texts) if h not in self._rows}
+        if missing:
+            vectors = normalise_rows(self.encoder(list(missing.values())))
+            start = len(self._rows)
+            self._vectors = (
+                np.concatenate([self._vectors, vectors]) if start else vectors
+            )
+            self._rows.update({h: start + i for i, h in enumerate(missing)})
+            self.encoded += len(missing)
+        return self._vectors[[self._rows[h] for h in hashes]]
+
+    def save(self) -> None:
+        """Write the cache, replacing the previous file atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        hashes = sorted(self._rows, key=self._rows.get)
+        temporary_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(temporary_path, hashes=np.array(hashes), vectors=self._vectors)
+        os.replace(temporary_path, self.path)
+
+
+def route_scores(
+    vectors: np.ndarray,
+    utterances: np.ndarray,
+    route_ids: np.ndarray,
+    n_routes: int,
+    top_k: int = 5,
+    exclude: Optional[np.ndarray] = None,
+    chunk_size: int = 1024,
+) -> np.ndarray:
+    """Best similarity of each route among the `top_k` utterances closest to each
+    message, as computed by `MatrixRouteLayer.retrieve_multiple_routes`.
+
+    Args:
+        vectors: Normalised message embeddings.
+        utterances: Normalised utterance embeddings.
+        route_ids: Route index of each utterance.
+        n_routes: Number of routes.
+        top_k: Number of most similar utterances considered per message.
+        exclude: Utterance row of each message, -1 for none, left out of its
+            scores so that a message is not matched with itself.
+        chunk_size: Messages scored at once, bounding the memory used.
+
+    Returns:
+        A (messages, routes) matrix, -inf for routes outside the top utterances.
+    """
+    top_k = min(top_k, len(utterances))
+    best = np.full((len(vectors), n_routes), -np.inf, dtype=np.float32)
+    for start in range(0, len(vectors), chunk_size):
+        similarities = vectors[start : start + chunk_size] @ utterances.T
+        rows = np.arange(len(similarities))[:, None]
+        if exclude is not None:
+            own = exclude[start : start + chunk_size]
+            similarities[rows[own >= 0, 0], own[own >= 0]] = -np.inf
+        top = np.argpartition(similarities, -top_k, axis=1)[:, -top_k:]
+        np.maximum.at(
+            best[start : start + chunk_size],
+            (np.broadcast_to(rows, top.shape), route_ids[top]),
+            similarities[rows, top],
+        )
+    return best
+
+
+def decide(scores: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Route decisions for one or many threshold vectors.
+
+    Args:
+        scores: A (messages, routes) matrix from `route_scores`.
+        thresholds: A (routes,) or (candidates, routes) array.
+
+    Returns:
+        The index of the best route passing its threshold, -1 for none, with one
+        row per candidate if `thresholds` is 2-D.
+    """
+    passed = scores > thresholds[..., None, :]
+    masked = np.where(passed, scores, -np.inf)
+    return np.where(passed.any(axis=-1), masked.argmax(axis=-1), -1)
+
+
+def fit_thresholds(
+    scores: np.ndarray,
+    labels: np.ndarray,
+    initial: np.ndarray,
+    grid: np.ndarray = THRESHOLD_GRID,
+    max_rounds: int = 10,
+) -> Tuple[np.ndarray, float]:
+    """Fit the route thresholds by coordinate ascent over a grid.
+
+    Each step evaluates every grid value of one route's threshold at once, the
+    others fixed, and keeps the most accurate (the closest to the current value on
+    ties). Rounds over all routes repeat until accuracy stops improving.
+
+    Args:
+        scores: A (messages, routes) matrix from `route_scores`.
+        labels: Route index of each message, -1 for none.
+        initial: Starting thresholds.
+        grid: Candidate values of a threshold.
+        max_rounds: Maximum number of rounds.
+
+    Returns:
+        The thresholds and their accuracy.
+    """
+    thresholds = initial.astype(np.float32)
+    accuracy = float(np.mean(decide(scores, thresholds) == labels))
+    for _ in range(max_rounds):
+        previous = accuracy
+        for route in range(len(thresholds)):
+            candidates = np.repeat(thresholds[None, :], len(grid), axis=0)
+            candidates[:, route] = grid
+            accuracies = np.mean(decide(scores, candidates) == labels, axis=1)
+            best = np.flatnonzero(accuracies == accuracies.max())
+            choice = best[np.argmin(np.abs(grid[best] - thresholds[route]))]
+            thresholds[route] = grid[choice]
+            accuracy = float(accuracies[choice])
+        if accuracy <= previous:
+            break
+    return thresholds, accuracy
+
+
+def build_routes(
+    messages: Sequence[str], labels: Sequence[Optional[str]], thresholds: np.ndarray
+) -> List[Route]:
+    """Build one route per intent from its labelled messages, in the order of
+    `ROUTE_DESCRIPTIONS`.
+    """
+    return [
+        Route(
+            name=name,
+            description=description,
+            utterances=[m for m, label in zip(messages, labels) if label == name],
+            score_threshold=float(threshold),
+        )
+        for (name, description), threshold in zip(
+            ROUTE_DESCRIPTIONS.items(), thresholds
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--encoder",
+        choices=ROUTER_ENCODERS,
+        default="layer",
+        help="Encoder of the utterances; onnx only with --dry-run, as the layer "
+        "file names the encoder its thresholds are fitted for",
+    )
+    parser.add_argument("--test-size", type=float, default=0.1)
+    parser.add_argument("--random-state", type=int, default=0)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--output", default=FILE_PATH, help="Layer file to write")
+    parser.add_argument(
+        "--embeddings-dir",
+        default=EMBEDDINGS_DIR,
+        help="Where the message cache and the utterance embeddings are saved",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report without writing anything"
+    )
+    args = parser.parse_args()
+    if args.encoder != "layer" and not args.dry_run:
+        # The thresholds would be written for the encoder named in the layer file
+        parser.error(f"--encoder {args.encoder} requires --dry-run")
+
+    start = time.perf_counter()
+    # The layer being replaced gives the encoder, the starting thresholds and the version
+    source = args.output if os.path.exists(args.output) else FILE_PATH
+    with open(source) as file:
+        previous = json.load(file)
+    config = LayerConfig.from_file(source)
+    encoder = create_router_encoder(args.encoder, config)
+    cache = MessageEmbeddingCache(encoder, args.embeddings_dir)
+
+    X_train, y_train, X_test, y_test = load_router_split(
+        args.test_size, args.random_state
+    )
+    route_names = list(ROUTE_DESCRIPTIONS)
+    route_index = {name: i for i, name in enumerate(route_names)}
+    train_labels = np.array([route_index.get(label, -1) for label in y_train])
+    test_labels = np.array([route_index.get(label, -1) for label in y_test])
+
+    # The utterances are the labelled train messages, grouped by route
+    order = np.argsort(train_labels[train_labels >= 0], kind="stable")
+    utterance_rows = np.flatnonzero(train_labels >= 0)[order]
+    train_vectors = cache.embed(X_train)
+    test_vectors = cache.embed(X_test)
+    utterances = train_vectors[utterance_rows]
+    utterance_routes = train_labels[utterance_rows]
+    encoded_s = time.perf_counter() - start
+    print(
+        f"Encoded {cache.encoded} new of {len(X_train) + len(X_test)} messages "
+        f"in {encoded_s:.1f} s"
+    )
+
+    # Every message is scored against the utterances once; thresholds only filter.
+    # Train messages are scored without their own utterance, as unseen messages.
+    own_rows = np.full(len(X_train), -1)
+    own_rows[utterance_rows] = np.arange(len(utterance_rows))
+    train_scores = route_scores(
+        train_vectors,
+        utterances,
+        utterance_routes,
+        len(route_names),
+        args.top_k,
+        exclude=own_rows,
+    )
+    test_scores = route_scores(
+        test_vectors, utterances, utterance_routes, len(route_names), args.top_k
+    )
+    routes_before = {route.name: route for route in config.routes}
+    initial = np.array(
+        [
+            routes_before[name].score_threshold if name in routes_before else 0.5
+            for name in route_names
+        ]
+    )
+    fit_start = time.perf_counter()
+    thresholds, train_accuracy = fit_thresholds(train_scores, train_labels, initial)
+    test_accuracy = float(np.mean(decide(test_scores, thresholds) == test_labels))
+    before_accuracy = float(np.mean(decide(test_scores, initial) == test_labels))
+    print(f"Fitted thresholds in {time.perf_counter() - fit_start:.2f} s")
+    for name, threshold in zip(route_names, thresholds):
+        print(f"  {name:<22}{threshold:.2f}")
+    print(f"Train accuracy: {train_accuracy:.1%}")
+    print(
+        f"Test accuracy: {test_accuracy:.1%} (previous thresholds: {before_accuracy:.1%})"
+    )
+
+    if args.dry_run:
+        return
+
+    cache.save()
+    routes = build_routes(X_train, y_train, thresholds)
+    layer_utterances = [u for route in routes for u in route.utterances]
+    artefact = save_utterance_embeddings(
+        utterances, encoder, layer_utterances, args.embeddings_dir
+    )
+
+    layer = LayerConfig(
+        routes=routes,
+        encoder_type=config.encoder_type,
+        encoder_name=config.encoder_name,
+    ).to_dict()
+    layer.update(
+        {
+            "version": previous.get("version", 0) + 1,
+            "trained_at": datetime.datetime.now(datetime.timezone.utc).isoformat(
+                timespec="seconds"
+            ),
+            "embeddings": os.path.basename(artefact),
+            "metrics": {
+                "train_accuracy": train_accuracy,
+                "test_accuracy": test_accuracy,
+            },
+        }
+    )
+    temporary_path = f"{args.output}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(layer, file, indent=4)
+    os.replace(temporary_path, args.output)
+    print(
+        f"Wrote {args.output} version {layer['version']} and {artefact} "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Import necessary modules and classes
+import os
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BotSettings(BaseModel):
+    """Process-wide configuration of the bot engine."""
+
+    backend: Literal["openai", "offline"] = Field(
+        default_factory=lambda: os.getenv("COBUY_BACKEND", "openai"),
+        description=(
+            "OpenAI and Pinecone, or in-process stand-ins needing no network; "
+            "defaults to the COBUY_BACKEND environment variable"
+        ),
+    )
+
+    speculative: bool = Field(
+        default=False,
+        description="Start side-effect-free handler stages while the router runs",
+    )
+    speculative_intents: List[str] = Field(
+        default=["product_information", "support_information"],
+        description="Intents whose first stage is prefetched in speculative mode",
+    )
+    response_cache: bool = Field(
+        default=False,
+        description="Serve repeated questions of cached intents from a semantic cache",
+    )
+    response_cache_intents: List[str] = Field(
+        default=["product_information", "support_information"],
+        description="Intents whose responses are cached; order intents are refused",
+    )
+    response_cache_threshold: float = Field(
+        default=0.95,
+        description="Minimum cosine similarity between a query and a cached one",
+    )
+    response_cache_max_entries: int = Field(
+        default=1024, description="Maximum number of cached responses"
+    )
+    response_cache_ttl: float = Field(
+        default=3600.0, description="Time to live of a cached response, in seconds"
+    )
+    response_cache_path: Optional[str] = Field(
+        default=None,
+        description="SQLite file persisting the response cache, None for memory only",
+    )
+    llm_cache: bool = Field(
+        default=False,
+        description="Answer identical LLM calls from an exact-match prompt cache",
+    )
+    llm_cache_max_entries: int = Field(
+        default=4096, description="Maximum number of entries of the in-memory tier"
+    )
+    llm_cache_ttl: float = Field(
+        default=24 * 3600.0, description="Time to live of a cached LLM call, in seconds"
+    )
+    llm_cache_path: Optional[str] = Field(
+        default=None,
+        description="SQLite file of the persistent LLM cache tier, None for memory only",
+    )
+    llm_cache_max_rows: int = Field(
+        default=100_000, description="Maximum number of entries of the SQLite tier"
+    )
+    llm_cache_opt_out: List[str] = Field(
+        default=[],
+        description=(
+            "Chains calling the LLM uncached: product_information.reasoning, "
+            "product_information.response, chitchat.reasoning, chitchat.response, "
+            "router.reasoning, fallback.reasoning, memory.summary, order.agent, "
+            "order.tools or rag"
+        ),
+    )
+    router_encoder: Literal["layer", "onnx"] = Field(
+        default="layer",
+        description=(
+            "Encoder of the route layer: the model named in layer.json, or its int8 "
+            "ONNX export on onnxruntime, which needs neither torch nor transformers; "
+            "onnx is refused until benchmarks.router_encoders shows both route alike"
+        ),
+    )
+    route_index: Literal["exact", "faiss"] = Field(
+        default="exact",
+        description=(
+            "Search of the route utterances: exact over all of them, or an "
+            "approximate FAISS index for tens of thousands of utterances"
+        ),
+    )
+    router_reload: bool = Field(
+        default=False,
+        description=(
+            "Watch router/layer.json and swap a retrained route layer in between "
+            "turns, without restarting"
+        ),
+    )
+    router_reload_interval: float = Field(
+        default=5.0, description="Seconds between checks of router/layer.json"
+    )
+    embedding_cache: bool = Field(
+        default=True,
+        description=(
+            "Reuse the embeddings of repeated customer inputs in the router and the "
+            "RAG retriever"
+        ),
+    )
+    embedding_cache_max_entries: int = Field(
+        default=10_000, description="Maximum number of cached input embeddings"
+    )
+    encoder_batching: bool = Field(
+        default=False,
+        description="Encode the inputs of concurrent turns together in batched passes",
+    )
+    encoder_batch_window_ms: float = Field(
+        default=2.0,
+        description="Longest time an input waits for others to batch with, in ms",
+    )
+    encoder_batch_max_size: int = Field(
+        default=32, description="Most inputs encoded in one batched pass"
+    )
+    local_classifier: bool = Field(
+        default=True,
+        description=(
+            "Classify unrouted messages with the trained local classifier, if "
+            "saved, before calling the LLM"
+        ),
+    )
+    local_classifier_threshold: float = Field(
+        default=0.8,
+        description="Minimum probability for the local classifier to answer",
+    )
+    history_max_turns: Optional[int] = Field(
+        default=10,
+        description="Most recent turns replayed into prompts, None for all",
+    )
+    history_max_tokens: Optional[int] = Field(
+        default=2000,
+        description="Token budget of the history replayed into prompts, None for no limit",
+    )
+    history_max_sessions: Optional[int] = Field(
+        default=None,
+        description=(
+            "Conversation histories kept, least recently used evicted first and "
+            "lost; None keeps every history"
+        ),
+    )
+    history_idle_ttl: Optional[float] = Field(
+        default=None,
+        description=(
+            "Seconds after which an idle conversation history is evicted and lost; "
+            "None keeps every history"
+        ),
+    )
+    history_summarize: bool = Field(
+        default=False,
+        description="Fold turns leaving the history window into a rolling summary",
+    )
+    coalesce_requests: bool = Field(
+        default=False,
+        description="Share one call between identical concurrent LLM calls and retrievals",
+    )
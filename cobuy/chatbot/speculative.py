@@ -0,0 +1,206 @@
+# Import necessary modules and classes
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+# Intents whose handlers have side effects or call the order agent; never prefetched
+NON_SPECULATIVE_INTENTS = frozenset({"create_order", "order_status"})
+
+
+class SpeculationStats:
+    """Thread-safe counters describing how useful speculative prefetching is."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self._lock = threading.Lock()
+        self.turns = 0  # Turns that started speculative stages
+        self.launched = 0  # Speculative stages started
+        self.hits = 0  # Stages whose result was used by the handler
+        self.wasted = 0  # Stages whose result was discarded
+
+    def record(self, launched: int, hit: bool) -> None:
+        """Record the outcome of a speculative turn.
+
+        Args:
+            launched: Number of stages started for the turn.
+            hit: Whether the stage of the classified intent was used.
+        """
+        with self._lock:
+            self.turns += 1
+            self.launched += launched
+            self.hits += int(hit)
+            self.wasted += launched - int(hit)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of speculative turns whose handler used a prefetched stage."""
+        return self.hits / self.turns if self.turns else 0.0
+
+    @property
+    def waste_rate(self) -> float:
+        """Fraction of speculative stages whose result was discarded."""
+        return self.wasted / self.launched if self.launched else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return the counters and rates as a dictionary."""
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "launched": self.launched,
+                "hits": self.hits,
+                "wasted": self.wasted,
+                "hit_rate": self.hit_rate,
+                "waste_rate": self.waste_rate,
+            }
+
+
+class Speculation:
+    """Stages prefetched for a single turn on the sync path."""
+
+    def __init__(self, futures: Dict[str, Future], stats: SpeculationStats):
+        """Initialize the speculation.
+
+        Args:
+            futures: Map of intent names to their running stages.
+            stats: Counters updated when the speculation is claimed.
+        """
+        self._futures = futures
+        self._stats = stats
+
+    def claim(self, intent: Optional[str]) -> Optional[Any]:
+        """Keep the stage of the classified intent and discard the rest.
+
+        Args:
+            intent: The intent returned by the router.
+
+        Returns:
+            The prefetched result for the intent, or None if there is none or the
+            stage failed (the handler then runs the stage itself).
+        """
+        launched = len(self._futures)
+        future = self._futures.pop(intent, None)
+        for other in self._futures.values():
+            other.cancel()  # Only stops stages still queued; running ones are ignored
+        self._futures = {}
+
+        result = None
+        if future is not None:
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+
+        self._stats.record(launched, hit=result is not None)
+        return result
+
+
+class AsyncSpeculation:
+    """Stages prefetched for a single turn on the async path."""
+
+    def __init__(self, tasks: Dict[str, asyncio.Task], stats: SpeculationStats):
+        """Initialize the speculation.
+
+        Args:
+            tasks: Map of intent names to their running stages.
+            stats: Counters updated when the speculation is claimed.
+        """
+        self._tasks = tasks
+        self._stats = stats
+
+    async def claim(self, intent: Optional[str]) -> Optional[Any]:
+        """Keep the stage of the classified intent and cancel the rest.
+
+        Args:
+            intent: The intent returned by the router.
+
+        Returns:
+            The prefetched result for the intent, or None if there is none or the
+            stage failed.
+        """
+        launched = len(self._tasks)
+        task = self._tasks.pop(intent, None)
+        for other in self._tasks.values():
+            other.cancel()
+        self._tasks = {}
+
+        result = None
+        if task is not None:
+            try:
+                result = await task
+            except Exception:
+                result = None
+
+        self._stats.record(launched, hit=result is not None)
+        return result
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    """Mark a discarded task's exception as retrieved to silence asyncio warnings."""
+    if not task.cancelled():
+        task.exception()
+
+
+class SpeculativePrefetcher:
+    """Starts the cheap, side-effect-free first stages of likely handlers while the
+    intent router is still running.
+    """
+
+    def __init__(
+        self,
+        stages: Mapping[str, Callable[[Dict[str, str]], Any]],
+        async_stages: Mapping[str, Callable[[Dict[str, str]], Awaitable[Any]]],
+        executor: Executor,
+    ):
+        """Initialize the prefetcher.
+
+        Args:
+            stages: Map of intent names to their sync first stage.
+            async_stages: Map of intent names to their async first stage.
+            executor: Executor running the sync stages.
+
+        Raises:
+            ValueError: If a stage is registered for an order intent.
+        """
+        unsafe = NON_SPECULATIVE_INTENTS.intersection({*stages, *async_stages})
+        if unsafe:
+            raise ValueError(f"Intents cannot run speculatively: {sorted(unsafe)}")
+
+        self.stages = dict(stages)
+        self.async_stages = dict(async_stages)
+        self.executor = executor
+        self.stats = SpeculationStats()
+
+    def start(self, user_input: Dict[str, str]) -> Speculation:
+        """Start every sync stage in the executor.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The speculation to claim once the intent is known.
+        """
+        futures = {
+            intent: self.executor.submit(
+                contextvars.copy_context().run, stage, dict(user_input)
+            )
+            for intent, stage in self.stages.items()
+        }
+        return Speculation(futures, self.stats)
+
+    def astart(self, user_input: Dict[str, str]) -> AsyncSpeculation:
+        """Start every async stage as a task on the running event loop.
+
+        Args:
+            user_input: The input text from the user.
+
+        Returns:
+            The speculation to claim once the intent is known.
+        """
+        tasks = {}
+        for intent, stage in self.async_stages.items():
+            task = asyncio.ensure_future(stage(dict(user_input)))
+            task.add_done_callback(_consume_exception)
+            tasks[intent] = task
+        return AsyncSpeculation(tasks, self.stats)
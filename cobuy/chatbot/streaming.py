@@ -0,0 +1,233 @@
+# Import necessary modules and classes
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from langchain.schema.runnable.base import Runnable
+
+# Marks the end of a stream handed over between threads
+_END = object()
+
+
+class _HandOver:
+    """Queue passing the items of a producer thread to a consumer, until either
+    side stops. The producer is cancelled when the consumer's iteration ends,
+    whether the stream is exhausted, closed or garbage collected.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        """Initialize the queue.
+
+        Args:
+            maxsize: Items buffered before the producer waits, 0 for no limit.
+        """
+        self.items: queue.Queue = queue.Queue(maxsize)
+        self.cancelled = threading.Event()
+
+    def put(self, item: Any, error: Optional[BaseException] = None) -> bool:
+        """Hand over an item, waiting for room in the queue.
+
+        Returns:
+            False if the consumer stopped, in which case the producer should too.
+        """
+        while not self.cancelled.is_set():
+            try:
+                self.items.put((item, error), timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            while True:
+                item, error = self.items.get()
+                if item is _END:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            self.cancelled.set()
+
+
+def iterate_in_thread(
+    async_iterator_factory: Callable[[], AsyncIterator[Any]],
+    executor: Executor,
+    maxsize: int = 64,
+) -> Iterator[Any]:
+    """Consume an async iterator from synchronous code.
+
+    The iterator is driven by a private event loop on an executor thread and its
+    items are handed over through a bounded queue as soon as they are produced.
+    If the consumer stops early, the async iterator is closed.
+
+    Args:
+        async_iterator_factory: Callable returning the async iterator to consume.
+        executor: Executor providing the thread that runs the event loop.
+        maxsize: Items buffered ahead of the consumer.
+
+    Yields:
+        The items of the async iterator, in order.
+
+    Raises:
+        Exception: Any exception raised by the async iterator.
+    """
+    hand_over = _HandOver(maxsize)
+
+    async def drain():
+        iterator = async_iterator_factory()
+        try:
+            async for item in iterator:
+                if not hand_over.put(item):
+                    break
+        except BaseException as e:
+            hand_over.put(_END, e)
+        else:
+            hand_over.put(_END)
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    executor.submit(contextvars.copy_context().run, asyncio.run, drain())
+    yield from hand_over
+
+
+def iterate_in_worker(iterator_factory: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+    """Run a generator to completion on a worker thread, yielding its items.
+
+    The worker does not wait for the consumer, so locks and context held by the
+    generator are released as soon as it finishes, however slowly the items are
+    consumed. If the consumer stops early, the generator is closed after its
+    current item. The worker runs in a copy of the caller's context.
+
+    Args:
+        iterator_factory: Callable returning the generator to run.
+
+    Yields:
+        The items of the generator, in order.
+
+    Raises:
+        Exception: Any exception raised by the generator.
+    """
+    hand_over = _HandOver()
+
+    def produce():
+        iterator = iterator_factory()
+        try:
+            for item in iterator:
+                if not hand_over.put(item):
+                    break
+        except BaseException as e:
+            hand_over.put(_END, e)
+        else:
+            hand_over.put(_END)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    # A dedicated thread, so streams nested in the turn cannot starve the executor
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(produce,),
+        name="cobuy-stream",
+        daemon=True,
+    ).start()
+    yield from hand_over
+
+
+async def aiterate_in_task(
+    async_iterator_factory: Callable[[], AsyncIterator[Any]],
+) -> AsyncIterator[Any]:
+    """Run an async generator to completion in a task, yielding its items.
+
+    The async counterpart of `iterate_in_worker`: the task does not wait for the
+    consumer, so locks held by the generator are released as soon as it finishes,
+    and context variables it sets stay in the task's context, where they are also
+    reset, instead of leaking into the consumer between items. If the consumer
+    stops early, the task is cancelled.
+
+    Args:
+        async_iterator_factory: Callable returning the async generator to run.
+
+    Yields:
+        The items of the generator, in order.
+
+    Raises:
+        Exception: Any exception raised by the generator.
+    """
+    items: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        iterator = async_iterator_factory()
+        try:
+            async for item in iterator:
+                items.put_nowait((item, None))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            items.put_nowait((_END, e))
+        else:
+            items.put_nowait((_END, None))
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    # The task runs in a copy of the current context
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item, error = await items.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        task.cancel()
+
+
+async def astream_agent_answer(
+    agent: Runnable, inputs: Dict[str, Any], config: Dict[str, Any]
+) -> AsyncIterator[str]:
+    """Stream the tokens of an agent's final answer.
+
+    Tokens produced by LLM calls nested inside tools (such as the order reasoning
+    chains) are skipped. When the answer is returned directly by a tool, nothing is
+    streamed by the agent's LLM and the tool output is yielded once at the end.
+
+    Args:
+        agent: The agent executor, optionally wrapped with message history.
+        inputs: The agent inputs.
+        config: The run configuration.
+
+    Yields:
+        The answer tokens.
+    """
+    tool_runs = set()
+    streamed = False
+    output = None
+
+    async for event in agent.astream_events(inputs, config=config, version="v2"):
+        kind = event["event"]
+        if kind == "on_tool_start":
+            tool_runs.add(event["run_id"])
+        elif kind == "on_chat_model_stream":
+            if tool_runs.intersection(event["parent_ids"]):
+                continue
+            content = event["data"]["chunk"].content
+            if isinstance(content, str) and content:
+                streamed = True
+                yield content
+        elif kind == "on_chain_end" and not event["parent_ids"]:
+            output = event["data"].get("output")
+
+    if not streamed and output is not None:
+        answer = output.get("output") if isinstance(output, dict) else output
+        yield str(answer)
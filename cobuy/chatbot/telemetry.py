@@ -0,0 +1,355 @@
+# Import necessary modules and classes
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1,
+    2,
+    5,
+    10,
+    20,
+    50,
+    100,
+    200,
+    500,
+    1000,
+    2000,
+    5000,
+    10000,
+    30000,
+    float("inf"),
+)
+
+
+class LatencyHistogram:
+    """Bucketed latency distribution of a stage, with percentile estimates."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        """Initialize an empty histogram.
+
+        Args:
+            buckets: Increasing upper bounds of the buckets, in milliseconds. The
+                last bound should be infinity.
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        """Add a measurement to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, q: float) -> float:
+        """Estimate a percentile by interpolating within its bucket.
+
+        Args:
+            q: The percentile, between 0 and 100.
+
+        Returns:
+            The estimated latency in milliseconds, 0 for an empty histogram.
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = min(self.buckets[i], self.max_ms)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the summary statistics and the bucket counts."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "buckets": {
+                str(bound): count for bound, count in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class Span(NamedTuple):
+    """A timed stage of a turn."""
+
+    stage: str  # Stage name, e.g. "router.encode" or "llm"
+    offset_ms: float  # Start time relative to the start of the turn
+    duration_ms: float
+    attributes: Dict[str, Any]
+
+
+class Turn:
+    """The spans recorded while handling one user input (or one batch group)."""
+
+    def __init__(self, kind: str = "turn", intent: Optional[str] = None):
+        """Start the turn.
+
+        Args:
+            kind: Name of the stage timing the whole turn.
+            intent: The intent of the turn, if already known.
+        """
+        self.kind = kind
+        self.intent = intent
+        self.start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()  # Spans may come from worker threads
+
+    def add_span(
+        self, stage: str, start: float, end: float, attributes: Dict[str, Any]
+    ) -> None:
+        """Record a stage that ran between two `time.perf_counter` readings."""
+        span = Span(
+            stage, (start - self.start) * 1000, (end - start) * 1000, attributes
+        )
+        with self._lock:
+            self.spans.append(span)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the turn and its spans as a JSON-serialisable dictionary."""
+        with self._lock:
+            spans = [span._asdict() for span in self.spans]
+        return {
+            "kind": self.kind,
+            "intent": self.intent,
+            "duration_ms": self.duration_ms,
+            "spans": spans,
+        }
+
+
+# The turn being handled in the current context, if any
+_current_turn: ContextVar[Optional[Turn]] = ContextVar("cobuy_turn", default=None)
+
+
+def current_turn() -> Optional[Turn]:
+    """Return the turn being handled in the current context, if any."""
+    return _current_turn.get()
+
+
+def set_intent(intent: Optional[str]) -> None:
+    """Label the current turn with its classified intent."""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.intent = intent
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Time a stage of the current turn.
+
+    Outside of a turn this only costs a context variable lookup.
+
+    Args:
+        stage: Name of the stage.
+        **attributes: Attributes stored with the span.
+
+    Yields:
+        The attributes of the span, which the caller may extend.
+    """
+    turn = _current_turn.get()
+    if turn is None:
+        yield attributes
+        return
+
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        turn.add_span(stage, start, time.perf_counter(), attributes)
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """Callback handler recording every LLM call of a turn as an "llm" span,
+    with its model and token counts.
+    """
+
+    run_inline = True  # Keep the callbacks in the context of the call
+
+    def __init__(self):
+        """Initialize the handler."""
+        self._runs: Dict[UUID, Tuple[Turn, float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        turn = _current_turn.get()
+        if turn is None:
+            return
+        attributes = {"model": (metadata or {}).get("ls_model_name")}
+        with self._lock:
+            self._runs[run_id] = (turn, time.perf_counter(), attributes)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs
+    ) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs
+    ) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        turn, start, attributes = run
+        attributes.update(_token_counts(response))
+        turn.add_span("llm", start, time.perf_counter(), attributes)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        turn, start, attributes = run
+        attributes["error"] = type(error).__name__
+        turn.add_span("llm", start, time.perf_counter(), attributes)
+
+
+def _token_counts(response: LLMResult) -> Dict[str, int]:
+    """Extract the prompt and completion token counts of an LLM result."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+        }
+
+    # Streamed and non-OpenAI results report usage on the messages instead
+    counts = {"prompt_tokens": 0, "completion_tokens": 0}
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage_metadata:
+                counts["prompt_tokens"] += usage_metadata.get("input_tokens", 0)
+                counts["completion_tokens"] += usage_metadata.get("output_tokens", 0)
+    return counts
+
+
+# LangChain adds the handler of this variable to every run configured while it is
+# set, so LLM calls are timed without passing callbacks through each chain
+_callback_handler: ContextVar[Optional[TelemetryCallbackHandler]] = ContextVar(
+    "cobuy_telemetry_callback_handler", default=None
+)
+register_configure_hook(_callback_handler, inheritable=True)
+_handler = TelemetryCallbackHandler()
+
+
+class Telemetry:
+    """In-process collector of turn spans and per-stage, per-intent latency
+    histograms.
+    """
+
+    def __init__(self, max_turns: int = 1000):
+        """Initialize the collector.
+
+        Args:
+            max_turns: Number of recent turns kept with their spans.
+        """
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Optional[str]], LatencyHistogram] = {}
+        self.turns: deque = deque(maxlen=max_turns)
+
+    @contextmanager
+    def turn(self, kind: str = "turn", intent: Optional[str] = None) -> Iterator[Turn]:
+        """Record the spans of everything run inside the block as one turn.
+
+        Args:
+            kind: Name of the stage timing the whole turn.
+            intent: The intent of the turn, if already known (see `set_intent`).
+
+        Yields:
+            The turn being recorded.
+        """
+        turn = Turn(kind, intent)
+        turn_token = _current_turn.set(turn)
+        handler_token = _callback_handler.set(_handler)
+        try:
+            yield turn
+        finally:
+            _callback_handler.reset(handler_token)
+            _current_turn.reset(turn_token)
+            turn.duration_ms = (time.perf_counter() - turn.start) * 1000
+            self.record(turn)
+
+    def record(self, turn: Turn) -> None:
+        """Add a finished turn and its spans to the histograms."""
+        with self._lock:
+            self.turns.append(turn)
+            self._observe(turn.kind, turn.intent, turn.duration_ms)
+            for span in turn.spans:
+                self._observe(span.stage, turn.intent, span.duration_ms)
+
+    def _observe(self, stage: str, intent: Optional[str], duration_ms: float) -> None:
+        histogram = self._histograms.get((stage, intent))
+        if histogram is None:
+            histogram = self._histograms[(stage, intent)] = LatencyHistogram()
+        histogram.observe(duration_ms)
+
+    def histogram(
+        self, stage: str, intent: Optional[str] = None
+    ) -> Optional[LatencyHistogram]:
+        """Retrieve the histogram of a stage for an intent, if anything was recorded."""
+        return self._histograms.get((stage, intent))
+
+    def export(self) -> Dict[str, Any]:
+        """Export the histograms and the recent turns.
+
+        Returns:
+            A JSON-serialisable dictionary.
+        """
+        with self._lock:
+            histograms = [
+                {"stage": stage, "intent": intent, **histogram.as_dict()}
+                for (stage, intent), histogram in sorted(
+                    self._histograms.items(),
+                    key=lambda item: (item[0][0], str(item[0][1])),
+                )
+            ]
+            turns = [turn.as_dict() for turn in self.turns]
+        return {"histograms": histograms, "turns": turns}
+
+    def export_json(self, path: str) -> None:
+        """Write `export()` to a JSON file.
+
+        Args:
+            path: Path of the file to write.
+        """
+        with open(path, "w") as file:
+            json.dump(self.export(), file, indent=2)
+
+    def reset(self) -> None:
+        """Drop every recorded turn and histogram."""
+        with self._lock:
+            self._histograms.clear()
+            self.turns.clear()
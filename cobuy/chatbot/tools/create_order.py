@@ -1,11 +1,16 @@
+import asyncio
 import sqlite3
-from typing import Type
+from typing import Any, Optional, Type
 
 from langchain.tools import BaseTool
-from langchain_openai import ChatOpenAI
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from cobuy.chatbot.chains.create_order import CreateOrderReasoningChain
+from cobuy.chatbot.backends import create_chat_model
+from cobuy.chatbot.chains.create_order import (
+    CreateOrderReasoningChain,
+    OrderInformation,
+)
+from cobuy.chatbot.telemetry import span
 from cobuy.data.loader import get_sqlite_database_path
 
 
@@ -19,46 +24,78 @@ class CreateOrderTool(BaseTool):
     description: str = "Create a new order in the e-commerce database"
     args_schema: Type[BaseModel] = CreateOrderInput
     return_direct: bool = True
+    llm: Optional[Any] = None  # Shared language model, built on demand if missing
+    _reasoning_chain: Optional[CreateOrderReasoningChain] = PrivateAttr(default=None)
+
+    @property
+    def reasoning_chain(self) -> CreateOrderReasoningChain:
+        """Build the reasoning chain once and reuse it for every call."""
+        if self._reasoning_chain is None:
+            llm = (
+                self.llm
+                if self.llm is not None
+                else create_chat_model(model="gpt-4o-mini")
+            )
+            self._reasoning_chain = CreateOrderReasoningChain(
+                llm, get_sqlite_database_path()
+            )
+        return self._reasoning_chain
+
+    def _insert_order(
+        self, db_path: str, customer_id: int, order_info: OrderInformation
+    ) -> str:
+        with span("sqlite", query="insert_order"):
+            connection = sqlite3.connect(db_path)
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(
+                    "SELECT product_id, price FROM products WHERE name = ?",
+                    (order_info.product_name,),
+                )
+                product_id, price = cursor.fetchone()
+
+                total_amount = price * order_info.quantity
+                order_date = "2023-05-01"
+                quantity = order_info.quantity
+
+                cursor.execute(
+                    "INSERT INTO orders (customer_id, product_id, quantity, total_amount, order_date) VALUES (?, ?, ?, ?, ?)",
+                    (customer_id, product_id, quantity, total_amount, order_date),
+                )
+                connection.commit()
+
+                id = cursor.lastrowid
+            except sqlite3.OperationalError as e:
+                print(f"Error: {e}")
+                return "An error occurred while creating the order."
+            finally:
+                cursor.close()
+                connection.close()
+
+            return f"Order created with ID: {id}"
 
     def _run(
         self,
         customer_id: int,
         customer_input: str,
     ) -> str:
-        llm = ChatOpenAI(model="gpt-4o-mini")
         db_path = get_sqlite_database_path()
-        order_info = CreateOrderReasoningChain(llm, db_path).invoke(
-            {"customer_input": customer_input}
-        )
-
-        connection = sqlite3.connect(db_path)
-        cursor = connection.cursor()
+        order_info = self.reasoning_chain.invoke({"customer_input": customer_input})
 
-        try:
-            cursor.execute(
-                "SELECT product_id, price FROM products WHERE name = ?",
-                (order_info.product_name,),
-            )
-            product_id, price = cursor.fetchone()
-
-            total_amount = price * order_info.quantity
-            order_date = "2023-05-01"
-            quantity = order_info.quantity
-
-            cursor.execute(
-                "INSERT INTO orders (customer_id, product_id, quantity, total_amount, order_date) VALUES (?, ?, ?, ?, ?)",
-                (customer_id, product_id, quantity, total_amount, order_date),
-            )
-            connection.commit()
+        return self._insert_order(db_path, customer_id, order_info)
 
-            id = cursor.lastrowid
-        except sqlite3.OperationalError as e:
-            print(f"Error: {e}")
-            return "An error occurred while creating the order."
-        finally:
-            cursor.close()
-            connection.close()
-
-        return f"Order created with ID: {id}"
+    async def _arun(
+        self,
+        customer_id: int,
+        customer_input: str,
+    ) -> str:
+        db_path = get_sqlite_database_path()
+        order_info = await self.reasoning_chain.ainvoke(
+            {"customer_input": customer_input}
+        )
 
-        return f"Order created with ID: {id}"
+        # SQLite is blocking, so run the insert outside the event loop
+        return await asyncio.to_thread(
+            self._insert_order, db_path, customer_id, order_info
+        )
@@ -1,11 +1,13 @@
+import asyncio
 import sqlite3
-from typing import Type
+from typing import Any, Optional, Type
 
 from langchain.tools import BaseTool
-from langchain_openai import ChatOpenAI
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
+from cobuy.chatbot.backends import create_chat_model
 from cobuy.chatbot.chains.get_order import GetOrderReasoningChain
+from cobuy.chatbot.telemetry import span
 from cobuy.data.loader import get_sqlite_database_path
 
 
@@ -19,42 +21,70 @@ class GetOrderTool(BaseTool):
     description: str = "Retrieve details of an existing order based on the order ID"
     args_schema: Type[BaseModel] = GetOrderInput
     return_direct: bool = True
+    llm: Optional[Any] = None  # Shared language model, built on demand if missing
+    _reasoning_chain: Optional[GetOrderReasoningChain] = PrivateAttr(default=None)
+
+    @property
+    def reasoning_chain(self) -> GetOrderReasoningChain:
+        """Build the reasoning chain once and reuse it for every call."""
+        if self._reasoning_chain is None:
+            llm = (
+                self.llm
+                if self.llm is not None
+                else create_chat_model(model="gpt-4o-mini")
+            )
+            self._reasoning_chain = GetOrderReasoningChain(llm)
+        return self._reasoning_chain
+
+    def _fetch_order(self, customer_id: int, order_id: int):
+        with span("sqlite", query="fetch_order"):
+            db_path = get_sqlite_database_path()
+
+            connection = sqlite3.connect(db_path)
+            cursor = connection.cursor()
+
+            try:
+                # Get the column names of the orders table
+                cursor.execute("PRAGMA table_info(orders)")
+                columns = cursor.fetchall()
+
+                cursor.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,))
+                order_ = cursor.fetchone()
+
+                # Map the order to the column names
+                order = dict(zip([column[1] for column in columns], order_))
+            except sqlite3.OperationalError as e:
+                print(f"Error: {e}")
+                return "An error occurred while retrieving the order."
+            finally:
+                cursor.close()
+                connection.close()
+
+            if customer_id != order["customer_id"]:
+                return "You are not authorized to view this order."
+            else:
+                # Return text so the answer can be stored in the chat history
+                return str(order)
 
     def _run(
         self,
         customer_id: int,
         customer_input: str,
     ) -> str:
-        llm = ChatOpenAI(model="gpt-4o-mini")
+        order_info = self.reasoning_chain.invoke({"customer_input": customer_input})
 
-        order_info = GetOrderReasoningChain(llm).invoke(
+        return self._fetch_order(customer_id, order_info.order_id)
+
+    async def _arun(
+        self,
+        customer_id: int,
+        customer_input: str,
+    ) -> str:
+        order_info = await self.reasoning_chain.ainvoke(
             {"customer_input": customer_input}
         )
-        order_id = order_info.order_id
-
-        db_path = get_sqlite_database_path()
-
-        connection = sqlite3.connect(db_path)
-        cursor = connection.cursor()
-
-        try:
-            # Get the column names of the orders table
-            cursor.execute("PRAGMA table_info(orders)")
-            columns = cursor.fetchall()
-
-            cursor.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,))
-            order_ = cursor.fetchone()
-
-            # Map the order to the column names
-            order = dict(zip([column[1] for column in columns], order_))
-        except sqlite3.OperationalError as e:
-            print(f"Error: {e}")
-            return "An error occurred while retrieving the order."
-        finally:
-            cursor.close()
-            connection.close()
-
-        if customer_id != order["customer_id"]:
-            return "You are not authorized to view this order."
-        else:
-            return order
+
+        # SQLite is blocking, so run the lookup outside the event loop
+        return await asyncio.to_thread(
+            self._fetch_order, customer_id, order_info.order_id
+        )
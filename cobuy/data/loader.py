@@ -1,9 +1,14 @@
+import hashlib
 import os
 import pickle
+import time
 
 # Base directory for data files.
 BASE_DIR = os.path.dirname(__file__)
 
+# File rewritten every time the PDF embeddings are regenerated.
+EMBEDDINGS_STAMP = os.path.join(BASE_DIR, "pdfs", "embeddings.stamp")
+
 
 def load_database_file(filename: str):
     """
@@ -38,3 +43,41 @@ def get_sqlite_database_path():
     """
     db_path = os.path.join(BASE_DIR, "database", "ecommerce.db")
     return db_path
+
+
+def get_data_fingerprint() -> str:
+    """
+    Get a fingerprint of the data answers are generated from: the product catalog,
+    the support PDFs and the last regeneration of their embeddings.
+
+    The fingerprint changes whenever one of these files is added, removed or
+    modified, so anything derived from them can be invalidated.
+
+    Returns:
+        fingerprint: A hex digest identifying the current data.
+    """
+    pdfs_dir = os.path.join(BASE_DIR, "pdfs")
+    paths = [os.path.join(BASE_DIR, "database", "products_catalog.pkl")]
+    paths += sorted(
+        os.path.join(pdfs_dir, f) for f in os.listdir(pdfs_dir) if f.endswith(".pdf")
+    )
+    paths.append(EMBEDDINGS_STAMP)
+
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            digest.update(f"{path}:missing;".encode())
+        else:
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+
+    return digest.hexdigest()
+
+
+def touch_embeddings_stamp():
+    """
+    Record that the PDF embeddings were regenerated, changing the data fingerprint.
+    """
+    with open(EMBEDDINGS_STAMP, "w") as handle:
+        handle.write(f"{time.time()}\n")
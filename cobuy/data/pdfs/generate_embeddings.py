@@ -4,10 +4,10 @@ from typing import List
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_core.documents.base import Document
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pinecone import Index, Pinecone
+
+from cobuy.chatbot.backends import OFFLINE_INDEX_PATH, create_vector_store, get_backend
+from cobuy.data.loader import touch_embeddings_stamp
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -40,13 +40,15 @@ def get_text_from_pdf(pdf_file: str) -> List[Document]:
 def create_embeddings():
     """
     Processes all PDF files in the current directory, splits their text into chunks,
-    and stores their embeddings in a Pinecone vector database.
+    and stores their embeddings in the vector database of the backend selected by
+    the COBUY_BACKEND environment variable.
 
     Steps:
     1. Finds all PDF files in the current directory.
     2. Extracts text from each PDF file.
     3. Splits the text into manageable chunks for embedding.
-    4. Stores the resulting embeddings in a Pinecone vector database.
+    4. Stores the resulting embeddings in Pinecone, or in the local index file for
+       the offline backend.
     """
     # Get a list of all PDF files in the current directory
     pdf_files = [f for f in os.listdir() if f.endswith(".pdf")]
@@ -68,13 +70,9 @@ def create_embeddings():
     # Split all documents into smaller chunks
     all_splits = text_splitter.split_documents(docs)
 
-    # Initialize a connection to Pinecone
-    pc = Pinecone()
-    index: Index = pc.Index("rag")  # Access the "rag" index in Pinecone
-
-    # Initialize a Pinecone vector store with OpenAI embeddings
-    vector_store = PineconeVectorStore(
-        index=index, embedding=OpenAIEmbeddings(model="text-embedding-3-small")
+    # Initialize the vector store of the "rag" index
+    vector_store = create_vector_store(
+        index_name="rag", embeddings_model="text-embedding-3-small"
     )
 
     # Generate unique IDs for each chunk
@@ -82,3 +80,10 @@ def create_embeddings():
 
     # Add the documents and their embeddings to the vector store
     vector_store.add_documents(documents=all_splits, ids=ids)
+
+    # The offline vector store lives in memory, so save it for the bot to load
+    if get_backend() == "offline":
+        vector_store.dump(OFFLINE_INDEX_PATH)
+
+    # Invalidate cached answers generated from the previous embeddings
+    touch_embeddings_stamp()
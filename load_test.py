@@ -0,0 +1,337 @@
+"""Load test of `CustomerServiceBot` on local stand-ins for the LLM, embeddings
+and vector store.
+
+Replays the messages of `synthetic_intetions.json` and `new_intentions.jsonl`
+through the bot at a given concurrency and arrival rate, then reports the
+throughput, the latency percentiles per labelled intent and the peak RSS. The
+stand-ins sleep for the configured latencies, so what remains is our own overhead.
+Latency is measured from the scheduled arrival of a message, so time spent queued
+behind busy workers counts.
+
+Usage:
+    python load_test.py --concurrency 16 --rate 50 --messages 500 --llm-latency 0.2
+"""
+
+# Import necessary modules and classes
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.stubs import (
+    HashingEncoder,
+    StubChatModel,
+    build_stub_route_layer,
+    build_stub_vector_store,
+)
+from cobuy import CustomerServiceBot
+from cobuy.chatbot.backends import HashingEmbeddings
+from cobuy.chatbot.engine import BotEngine
+from cobuy.chatbot.router.loader import load_labelled_messages
+from cobuy.chatbot.settings import BotSettings
+
+DATASETS = [
+    "synthetic_intetions.json",
+    "new_intentions.jsonl",
+]
+
+# Schema-valid replies of the stub LLM, keyed by the output schema in the prompt
+LLM_RULES = [
+    (
+        '"properties": {"results"',
+        '{"results": [{"category": "Audio Equipment", '
+        '"products": ["WaveSound Bluetooth Speaker"]}]}',
+    ),
+    ('"properties": {"intent"', '{"intent": "chitchat"}'),
+]
+LLM_DEFAULT = (
+    "Thank you for reaching out to Cobuy. Here is the information you asked for, "
+    "let me know if there is anything else I can help you with today."
+)
+
+
+def load_workload(
+    file_names: List[str], messages: int, seed: int
+) -> List[Tuple[str, str]]:
+    """Load the labelled messages and repeat them, shuffled, to the requested count.
+
+    Args:
+        file_names: Labelled message files of the `router` folder.
+        messages: Number of messages to replay, 0 for each message once.
+        seed: Seed of the shuffle.
+
+    Returns:
+        The (intent, message) pairs in replay order.
+    """
+    records = []
+    for file_name in file_names:
+        file_messages, labels = load_labelled_messages(file_name)
+        records += list(zip(labels, file_messages))
+
+    rng = random.Random(seed)
+    workload = []
+    while len(workload) < (messages or len(records)):
+        rng.shuffle(records)
+        workload += records
+    return workload[: messages or len(records)]
+
+
+def arrival_times(count: int, rate: float, seed: int) -> List[float]:
+    """Offsets of Poisson arrivals at `rate` per second, all zero if rate is 0."""
+    if rate <= 0:
+        return [0.0] * count
+    rng = random.Random(seed)
+    offsets, now = [], 0.0
+    for _ in range(count):
+        offsets.append(now)
+        now += rng.expovariate(rate)
+    return offsets
+
+
+def build_engine(args: argparse.Namespace) -> BotEngine:
+    """Build an engine running on the stand-ins configured on the command line."""
+    llm = StubChatModel(
+        latency=args.llm_latency,
+        token_latency=args.token_latency,
+        rules=LLM_RULES,
+        default=LLM_DEFAULT,
+    )
+    embeddings = HashingEmbeddings(latency=args.embedding_latency)
+
+    intention_classifier = None
+    if args.router == "hashing":
+        intention_classifier = build_stub_route_layer(
+            HashingEncoder(latency=args.embedding_latency)
+        )
+
+    settings = BotSettings(
+        speculative=args.speculative,
+        response_cache=args.response_cache,
+        coalesce_requests=args.coalesce,
+    )
+    return BotEngine(
+        settings,
+        llm=llm,
+        vector_store=build_stub_vector_store(embeddings),
+        intention_classifier=intention_classifier,
+    )
+
+
+def session(engine: BotEngine, i: int, conversations: int) -> CustomerServiceBot:
+    """Bot session replaying message `i`, one conversation per message by default."""
+    conversation = i % conversations if conversations else i
+    return CustomerServiceBot(
+        f"load_user_{conversation}", f"load_conversation_{conversation}", engine
+    )
+
+
+def run_sync(
+    engine: BotEngine,
+    workload: List[Tuple[str, str]],
+    offsets: List[float],
+    args: argparse.Namespace,
+) -> List[Tuple[str, float, Optional[Exception]]]:
+    """Replay the workload on a thread pool through `process_user_input`."""
+    start = time.perf_counter()
+
+    def replay(i: int) -> Tuple[str, float, Optional[Exception]]:
+        intent, message = workload[i]
+        arrival = start + offsets[i]
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        error = None
+        try:
+            session(engine, i, args.conversations).process_user_input(
+                {"customer_input": message}
+            )
+        except Exception as e:
+            error = e
+        return intent, (time.perf_counter() - arrival) * 1000, error
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        return list(pool.map(replay, range(len(workload))))
+
+
+async def run_async(
+    engine: BotEngine,
+    workload: List[Tuple[str, str]],
+    offsets: List[float],
+    args: argparse.Namespace,
+) -> List[Tuple[str, float, Optional[Exception]]]:
+    """Replay the workload on the event loop through `aprocess_user_input`."""
+    start = time.perf_counter()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def replay(i: int) -> Tuple[str, float, Optional[Exception]]:
+        intent, message = workload[i]
+        arrival = start + offsets[i]
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        error = None
+        async with slots:
+            try:
+                await session(engine, i, args.conversations).aprocess_user_input(
+                    {"customer_input": message}
+                )
+            except Exception as e:
+                error = e
+        return intent, (time.perf_counter() - arrival) * 1000, error
+
+    return await asyncio.gather(*(replay(i) for i in range(len(workload))))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def summarise(
+    results: List[Tuple[str, float, Optional[Exception]]], elapsed: float
+) -> Dict[str, Any]:
+    """Aggregate the replay results into the report."""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    for intent, latency_ms, error in results:
+        latencies[intent].append(latency_ms)
+        latencies["all"].append(latency_ms)
+        if error is not None:
+            errors[intent] += 1
+            errors["all"] += 1
+
+    intents = {}
+    for intent in sorted(latencies, key=lambda name: (name == "all", name)):
+        values = np.asarray(latencies[intent])
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        intents[intent] = {
+            "count": len(values),
+            "errors": errors[intent],
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(values.max()),
+        }
+
+    return {
+        "messages": len(results),
+        "errors": errors["all"],
+        "elapsed_s": elapsed,
+        "throughput": len(results) / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "intents": intents,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print the report as a table."""
+    print(
+        f"{report['messages']} messages in {report['elapsed_s']:.2f} s: "
+        f"{report['throughput']:.1f} messages/s, {report['errors']} errors, "
+        f"peak RSS {report['peak_rss_mb']:.0f} MB"
+    )
+    if "embedding_cache" in report:
+        print(
+            "Input embedding cache hit rate: "
+            f"{report['embedding_cache']['hit_rate']:.1%}"
+        )
+    print(
+        f"{'intent':<22}{'count':>7}{'errors':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    )
+    for intent, stats in report["intents"].items():
+        print(
+            f"{intent:<22}{stats['count']:>7}{stats['errors']:>8}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+            f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--messages", type=int, default=0, help="Messages to replay (0: dataset once)"
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Turns in flight")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Poisson arrival rate in messages/s (0: all at once)",
+    )
+    parser.add_argument(
+        "--conversations",
+        type=int,
+        default=0,
+        help="Conversations the messages are spread over (0: one per message)",
+    )
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument(
+        "--router",
+        choices=["hashing", "minilm"],
+        default="hashing",
+        help="Route layer encoder: hashing stand-in or the real sentence transformer",
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.2, help="Stub LLM latency (s)"
+    )
+    parser.add_argument(
+        "--token-latency",
+        type=float,
+        default=0.0,
+        help="Stub LLM latency per token (s)",
+    )
+    parser.add_argument(
+        "--embedding-latency",
+        type=float,
+        default=0.02,
+        help="Stub embeddings latency per call (s)",
+    )
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--coalesce", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", help="Write the report and the telemetry export to this file"
+    )
+    args = parser.parse_args()
+
+    # Hashed embeddings often score under the retriever threshold; that is expected
+    logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
+
+    engine = build_engine(args)
+    engine.warm_up(background=False)
+
+    workload = load_workload(DATASETS, args.messages, args.seed)
+    offsets = arrival_times(len(workload), args.rate, args.seed)
+
+    start = time.perf_counter()
+    if args.mode == "sync":
+        results = run_sync(engine, workload, offsets, args)
+    else:
+        results = asyncio.run(run_async(engine, workload, offsets, args))
+    report = summarise(results, time.perf_counter() - start)
+    if engine.embedding_cache is not None:
+        report["embedding_cache"] = engine.embedding_cache.stats.as_dict()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(
+                {"report": report, "telemetry": engine.telemetry.export()},
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()